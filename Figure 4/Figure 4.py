@@ -1,7 +1,10 @@
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tis_abm.store import load_results
+from tis_abm.figures import save_plot, add_calendar_year_axis, total_patches
 
 # ==================== Global Settings for Journal-Quality Figures ====================
 plt.rcParams['font.family'] = 'Times New Roman'
@@ -9,35 +12,9 @@ plt.rcParams['font.size'] = 16
 plt.rcParams['axes.unicode_minus'] = False
 os.makedirs('figures', exist_ok=True)
 
-# ==================== Helper Function: Save Plot in Publication-Ready Formats ====================
-def save_plot(fig, filename):
-    fig.savefig(f'figures/{filename}.png', bbox_inches='tight', dpi=300)
-    fig.savefig(f'figures/{filename}.pdf', bbox_inches='tight')
-    plt.show()
-    plt.close(fig)
-
-# ==================== Helper Function: Add Calendar Year Axis and Policy Milestones ====================
-def add_calendar_year_axis(ax):
-    ax.set_xlabel('Time Step')
-    
-    secax = ax.secondary_xaxis('top')
-    secax.set_xlabel('Calendar Year', color='darkred')
-    year_ticks = np.arange(0, 501, 60)
-    year_labels = [str(2018 + int(t // 12)) for t in year_ticks]
-    secax.set_ticks(year_ticks)
-    secax.set_xticklabels(year_labels, color='darkred', fontsize=14)
-    
-    policy_nodes = {144: '2030\nCarbon Peak', 504: '2060\nCarbon Neutrality'}
-    for tick, label in policy_nodes.items():
-        if tick <= 500:
-            ax.axvline(x=tick, color='gray', linestyle='--', linewidth=1.5, alpha=0.8)
-            ax.text(tick, ax.get_ylim()[1] * 0.96, label,
-                    ha='center', va='top', color='gray', fontsize=11,
-                    bbox=dict(boxstyle="round,pad=0.3", facecolor="white", edgecolor="gray", alpha=0.9))
-
 # ==================== Main Function: Generate Figure 4 (Baseline Evolution with Pathway 1 Emphasis) ====================
 def generate_figure_4():
-    df = pd.read_csv('smart-green-manufacturing-data-v8.0.csv')
+    df = load_results('smart-green-manufacturing-data-v8.0')
 
     fig, axes = plt.subplots(2, 3, figsize=(18, 11))
     fig.suptitle('Figure 4: Baseline Evolution of Key Indicators (Pathway 1 Focus)\n'
@@ -63,7 +40,7 @@ def generate_figure_4():
     add_calendar_year_axis(axes[0, 1])
 
     # (c) Green Coverage Ratio — Acceleration under Pathway 1
-    green_ratio = df['GreenZones'] / 1089
+    green_ratio = df['GreenZones'] / total_patches(df)
     axes[0, 2].plot(df['tick'], green_ratio, color='#2ca02c', linewidth=3.5)
     axes[0, 2].fill_between(df['tick'], green_ratio, alpha=0.3, color='#2ca02c')
     axes[0, 2].set_title('(c) Green Coverage Rate (Pathway 1 Core)', fontweight='bold', color='#2ca02c')
@@ -108,7 +85,7 @@ def generate_figure_4():
     add_calendar_year_axis(axes[1, 2])
 
     plt.tight_layout(rect=[0, 0.02, 1, 0.93])
-    save_plot(fig, 'fig4_baseline_evolution_pathway1_optimized')
+    save_plot(fig, 'fig4_baseline_evolution_pathway1_optimized', show=True)
 
 # ==================== Execution ====================
 if __name__ == "__main__":
@@ -3,30 +3,21 @@ import numpy as np
 import matplotlib.pyplot as plt
 from io import StringIO
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tis_abm.store import load_results
+from tis_abm.figures import save_plot, add_calendar_year_axis, total_patches, value_at
+from tis_abm.clusters import detect_stages
 
 plt.rcParams['font.family'] = 'Times New Roman'
 plt.rcParams['font.size'] = 16
 os.makedirs('figures', exist_ok=True)
 
-def save_plot(fig, filename):
-    fig.savefig(f'figures/{filename}.png', bbox_inches='tight', dpi=300)
-    fig.savefig(f'figures/{filename}.pdf', bbox_inches='tight')
-    plt.show()
-    plt.close(fig)
-
-def add_calendar_year_axis(ax):
-    ax.set_xlabel('Time Step', fontsize=16)
-    secax = ax.secondary_xaxis('top')
-    secax.set_xlabel('Calendar Year', fontsize=16, color='darkred')
-    year_ticks = np.arange(0, 501, 100)
-    year_labels = [str(2018 + int(t // 12)) for t in year_ticks]
-    secax.set_ticks(year_ticks)
-    secax.set_xticklabels(year_labels, color='darkred', fontsize=14)
-
-# Load data from local CSV file in the same directory
-df = pd.read_csv('smart-green-manufacturing-data-v8.0.csv')
+# Load data through the shared results store (imports the local CSV on first use)
+df = load_results('smart-green-manufacturing-data-v8.0')
 
-df['GreenCoverage'] = df['GreenZones'] / 1089
+df['GreenCoverage'] = df['GreenZones'] / total_patches(df)
 
 stages = {
     0: ('Initial\n(20% green)', 'black'),
@@ -35,6 +26,20 @@ stages = {
     500: ('Network Ubiquity\n(>80% green)', 'red')
 }
 
+# Runs exported with green-cluster statistics (python -m tis_abm run --clusters, or
+# sweeps) locate the stage boundaries from the data instead
+if 'Percolating' in df.columns:
+    names = {}
+    for name, tick in detect_stages(df).items():
+        if tick is not None:
+            names.setdefault(tick, []).append(name)
+    colors = dict(zip(['Initial', 'Preliminary', 'Island Formation', 'Network Ubiquity'],
+                      ['black', 'blue', 'green', 'red']))
+    stages = {}
+    for tick, group in names.items():
+        coverage = value_at(df, tick, 'GreenCoverage')
+        stages[tick] = (' / '.join(group) + f'\n({coverage:.0%} green)', colors[group[-1]])
+
 fig, axes = plt.subplots(1, 3, figsize=(21, 8))
 fig.suptitle('Figure X: Macro Evidence of Pathway 2 – Knowledge Diffusion and Cluster Proliferation\n'
              r'(Point $\rightarrow$ Cluster $\rightarrow$ Network Evolution)', 
@@ -46,28 +51,27 @@ ax0.plot(df['tick'], df['GreenCoverage'], color='#2ca02c', linewidth=3, label='G
 ax0.set_ylabel('Green Coverage Ratio')
 ax0.set_ylim(0, 1.05)
 ax0.set_title('(a) Green Transformation Progression')
-for t, (label, color) in stages.items():
-    idx = df.index[df['tick'] == t][0]
-    y_val = df.loc[idx, 'GreenCoverage']
+for i, (t, (label, color)) in enumerate(stages.items()):
+    y_val = value_at(df, t, 'GreenCoverage')
     ax0.plot(t, y_val, 'o', color=color, markersize=10)
 
     x_offset, y_offset = 0, 0
     va_align, ha_align = 'bottom', 'center'
 
-    if t == 0:
+    if i == 0:
         x_offset, y_offset = 20, 0.08
-    elif t == 100:
+    elif i == 1:
         y_offset = 0.04
-    elif t == 300:
+    elif i == 2:
         x_offset, y_offset, va_align = -20, -0.06, 'top'
-    elif t == 500:
+    else:
         x_offset, y_offset, va_align = -35, -0.07, 'top'
 
     ax0.text(t + x_offset, y_val + y_offset, label,
              ha=ha_align, va=va_align, color=color, fontweight='bold',
              fontsize=10,
              bbox=dict(boxstyle="round,pad=0.3", facecolor="white", edgecolor=color, alpha=0.8))
-add_calendar_year_axis(ax0)
+add_calendar_year_axis(ax0, step=100, milestones=False)
 
 # (b) Average AI Generation vs. Green Coverage Ratio
 ax1 = axes[1]
@@ -85,30 +89,27 @@ ax2 = axes[2]
 ax2.plot(df['tick'], df['NumAIFactories'], color='#1f77b4', linewidth=3, label='AI Manufacturers')
 ax2.set_ylabel('Number of AI Manufacturers')
 ax2.set_title('(c) S-curve Adoption Reflecting Cluster Growth')
-for t, (label, color) in stages.items():
-    idx = df.index[df['tick'] == t][0]
-    y_val = df.loc[idx, 'NumAIFactories']
+for i, (t, (label, color)) in enumerate(stages.items()):
+    y_val = value_at(df, t, 'NumAIFactories')
     ax2.plot(t, y_val, 'o', color=color, markersize=10)
 
     x_offset, y_offset = 0, 0
     va_align = 'bottom'
 
-    if t == 0:
+    if i == 0:
         x_offset, y_offset = 20, 35
-    elif t == 100:
-        x_offset, y_offset = 20, 30
-    elif t == 300:
+    elif i in (1, 2):
         x_offset, y_offset = 20, 30
-    elif t == 500:
+    else:
         x_offset, y_offset, va_align = -35, -35, 'top'
 
     ax2.text(t + x_offset, y_val + y_offset, label,
              ha='center', va=va_align, color=color, fontweight='bold',
              fontsize=10,
              bbox=dict(boxstyle="round,pad=0.3", facecolor="white", edgecolor=color, alpha=0.8))
-add_calendar_year_axis(ax2)
+add_calendar_year_axis(ax2, step=100, milestones=False)
 
 plt.tight_layout(rect=[0, 0.02, 1, 0.93])
-save_plot(fig, 'fig_pathway2_macro_evidence')
+save_plot(fig, 'fig_pathway2_macro_evidence', show=True)
 print("Figure for Pathway 2 successfully generated and saved.")
 
@@ -1,7 +1,16 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tis_abm.gridstream import GridStream, TICKS_PER_YEAR, FIRST_YEAR
+from tis_abm.figures import save_plot
+
+# Bit-packed per-tick grid written by `python -m tis_abm run --grid-stream spatial_grid.bin`
+GRID_STREAM = 'spatial_grid.bin'
 
 # Matplotlib global settings
 plt.rcParams['font.family'] = 'Times New Roman'
@@ -11,23 +20,16 @@ plt.rcParams['axes.unicode_minus'] = False
 # Create output directory
 os.makedirs('figures', exist_ok=True)
 
-def save_plot(fig, filename):
-    fig.savefig(f'figures/{filename}.png', bbox_inches='tight', dpi=300)
-    fig.savefig(f'figures/{filename}.pdf', bbox_inches='tight')
-    plt.show()
-    plt.close(fig)
-
-def figure_6_spatial_evolution_from_csv():
-    print("Generating Figure 6 from CSV spatial data files...")
+def load_spatial_grids(years, stream=GRID_STREAM, replicate=0):
+    """Green grids for the given years: from the grid stream if present, else the exported CSVs."""
+    if stream and os.path.exists(stream):
+        return GridStream(stream).years(years, replicate).astype(int)
+    return np.stack([pd.read_csv(f'spatial_data_{year} 1=green 0=non-green.csv', header=None).values
+                     for year in years])
 
-    # Define year labels and file mapping with updated filenames
-    years = [2018, 2026, 2043, 2059]
-    file_map = {
-        2018: 'spatial_data_2018 1=green 0=non-green.csv',
-        2026: 'spatial_data_2026 1=green 0=non-green.csv',
-        2043: 'spatial_data_2043 1=green 0=non-green.csv',
-        2059: 'spatial_data_2059 1=green 0=non-green.csv'
-    }
+def figure_6_spatial_evolution_from_csv(years=(2018, 2026, 2043, 2059), stream=GRID_STREAM, replicate=0):
+    print("Generating Figure 6 from spatial grid data...")
+    grids = load_spatial_grids(years, stream, replicate)
 
     # Set up 2×2 grid for subplots
     fig, axes = plt.subplots(2, 2, figsize=(12, 12), constrained_layout=True)
@@ -36,12 +38,7 @@ def figure_6_spatial_evolution_from_csv():
     # Plot each spatial grid
     for i, year in enumerate(years):
         ax = axes[i // 2, i % 2]
-        file_path = file_map[year]
-
-        # Load spatial data from CSV
-        spatial_data = pd.read_csv(file_path, header=None).values
-
-        im = ax.imshow(spatial_data, cmap='Greens', interpolation='nearest')
+        im = ax.imshow(grids[i], cmap='Greens', interpolation='nearest', vmin=0, vmax=1)
         ax.set_title(f'Year = {year}', fontsize=14)
         ax.set_xticks([])
         ax.set_yticks([])
@@ -50,7 +47,27 @@ def figure_6_spatial_evolution_from_csv():
     cbar = plt.colorbar(im, ax=axes.ravel().tolist(), shrink=0.8, aspect=20)
     cbar.set_label('Region Attribute (Darker = Greener)', fontsize=14)
 
-    save_plot(fig, 'fig6_spatial_evolution')
+    save_plot(fig, 'fig6_spatial_evolution', show=True)
+
+def figure_6_animation(stream=GRID_STREAM, replicate=0, every=1, fps=12, filename='fig6_spatial_evolution'):
+    """Animate the green grid over every recorded tick of a grid stream (GIF)."""
+    print(f"Rendering Figure 6 animation from {stream}...")
+    grid = GridStream(stream)
+    ticks = grid.ticks[::every]
+
+    fig, ax = plt.subplots(figsize=(7, 7), constrained_layout=True)
+    im = ax.imshow(grid.frame(ticks[0], replicate), cmap='Greens', interpolation='nearest', vmin=0, vmax=1)
+    ax.set_xticks([])
+    ax.set_yticks([])
+
+    def update(tick):
+        im.set_data(grid.frame(tick, replicate))
+        ax.set_title(f'Year = {FIRST_YEAR + tick / TICKS_PER_YEAR:.1f}', fontsize=14)
+        return (im,)
+
+    animation = FuncAnimation(fig, update, frames=ticks, blit=False)
+    animation.save(f'figures/{filename}.gif', writer='pillow', fps=fps)
+    plt.close(fig)
 
 if __name__ == "__main__":
     figure_6_spatial_evolution_from_csv()
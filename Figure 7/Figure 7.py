@@ -1,7 +1,12 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tis_abm.store import load_results
+from tis_abm.figures import save_plot
+from tis_abm.threshold import ThresholdDetector
 
 # ==================== Journal-quality settings ====================
 plt.rcParams['font.family'] = 'Times New Roman'
@@ -9,38 +14,32 @@ plt.rcParams['font.size'] = 16
 plt.rcParams['axes.unicode_minus'] = False
 os.makedirs('figures', exist_ok=True)
 
-def save_plot(fig, filename):
-    fig.savefig(f'figures/{filename}.png', bbox_inches='tight', dpi=300)
-    fig.savefig(f'figures/{filename}.pdf', bbox_inches='tight')
-    plt.show()
-    plt.close(fig)
-
 # Load data
-df = pd.read_csv('pathway3_svi_demand_data.csv')
+df = load_results('pathway3_svi_demand_data')
 
 # Sort by SVI
 df = df.sort_values('SVI').reset_index(drop=True)
 x = df['SVI'].values
 y = df['Demand'].values
 
-# Compute first derivative (local slope)
-d_y = np.diff(y)
-d_x = np.diff(x)
-d_x = np.where(d_x == 0, 1e-8, d_x)
-slope = d_y / d_x  # ΔDemand / ΔSVI
-
-# Compute second derivative (change in slope)
-acc = np.diff(slope) / np.diff(x[:-1])  # Δslope / ΔSVI
-acc = np.where(acc == 0, 1e-8, acc)  # avoid division by zero
-
-# Find index where acceleration is maximum (most positive)
-max_acc_idx = np.argmax(acc)
-
-# Threshold is the SVI value at that point
-threshold_svi = x[max_acc_idx + 1]  # +1 because acc[i] corresponds to change between i and i+1
-
-print(f"🔍 Automatically detected critical threshold at SVI = {threshold_svi:.4f}")
-print(f"   Max acceleration: {acc[max_acc_idx]:.2f}")
+# Stream the points in SVI order through the online takeoff detector
+# (short confirmation window: the table has only a few dozen points)
+detector = ThresholdDetector(confirm=3, z=2.0)
+for svi, demand in zip(x, y):
+    detector.update(svi, demand)
+threshold = detector.result()
+
+if threshold['crossed']:
+    threshold_svi = threshold['svi']
+    print(f"🔍 Automatically detected critical threshold at SVI = {threshold_svi:.4f}")
+    print(f"   Confidence: {threshold['confidence']:.2f}")
+else:
+    # Fallback: SVI at the largest second difference of Demand
+    d_x = np.where(np.diff(x) == 0, 1e-8, np.diff(x))
+    slope = np.diff(y) / d_x  # ΔDemand / ΔSVI
+    acc = np.diff(slope) / d_x[:-1]  # Δslope / ΔSVI
+    threshold_svi = x[np.argmax(acc) + 1]
+    print(f"🔍 No confirmed takeoff; largest curvature at SVI = {threshold_svi:.4f}")
 
 # Plot
 fig, ax = plt.subplots(figsize=(8, 6))
@@ -67,7 +66,7 @@ ax.grid(True, linestyle='--', alpha=0.5)
 ax.set_axisbelow(True)
 
 fig.tight_layout()
-save_plot(fig, 'fig_pathway3_svi_demand')
+save_plot(fig, 'fig_pathway3_svi_demand', show=True)
 
 print("✅ Figure 7 generated with data-driven threshold.")
 
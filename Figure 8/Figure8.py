@@ -1,7 +1,10 @@
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tis_abm.store import load_results
+from tis_abm.figures import save_plot, add_calendar_year_axis
 
 # Configure plot style for publication-quality figures
 plt.rcParams['font.family'] = 'Times New Roman'
@@ -9,43 +12,11 @@ plt.rcParams['font.size'] = 16
 plt.rcParams['axes.unicode_minus'] = False
 os.makedirs('figures', exist_ok=True)
 
-def save_plot(fig, filename):
-    """Save figure in high-resolution PNG and vector PDF formats."""
-    fig.savefig(f'figures/{filename}.png', bbox_inches='tight', dpi=300)
-    fig.savefig(f'figures/{filename}.pdf', bbox_inches='tight')
-    plt.close(fig)
-
-def add_calendar_year_axis(ax):
-    """Add secondary x-axis showing calendar years and annotate policy milestones."""
-    ax.set_xlabel('Time Step')
-
-    secax = ax.secondary_xaxis('top')
-    secax.set_xlabel('Calendar Year', color='darkred')
-    
-    year_ticks = np.arange(0, 501, 60)
-    year_labels = [str(2018 + int(t // 12)) for t in year_ticks]
-    secax.set_ticks(year_ticks)
-    secax.set_xticklabels(year_labels, color='darkred', fontsize=14)
-
-    milestones = {144: '2030\nCarbon Peak', 504: '2060\nCarbon Neutrality'}
-    for tick, label in milestones.items():
-        if tick <= 500:
-            ax.axvline(x=tick, color='gray', linestyle='--', linewidth=1.5, alpha=0.8)
-            ax.text(
-                tick, ax.get_ylim()[1] * 0.96, label,
-                ha='center', va='top', color='gray', fontsize=11,
-                bbox=dict(boxstyle="round,pad=0.3", facecolor="white", edgecolor="gray", alpha=0.9)
-            )
-
 def figure_8_market_responsiveness():
     """Generate revised Figure 8 comparing high vs. low market responsiveness (β)."""
-    # Load simulation data from local directory
-    df_high = pd.read_csv('data_β_high.csv')
-    df_low = pd.read_csv('data_β_low.csv')
-
-    # Ensure numeric data
-    df_high = df_high.apply(pd.to_numeric, errors='coerce').fillna(0)
-    df_low = df_low.apply(pd.to_numeric, errors='coerce').fillna(0)
+    # Load simulation data through the shared results store (typed columns, no re-parsing)
+    df_high = load_results('data_β_high')
+    df_low = load_results('data_β_low')
 
     fig, axes = plt.subplots(1, 3, figsize=(21, 6.5))
     fig.suptitle(
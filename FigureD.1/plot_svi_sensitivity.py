@@ -1,6 +1,13 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+import matplotlib.tri as mtri
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tis_abm.store import load_results
+from tis_abm.threshold import ThresholdDetector
+from tis_abm.figures import save_plot, total_patches
 
 # ==================== Global Figure Settings ====================
 plt.rcParams['font.family'] = 'serif'
@@ -12,22 +19,34 @@ def normalize(series):
     """Normalize series to [0, 1] range for SVI calculation."""
     return (series - series.min()) / (series.max() - series.min() + 1e-8)
 
-def plot_svi_sensitivity(csv_path):
-    # 1. Load Data
+# Critical threshold zone of the weighted SVI
+CRITICAL_ZONE = (0.55, 0.85)
+
+def load_data(csv_path):
+    directory, filename = os.path.split(csv_path)
     try:
-        df = pd.read_csv(csv_path)
+        return load_results(os.path.splitext(filename)[0], directory=directory or '.')
     except FileNotFoundError:
         print(f"Error: {csv_path} not found.")
-        return
+        return None
 
-    # 2. Data Transformation
-    # Green Coverage is calculated relative to total patches (1089)
-    df['GreenCoverage'] = df['GreenZones'] / 1089
-    
-    # Normalize key indicators for weighted SVI
+def svi_components(df):
+    """Normalized quality, greenness and resilience proxies (q, g, r)."""
+    # Green Coverage is calculated relative to the patches of the recorded grid
+    df['GreenCoverage'] = df['GreenZones'] / total_patches(df)
     q = normalize(df['AvgAIGen'])       # Quality proxy
     g = normalize(df['GreenCoverage'])  # Greenness proxy
     r = normalize(df['NumSuppliers'])   # Resilience proxy
+    return q, g, r
+
+def plot_svi_sensitivity(csv_path):
+    # 1. Load Data
+    df = load_data(csv_path)
+    if df is None:
+        return
+
+    # 2. Data Transformation: normalize key indicators for weighted SVI
+    q, g, r = svi_components(df)
 
     # Define scenarios from Table: Impact of SVI Weighting Configurations
     # Format: {Scenario_Name: (w_q, w_g, w_r)}
@@ -75,10 +94,73 @@ def plot_svi_sensitivity(csv_path):
     
     # Save outputs
     output_filename = 'fig_svi_sensitivity'
-    plt.savefig(f'{output_filename}.pdf', format='pdf', dpi=300)
-    plt.savefig(f'{output_filename}.png', format='png', dpi=300)
-    print(f"Success: Plots saved as {output_filename}.pdf and .png")
-    plt.show()
+    save_plot(fig, output_filename)
+    print(f"Success: Plots saved as figures/{output_filename}.pdf and .png")
+
+def simplex_weights(resolution):
+    """All (w_q, w_g, w_r) on the weight simplex with step 1/resolution, as a (K, 3) array."""
+    i, j = np.triu_indices(resolution + 1)
+    return np.column_stack([i, j - i, resolution - j]) / resolution
+
+def simplex_thresholds(df, weights):
+    """Demand-takeoff threshold (weighted SVI) for every weight triple; NaN where no takeoff is confirmed."""
+    X = np.column_stack(svi_components(df))   # (ticks, 3)
+    svi = weights @ X.T                        # (K, ticks): every weighted SVI in one product
+    # Each weight triple is one stream of the vectorized detector
+    detector = ThresholdDetector(confirm=3, z=2.0)
+    demand = df['Demand'].to_numpy(dtype=float)
+    for t in range(svi.shape[1]):
+        detector.update(svi[:, t], np.full(len(weights), demand[t]), int(df['tick'].iloc[t]))
+    return np.where(detector.crossed, detector.threshold_svi, np.nan)
+
+def plot_svi_simplex(csv_path, resolution=200):
+    """Heatmap of the takeoff threshold over the whole (w_q, w_g, w_r) simplex."""
+    df = load_data(csv_path)
+    if df is None:
+        return
+
+    weights = simplex_weights(resolution)
+    threshold = simplex_thresholds(df, weights)
+    v_start, v_end = CRITICAL_ZONE
+    crossed = ~np.isnan(threshold)
+    inside = crossed & (threshold >= v_start) & (threshold <= v_end)
+
+    # Barycentric -> Cartesian: Quality at (0, 0), Greenness at (1, 0), Resilience at the apex
+    x = weights[:, 1] + weights[:, 2] / 2
+    y = weights[:, 2] * np.sqrt(3) / 2
+    tri = mtri.Triangulation(x, y)
+    tri.set_mask(~crossed[tri.triangles].all(axis=1))
+
+    fig, ax = plt.subplots(figsize=(8, 7))
+    ax.fill([0, 1, 0.5, 0], [0, 0, np.sqrt(3) / 2, 0], color='lightgray', zorder=0)
+    mesh = ax.tripcolor(tri, np.nan_to_num(threshold), shading='flat', cmap='viridis')
+    ax.tricontour(tri, np.nan_to_num(threshold), levels=[v_start, v_end], colors='white', linewidths=1.5)
+
+    # Hand-picked scenarios S1-S4 for reference
+    scenarios = {'S1': (1.0, 1.0, 1.0), 'S2': (2.0, 0.5, 0.5), 'S3': (0.5, 2.0, 0.5), 'S4': (0.5, 0.5, 2.0)}
+    for name, w in scenarios.items():
+        w_q, w_g, w_r = np.array(w) / sum(w)
+        ax.plot(w_g + w_r / 2, w_r * np.sqrt(3) / 2, 'o', color='#d62728', markersize=6)
+        ax.annotate(name, (w_g + w_r / 2, w_r * np.sqrt(3) / 2), xytext=(5, 5), textcoords='offset points',
+                    fontweight='bold', color='#d62728')
+
+    ax.text(0, -0.04, 'Quality', ha='center', va='top', fontweight='bold')
+    ax.text(1, -0.04, 'Greenness', ha='center', va='top', fontweight='bold')
+    ax.text(0.5, np.sqrt(3) / 2 + 0.02, 'Resilience', ha='center', va='bottom', fontweight='bold')
+    ax.set_aspect('equal')
+    ax.axis('off')
+
+    cbar = fig.colorbar(mesh, ax=ax, shrink=0.8)
+    cbar.set_label('Demand-Takeoff Threshold (Weighted SVI)')
+    ax.set_title(f'Takeoff Threshold across {len(weights):,} SVI Weightings\n'
+                 f'{inside.mean():.1%} inside the critical zone {v_start}-{v_end} (white contours); '
+                 f'gray: no confirmed takeoff', fontsize=11, pad=30)
+
+    plt.tight_layout()
+    output_filename = 'fig_svi_simplex'
+    save_plot(fig, output_filename)
+    print(f"Success: Plots saved as figures/{output_filename}.pdf and .png")
 
 if __name__ == "__main__":
     plot_svi_sensitivity('SVI_Sensitivity_Analysis_Data.csv')
+    plot_svi_simplex('SVI_Sensitivity_Analysis_Data.csv')
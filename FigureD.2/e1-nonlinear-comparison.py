@@ -1,7 +1,10 @@
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tis_abm.store import load_results
+from tis_abm.figures import save_plot, add_calendar_year_axis, total_patches
 
 # ==================== Global Settings for Journal Publication ====================
 plt.rcParams['font.family'] = 'Times New Roman'
@@ -15,42 +18,18 @@ plt.rcParams['axes.unicode_minus'] = False
 plt.rcParams['lines.linewidth'] = 3.0
 plt.rcParams['lines.dash_capstyle'] = 'round'
 
-# CSV File Paths
-LINEAR_CSV = "linear_cost.csv"
-EXP_CSV    = "exponential_cost.csv"
-
-TOTAL_PATCHES = 1089
+# Scenario names in the results store (imported from <name>.csv on first use)
+LINEAR_SCENARIO = "linear_cost"
+EXP_SCENARIO    = "exponential_cost"
 
 # ==================== Helper Functions ====================
 def load_data():
-    """Load and preprocess simulation results."""
-    df_linear = pd.read_csv(LINEAR_CSV)
-    df_exp    = pd.read_csv(EXP_CSV)
-    for df in [df_linear, df_exp]:
-        df[:] = df.apply(pd.to_numeric, errors='coerce').fillna(0)
+    """Load simulation results through the shared results store."""
+    df_linear = load_results(LINEAR_SCENARIO)
+    df_exp    = load_results(EXP_SCENARIO)
     return df_linear, df_exp
 
 
-def add_year_axis(ax):
-    """Add Time Step and secondary Calendar Year axis to the plot."""
-    ax.set_xlabel('Time Step', fontsize=18)
-    
-    secax = ax.secondary_xaxis('top')
-    secax.set_xlabel('Calendar Year', fontsize=18, color='darkred')
-    year_ticks = np.arange(0, 501, 60)
-    year_labels = [str(2018 + int(t // 12)) for t in year_ticks]
-    secax.set_ticks(year_ticks)
-    secax.set_xticklabels(year_labels, color='darkred', fontsize=15)
-    
-    # 2030 & 2060 Policy Milestones
-    for tick, label in {144: '2030 Carbon Peak', 504: '2060 Carbon Neutrality'}.items():
-        if tick <= 500:
-            ax.axvline(x=tick, color='gray', linestyle='--', lw=1.4, alpha=0.75)
-            ax.text(tick, ax.get_ylim()[1]*0.92, label,
-                    ha='center', va='top', color='gray', fontsize=11,
-                    bbox=dict(boxstyle="round,pad=0.3", fc="white", ec="gray", alpha=0.85))
-
-
 # ==================== Main Plotting Function ====================
 def plot_all_patterns_combined():
     """Generates the unified 4-panel figure comparing Linear and Exponential cost regimes."""
@@ -72,7 +51,7 @@ def plot_all_patterns_combined():
     ax1.set_ylim(0.9, 4.5)
     ax1.set_title('(a) P1: Firm-level Efficiency Optimization', fontsize=20, pad=18)
     ax1.legend(loc='lower right', frameon=True, fancybox=True, shadow=True, fontsize=14)
-    add_year_axis(ax1)
+    add_calendar_year_axis(ax1, label_height=0.92, alpha=0.75)
     
     # ---------------- (b) P2: Number of AI Manufacturers ----------------
     ax2 = fig.add_subplot(gs[0, 1])
@@ -82,7 +61,7 @@ def plot_all_patterns_combined():
     ax2.set_ylabel('Number of AI Manufacturers', fontsize=18)
     ax2.set_title('(b) P2: Knowledge Diffusion & Spatial Clustering', fontsize=20, pad=18)
     ax2.legend(loc='lower right', frameon=True, fancybox=True, shadow=True, fontsize=14)
-    add_year_axis(ax2)
+    add_calendar_year_axis(ax2, label_height=0.92, alpha=0.75)
     
     # ---------------- (c) P3: Market Demand ----------------
     ax3 = fig.add_subplot(gs[1, 0])
@@ -92,7 +71,7 @@ def plot_all_patterns_combined():
     ax3.set_ylabel('Market Demand', fontsize=18)
     ax3.set_title('(c) P3: System-level Value Creation & Demand Takeoff', fontsize=20, pad=18)
     ax3.legend(loc='upper left', bbox_to_anchor=(0, 0.85), frameon=True, fancybox=True, shadow=True, fontsize=14)
-    add_year_axis(ax3)
+    add_calendar_year_axis(ax3, label_height=0.92, alpha=0.75)
     
     # ---------------- (d) P4: Institutional Feedback & Resilience ----------------
     ax4 = fig.add_subplot(gs[1, 1])
@@ -103,9 +82,9 @@ def plot_all_patterns_combined():
     
     ax4_2 = ax4.twinx()
     # Green Coverage
-    ax4_2.plot(df_linear['tick'], df_linear['GreenZones']/TOTAL_PATCHES, color='#2ca02c', lw=2.8, alpha=0.9, label='Linear (Green Coverage)')
-    ax4_2.plot(df_exp['tick'],    df_exp['GreenZones']/TOTAL_PATCHES,    color='#66c266', linestyle='--', dashes=(6,3), lw=2.8, alpha=0.9, label='Exponential (Green Coverage)')
-    ax4_2.fill_between(df_linear['tick'], df_linear['GreenZones']/TOTAL_PATCHES, alpha=0.05, color='#2ca02c')
+    ax4_2.plot(df_linear['tick'], df_linear['GreenZones']/total_patches(df_linear), color='#2ca02c', lw=2.8, alpha=0.9, label='Linear (Green Coverage)')
+    ax4_2.plot(df_exp['tick'],    df_exp['GreenZones']/total_patches(df_exp),    color='#66c266', linestyle='--', dashes=(6,3), lw=2.8, alpha=0.9, label='Exponential (Green Coverage)')
+    ax4_2.fill_between(df_linear['tick'], df_linear['GreenZones']/total_patches(df_linear), alpha=0.05, color='#2ca02c')
     
     ax4.set_ylabel('Government Budget Balance', fontsize=18, color='#6a0dad')
     ax4_2.set_ylabel('Green Coverage Ratio', fontsize=18, color='#2ca02c')
@@ -117,17 +96,15 @@ def plot_all_patterns_combined():
     ax4.legend(lines1 + lines2, labels1 + labels2, loc='lower center', 
                bbox_to_anchor=(0.5, -0.22), ncol=2, frameon=True, fancybox=True, shadow=True, fontsize=13)
     
-    add_year_axis(ax4)
+    add_calendar_year_axis(ax4, label_height=0.92, alpha=0.75)
     
     # Final Adjustments
     plt.tight_layout(rect=[0, 0.03, 1, 0.94])
     
     # Exporting
     filename = "fig_e1_comparison_results"
-    plt.savefig(f'{filename}.png', bbox_inches='tight', dpi=300)
-    plt.savefig(f'{filename}.pdf', bbox_inches='tight')
-    print(f"Success: Figure saved as {filename}.png and {filename}.pdf")
-    plt.show()
+    save_plot(fig, filename)
+    print(f"Success: Figure saved as figures/{filename}.png and figures/{filename}.pdf")
 
 if __name__ == "__main__":
     plot_all_patterns_combined()
@@ -0,0 +1,28 @@
+import os
+
+import pandas as pd
+import pytest
+
+from tis_abm.calibration import EarlyRejection, calibrate, evaluate
+from tis_abm.store import REPO_ROOT
+
+
+def test_candidates_are_compared_on_the_reference_tick_grid():
+    grid = list(range(0, 201, 20))
+    experiment = dict(name='grid', base=dict(ticks=200), targets={'AIGenMidpoint': 0.0, 'DemandTakeoffTick': 0.0},
+                      ticks=grid)
+    _, stats = evaluate({}, [experiment], seeds=[1])
+    # Events are dated by the first reference tick reaching them, or one past the grid's end
+    assert stats['grid.AIGenMidpoint'] in grid + [201]
+    assert stats['grid.DemandTakeoffTick'] in grid + [201]
+
+
+def test_a_reference_the_rejection_rule_would_reject_is_an_error():
+    spec = dict(factors={'gamma': [0.15, 0.45]}, seeds=[1],
+                experiments=[dict(name='dynamic', reference='Figure 10/data_policy_dynamic.csv',
+                                  base=dict(policy='dynamic'))])
+    assert EarlyRejection().rejects(pd.read_csv(os.path.join(REPO_ROOT, 'Figure 10', 'data_policy_dynamic.csv')))
+    with pytest.raises(ValueError, match='rejected early'):
+        calibrate(spec, spec_dir=REPO_ROOT)
+    assert not EarlyRejection().rejects(
+        pd.read_csv(os.path.join(REPO_ROOT, 'Figure 4', 'smart-green-manufacturing-data-v8.0.csv')))
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from tis_abm.codec import BLOCK_ROWS, block_range, decode, encode
+
+
+def _round_trip(values, dtype, lo=0, hi=None):
+    header, data = encode(values, dtype)
+    hi = len(values) if hi is None else hi
+    return header, decode(data, header, lo, hi)
+
+
+def _same(a, b):
+    """Bit-identical arrays (NaN and -0.0 included)."""
+    return a.dtype == b.dtype and a.tobytes() == b.tobytes()
+
+
+@pytest.mark.parametrize('rows', [1, BLOCK_ROWS - 1, BLOCK_ROWS, BLOCK_ROWS + 1, 3 * BLOCK_ROWS + 7])
+def test_delta_integers_round_trip(rows):
+    values = (np.cumsum(np.random.default_rng(rows).integers(-3, 4, rows)) + 600).astype(np.int32)
+    header, out = _round_trip(values, 'int32')
+    assert header['codec'] == 'delta'
+    assert len(header['blocks']) == -(-rows // BLOCK_ROWS) + 1
+    assert _same(out, values)
+
+
+@pytest.mark.parametrize('rows', [BLOCK_ROWS - 1, BLOCK_ROWS, BLOCK_ROWS + 1])
+def test_delta_decimals_round_trip(rows):
+    values = np.round(np.linspace(-50.0, 120.0, rows), 4)
+    header, out = _round_trip(values, 'float64')
+    assert header['codec'] == 'delta' and header['decimals'] <= 4
+    assert _same(out, values)
+
+
+@pytest.mark.parametrize('rows', [BLOCK_ROWS - 1, BLOCK_ROWS, BLOCK_ROWS + 1])
+def test_xor_floats_round_trip(rows):
+    values = 1000.0 + np.cumsum(np.random.default_rng(rows).normal(0.0, 1.0, rows) / 3.0)
+    header, out = _round_trip(values, 'float64')
+    assert header['codec'] == 'xor'
+    assert _same(out, values)
+
+
+def test_raw_when_varints_do_not_shrink():
+    values = np.random.default_rng(0).random(BLOCK_ROWS + 1).astype(np.float32)
+    header, out = _round_trip(values, 'float32')
+    assert header['codec'] == 'raw'
+    assert _same(out, values)
+
+
+def test_negative_zero_and_nan_round_trip():
+    values = np.array([0.0, -0.0, 1.5, np.nan, -2.25, np.inf, -0.0] * 40)
+    header, out = _round_trip(values, 'float64')
+    assert header['codec'] != 'delta'
+    assert _same(out, values)
+    assert np.signbit(out[1]) and np.isnan(out[3])
+
+
+def test_negative_zero_alone_is_not_delta_coded():
+    values = np.array([1.0, -0.0, 2.0])
+    header, out = _round_trip(values, 'float64')
+    assert header['codec'] != 'delta'
+    assert _same(out, values)
+
+
+@pytest.mark.parametrize('values, dtype', [
+    (np.arange(1000, dtype=np.int32) * 3, 'int32'),
+    (np.round(np.linspace(0.0, 9.0, 1000), 3), 'float64'),
+    (np.cumsum(np.random.default_rng(1).normal(size=1000)), 'float64'),
+    (np.random.default_rng(2).random(1000), 'float64'),
+])
+@pytest.mark.parametrize('lo, hi', [(0, 1000), (255, 257), (256, 512), (300, 301), (10, 900), (999, 1000)])
+def test_windowed_decode_from_an_offset(values, dtype, lo, hi):
+    header, data = encode(values, dtype)
+    first, end = block_range(header, lo, hi)
+    start, stop = header['blocks'][first], header['blocks'][end]
+    out = decode(data[start:stop], header, lo, hi, offset=start)
+    assert _same(out, values[lo:hi].astype(dtype))
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from tis_abm.engine import simulate
+from tis_abm.fiscal import REGIMES, FiscalRecorder, pay_claims, replay, rule_params
+from tis_abm.params import SCHEMA, policy_params
+
+
+@pytest.mark.parametrize('regime', REGIMES)
+def test_replay_matches_engine_for_recorded_rule(regime):
+    params = policy_params(regime, ticks=120, record_every=1)
+    recorder = FiscalRecorder(params)
+    tables = simulate(params, 7, 3, observers=[recorder])
+    result = replay(recorder.inputs(), rule_params([{}], params),
+                    recorder.initial['budget'], recorder.initial['fund'])
+    for column in ['GovBudget', 'TransitionFund']:
+        engine = tables[:, 1:, SCHEMA.index(column)].T
+        np.testing.assert_array_equal(result[column][:, 0], engine)
+
+
+def test_pay_claims_pays_whole_claims():
+    spent, budget = pay_claims(np.array([10.0, 10.0, -1.0, 5.0]), np.array([3.0, 0.1, 3.0, 0.0]),
+                               np.array([5.0, 200.0, 2.0, 4.0]))
+    np.testing.assert_array_equal(spent, [9.0, 0.1 * 100, 0.0, 0.0])
+    np.testing.assert_array_equal(budget, [1.0, 10.0 - 0.1 * 100, -1.0, 5.0])
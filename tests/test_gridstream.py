@@ -0,0 +1,18 @@
+import pytest
+
+from tis_abm.engine import simulate
+from tis_abm.gridstream import GridStream, GridStreamWriter
+from tis_abm.params import Params
+
+
+def test_select_rejects_ticks_outside_the_stream(tmp_path):
+    path = str(tmp_path / 'grid.bin')
+    with GridStreamWriter(path) as writer:
+        simulate(Params(ticks=10), 1, 2, observers=[writer])
+    stream = GridStream(path)
+    assert (stream.select([0, 10], replicate=1)[1] == stream.frame(10, replicate=1)).all()
+    for ticks in ([11], [-1], [0, 5, 12]):
+        with pytest.raises(IndexError):
+            stream.select(ticks)
+    with pytest.raises(IndexError):
+        stream.frame(11)
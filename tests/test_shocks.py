@@ -0,0 +1,12 @@
+from tis_abm.shocks import RESILIENCE_COLUMNS, stress_test
+
+
+def test_no_op_schedule_scores_zero_in_a_mixed_batch():
+    noop = [{'type': 'budget', 'tick': 60, 'magnitude': 0.0}]
+    suppliers = [{'type': 'suppliers', 'tick': 10, 'magnitude': 0.5, 'duration': 4}]
+    df = stress_test([noop, suppliers, suppliers], {'ticks': 80}, workers=1, log=lambda *args: None)
+    row = df.iloc[0]
+    for column in RESILIENCE_COLUMNS:
+        assert row[f'{column}_trough'] == 0.0
+        assert row[f'{column}_recovery'] == 0.0
+        assert row[f'{column}_area'] == 0.0
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tis_abm.store import MISSING_INT, Store, load_results
+
+
+def _mean_run(ticks=300):
+    tick = np.arange(ticks)
+    return {'tick': tick, 'NumAIFactories': 50 + (tick % 4) / 4, 'GreenZones': 223.5 + tick,
+            'GovBudget': np.linspace(1000.0, 0.0, ticks)}
+
+
+@pytest.mark.parametrize('packed', [True, False])
+def test_fractional_means_round_trip(tmp_path, packed):
+    store = Store(str(tmp_path))
+    data = _mean_run()
+    run = store.append('ensemble', data, packed=packed)
+    out = Store(str(tmp_path)).read(run)
+    assert out['NumAIFactories'].dtype == np.float64
+    np.testing.assert_array_equal(out['NumAIFactories'], data['NumAIFactories'])
+    np.testing.assert_array_equal(out['GreenZones'], data['GreenZones'])
+    assert out['tick'].dtype == np.int32
+
+
+@pytest.mark.parametrize('packed', [True, False])
+def test_integral_counts_stay_integer(tmp_path, packed):
+    store = Store(str(tmp_path))
+    run = store.append('single', {'tick': np.arange(10), 'NumAIFactories': np.full(10, 50.0)}, packed=packed)
+    out = store.read(run)
+    assert out['NumAIFactories'].dtype == np.int32
+    assert (out['NumAIFactories'] == 50).all()
+
+
+def test_promoted_column_keeps_earlier_integer_runs(tmp_path):
+    store = Store(str(tmp_path))
+    counts = store.append('single', {'tick': np.arange(5), 'NumAIFactories': np.arange(5) + 40}, packed=False)
+    other = store.append('other', {'tick': np.arange(3)}, packed=False)
+    means = store.append('ensemble', {'tick': np.arange(5), 'NumAIFactories': np.arange(5) + 40.25},
+                         packed=False)
+    store = Store(str(tmp_path))
+    assert store.meta['columns']['NumAIFactories'] == 'float64'
+    before = store.read(counts)['NumAIFactories']
+    assert before.dtype == np.int32
+    np.testing.assert_array_equal(before, np.arange(5) + 40)
+    assert (store.read(other, ['NumAIFactories'])['NumAIFactories'] == MISSING_INT).all()
+    np.testing.assert_array_equal(store.read(means)['NumAIFactories'], np.arange(5) + 40.25)
+
+
+def test_load_results_keeps_ensemble_means(tmp_path):
+    pd.DataFrame({'tick': [0, 1], 'NumAIFactories': [50.75, 51.0], 'GreenZones': [223.5, 224.25]}).to_csv(
+        tmp_path / 'means.csv', index=False)
+    df = load_results('means', root=str(tmp_path / 'store'), directory=str(tmp_path))
+    assert df['NumAIFactories'].tolist() == [50.75, 51.0]
+    assert df['GreenZones'].tolist() == [223.5, 224.25]
+
+
+def test_same_named_csvs_in_different_folders_keep_their_own_data(tmp_path):
+    root = str(tmp_path / 'store')
+    for folder, value in (('Figure 4', 1.0), ('Figure 5', 2.0)):
+        (tmp_path / folder).mkdir()
+        pd.DataFrame({'tick': [0, 1], 'Demand': [value, value]}).to_csv(tmp_path / folder / 'data.csv', index=False)
+    for _ in range(2):
+        for folder, value in (('Figure 4', 1.0), ('Figure 5', 2.0)):
+            df = load_results('data', root=root, directory=str(tmp_path / folder))
+            assert df['Demand'].tolist() == [value, value]
+    store = Store(root)
+    assert len(store.find(scenario='data')) == 2
+    assert len(store.meta['runs']) == 2
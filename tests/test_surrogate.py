@@ -0,0 +1,12 @@
+import numpy as np
+
+from tis_abm.surrogate import Encoding
+
+
+def test_integer_parameters_follow_params_field_types():
+    encoding = Encoding.from_runs([{'beta': 1.0, 'max_generation': 2}, {'beta': 2.0, 'max_generation': 4}])
+    assert not encoding.numeric['beta'][2]
+    assert encoding.numeric['max_generation'][2]
+    points = encoding.sample(20, np.random.default_rng(0))
+    assert any(not float(p['beta']).is_integer() for p in points)
+    assert all(isinstance(p['max_generation'], int) for p in points)
@@ -0,0 +1,5 @@
+"""Headless NumPy implementation of the TIS smart green manufacturing ABM."""
+from .params import Params, POLICY_REGIMES, SCHEMA, policy_params, scale_world
+from .engine import init_state, step, simulate, run
+
+__all__ = ['Params', 'POLICY_REGIMES', 'SCHEMA', 'policy_params', 'scale_world', 'init_state', 'step', 'simulate', 'run']
@@ -0,0 +1,418 @@
+import argparse
+import json
+import os
+import time
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+from .params import Params, POLICY_REGIMES, SCHEMA, policy_params, scale_world
+from .engine import FLOAT_DTYPES, simulate, to_frame
+from .monitor import DEFAULT_ADDRESS, HTTP_PORT, MONITOR_ENV, publishers
+
+# Every other subsystem is imported by the subcommand that uses it, so a
+# single run does not pay for the sweep, calibration, surrogate, ... modules.
+# Their defaults are resolved there too (None on the command line).
+
+
+def _add_model_args(parser):
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--ticks', type=int, default=Params.ticks)
+    parser.add_argument('--record-every', type=int, default=Params.record_every)
+    parser.add_argument('--policy', choices=sorted(POLICY_REGIMES), default='dynamic')
+    parser.add_argument('--beta', type=float, default=Params.beta)
+    parser.add_argument('--shock-tick', type=int, default=None)
+    parser.add_argument('--grid-size', type=int, default=Params.grid_size,
+                        help='Patches per grid side; agent counts default to the baseline density')
+    parser.add_argument('--manufacturers', type=int, default=None, help='Initial number of manufacturers')
+    parser.add_argument('--suppliers', type=int, default=None, help='Initial number of suppliers')
+    parser.add_argument('--precision', choices=sorted(FLOAT_DTYPES), default=Params.precision,
+                        help="Storage precision of the float agent and patch state ('single' halves it)")
+    parser.add_argument('--rng', choices=['sequential', 'counter'], default=Params.rng,
+                        help="'counter' keys every draw by (seed, replicate, tick, mechanism), so results do not "
+                             "depend on batching")
+
+
+def _add_monitor_arg(parser):
+    parser.add_argument('--monitor', nargs='?', const=DEFAULT_ADDRESS, default=None, metavar='HOST:PORT',
+                        help='Stream every tick to a running "python -m tis_abm monitor" (frames are dropped, '
+                             'never waited for)')
+
+
+def _params_from_args(args):
+    overrides = dict(ticks=args.ticks, record_every=args.record_every, beta=args.beta,
+                     precision=args.precision, rng=args.rng)
+    if args.shock_tick is not None:
+        overrides['shock_tick'] = args.shock_tick
+    base = scale_world(grid_size=args.grid_size, manufacturers=args.manufacturers, suppliers=args.suppliers)
+    return policy_params(args.policy, base, **overrides)
+
+
+def _overrides(pairs):
+    """Parse KEY=VALUE pairs, reading values as JSON where possible (numbers, booleans)."""
+    overrides = {}
+    for pair in pairs:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise SystemExit(f"Expected KEY=VALUE, got {pair!r}")
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    return overrides
+
+
+def _surrogate(args, start):
+    from .surrogate import EMULATED_COLUMNS, Surrogate, fit_store, store_prediction
+
+    if args.action == 'fit':
+        surrogate = fit_store(args.root, columns=args.columns or EMULATED_COLUMNS, seed=args.seed)
+        surrogate.save(args.out)
+        print(f"Success: surrogate of {len(surrogate.X)} runs ({', '.join(surrogate.encoding.names)}) "
+              f"written to {args.out} in {time.perf_counter() - start:.2f} s")
+        return
+    surrogate = Surrogate.load(args.model)
+    if args.action == 'predict':
+        overrides = _overrides(args.set)
+        if args.scenario:
+            store_prediction(surrogate, args.scenario, overrides, root=args.store, noise=not args.mean_only)
+            print(f"Success: prediction stored as scenario '{args.scenario}' in {time.perf_counter() - start:.3f} s")
+            return
+        df = surrogate.frame(overrides, noise=not args.mean_only)
+        df.round(4).to_csv(args.out, index=False)
+        print(f"Success: {len(df)} predicted rows written to {args.out} in {time.perf_counter() - start:.3f} s")
+        return
+    points = surrogate.suggest(args.count, candidates=args.candidates, seed=args.seed)
+    spec = surrogate.sweep_spec(points, name=args.name, seeds=args.seeds)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(spec, f, indent=2)
+        f.write('\n')
+    print(f"Success: {len(points)} suggested runs written to {args.out}; run them with "
+          f"python -m tis_abm sweep {args.out} --out {surrogate.source['root'] if surrogate.source else '<store>'}")
+
+
+def _fiscal(args, start):
+    from .fiscal import FiscalRecorder, blend_regimes, coupled_params, inputs_from_table, regime_simplex, search
+
+    params = _params_from_args(args)
+    if args.table:
+        inputs, source = inputs_from_table(pd.read_csv(args.table), params), args.table
+    else:
+        recorder = FiscalRecorder(params)
+        simulate(params, args.seed, args.replicates, observers=[recorder])
+        inputs, source = recorder.inputs(), f'{args.replicates} recorded run(s)'
+    rules = blend_regimes(regime_simplex(args.steps))
+    df = search(inputs, rules, params).sort_values(args.sort, ascending=False).reset_index(drop=True)
+    print(f"Fiscal search: {len(rules)} rules replayed over {source} in {time.perf_counter() - start:.2f} s")
+    if args.couple:
+        # Re-run the leading rules inside the full model, all in one batch
+        top = df.head(args.couple).to_dict('records')
+        tables = simulate(coupled_params(params, top, args.replicates), args.seed, len(top) * args.replicates)
+        budget = tables[:, :, SCHEMA.index('GovBudget')].reshape(len(top), args.replicates, -1)
+        df.loc[:len(top) - 1, 'CoupledFinalBudget'] = budget[:, :, -1].mean(axis=1)
+        df.loc[:len(top) - 1, 'CoupledMinBudget'] = budget.min(axis=2).mean(axis=1)
+    df.round(4).to_csv(args.out, index=False)
+    print(f"Success: {len(df)} rules written to {args.out} in {time.perf_counter() - start:.2f} s")
+
+
+def _bench(args):
+    from .bench import BASELINE_FILE, SPEED_TOLERANCE, MEMORY_TOLERANCE, WORKLOADS
+    from .bench import compare, failures, load_report, run_suite, save_report
+
+    args.baseline = args.baseline or BASELINE_FILE
+    if args.speed_tolerance is None:
+        args.speed_tolerance = SPEED_TOLERANCE
+    if args.memory_tolerance is None:
+        args.memory_tolerance = MEMORY_TOLERANCE
+    print(f"Benchmarks: {len(args.workloads or WORKLOADS)} workload(s)")
+    report = run_suite(args.workloads or None)
+    save_report(report, args.out)
+    if args.update_baseline:
+        if os.path.exists(args.baseline):
+            # Keep baseline entries of workloads that were not rerun
+            baseline = load_report(args.baseline)
+            baseline['workloads'].update(report['workloads'])
+            report = dict(report, workloads=baseline['workloads'])
+        save_report(report, args.baseline)
+        print(f"Success: baseline written to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"Success: results written to {args.out} (no baseline at {args.baseline} to compare with)")
+        return
+    rows = compare(report, load_report(args.baseline), args.speed_tolerance, args.memory_tolerance)
+    for row in rows:
+        if row['status'] == 'new':
+            print(f"  {row['workload']:<20} new (not in baseline)")
+        else:
+            print(f"  {row['workload']:<20} {row['status']:<7} speed x{row['speed']:.2f}  memory x{row['memory']:.2f}")
+    failed = failures(rows)
+    if failed:
+        raise SystemExit(f"Failed: {len(failed)} workload(s) regressed against {args.baseline}: "
+                         f"{', '.join(row['workload'] for row in failed)}")
+    print(f"Success: results written to {args.out}, no regressions against the baseline")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m tis_abm', description='Headless TIS-ABM simulation runs.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_run = sub.add_parser('run', help='Single run written in the smart-green-manufacturing-data-v8.0.csv schema')
+    _add_model_args(p_run)
+    p_run.add_argument('--out', default='smart-green-manufacturing-data.csv')
+    p_run.add_argument('--grid-stream', default=None, help='Also record the green grid every tick to this file')
+    p_run.add_argument('--replicate', type=int, default=0,
+                       help='With --rng counter, run this replicate of the seed (as numbered in an ensemble)')
+    p_run.add_argument('--stop-at-threshold', action='store_true', help='Stop once SVI takeoff is confirmed')
+    p_run.add_argument('--clusters', action='store_true', help='Add green-cluster statistics (Pattern P2) columns')
+    p_run.add_argument('--profile', action='store_true',
+                       help='Add per-phase seconds and event counts since the previous row as columns')
+    p_run.add_argument('--profile-ticks', default=None, help='Also write per-tick profile rows to this CSV')
+    p_run.add_argument('--save-state', default=None,
+                       help='Write a snapshot of the final state (and the rows so far) to this .npz file')
+    p_run.add_argument('--resume', default=None,
+                       help='Continue from a snapshot written by --save-state, with the parameters given here')
+    _add_monitor_arg(p_run)
+
+    p_ens = sub.add_parser('ensemble', help='Replicate ensemble summarized as per-tick mean, std and quantile bands')
+    _add_model_args(p_ens)
+    p_ens.add_argument('--replicates', type=int, default=100)
+    p_ens.add_argument('--batch-size', type=int, default=64)
+    p_ens.add_argument('--out', default='ensemble-summary.csv')
+    _add_monitor_arg(p_ens)
+
+    p_sweep = sub.add_parser('sweep', help='Parallel, resumable parameter sweep from a JSON spec')
+    p_sweep.add_argument('spec', help='Sweep specification (see sweeps/*.json)')
+    p_sweep.add_argument('--out', default=None, help='Store directory (default: sweeps/<name>)')
+    p_sweep.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    _add_monitor_arg(p_sweep)
+
+    p_ing = sub.add_parser('ingest', help='Load NetLogo BehaviorSpace table output into the results store')
+    p_ing.add_argument('table', help='BehaviorSpace results CSV (table format)')
+    p_ing.add_argument('--store', default=None, help='Results store (default: $TIS_ABM_STORE or results/)')
+    p_ing.add_argument('--scenario', default=None, help='Scenario name (default: the experiment name)')
+    p_ing.add_argument('--map', nargs='*', default=[], metavar='REPORTER=COLUMN',
+                       help='Extra reporter mappings, e.g. "count turtles with [shape = \"factory\"]=NumAIFactories"')
+    p_ing.add_argument('--chunk-rows', type=int, default=None, help='Rows read per chunk (default: 100,000)')
+
+    p_mon = sub.add_parser('monitor', help='Live six-panel view of the runs publishing to it (browser or terminal)')
+    p_mon.add_argument('--listen', default=None, help=f'UDP host:port the runs publish to (default: {DEFAULT_ADDRESS})')
+    p_mon.add_argument('--http', type=int, default=HTTP_PORT, help='Dashboard port on 127.0.0.1')
+    p_mon.add_argument('--terminal', action='store_true', help='Draw sparklines in the terminal instead')
+    p_mon.add_argument('--refresh', type=float, default=1.0, help='Seconds between redraws')
+
+    p_shock = sub.add_parser('shocks', help='Stress test a batch of shock schedules and score their resilience')
+    p_shock.add_argument('spec', help='Shock specification (see sweeps/shock_stress.json)')
+    p_shock.add_argument('--out', default='shock-resilience.csv')
+    p_shock.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+
+    p_gsa = sub.add_parser('sensitivity', help='Global sensitivity analysis (Sobol or Morris) from a JSON spec')
+    p_gsa.add_argument('spec', help='Sensitivity specification (see sweeps/gsa_table2.json)')
+    p_gsa.add_argument('--method', choices=['sobol', 'morris'], default=None, help="Override the spec's method")
+    p_gsa.add_argument('--samples', type=int, default=None,
+                       help="Override the spec's Sobol rows or Morris trajectories")
+    p_gsa.add_argument('--out', default='sensitivity', help='Prefix of the <out>-runs.csv and <out>-indices.csv files')
+    p_gsa.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+
+    p_fis = sub.add_parser('fiscal', help='Replay blends of the Table 7 policy regimes through the fiscal loop')
+    _add_model_args(p_fis)
+    p_fis.add_argument('--replicates', type=int, default=8, help='Recorded runs to replay against')
+    p_fis.add_argument('--table', default=None, help='Replay against an exported CSV instead of recorded runs')
+    p_fis.add_argument('--steps', type=int, default=20, help='Simplex resolution: (steps+1)(steps+2)/2 rules')
+    p_fis.add_argument('--sort', default='MinBudget', help='Metric to rank the rules by (descending)')
+    p_fis.add_argument('--couple', type=int, default=0, help='Re-run this many leading rules in the full model')
+    p_fis.add_argument('--out', default='fiscal-search.csv')
+
+    p_cal = sub.add_parser('calibrate', help='Fit parameters to the P1-P4 pattern statistics of reference runs')
+    p_cal.add_argument('spec', help='Calibration specification (see sweeps/calibrate_patterns.json)')
+    p_cal.add_argument('--out', default='calibration',
+                       help='Prefix of the <out>-evaluations.csv and <out>-best.json files')
+    p_cal.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+
+    p_sur = sub.add_parser('surrogate', help='Emulator of run trajectories trained on a sweep store')
+    sur = p_sur.add_subparsers(dest='action', required=True)
+    p_fit = sur.add_parser('fit', help='Train on every run of a sweep store')
+    p_fit.add_argument('root', help='Sweep store directory (e.g. sweeps/beta_spillover_policy)')
+    p_fit.add_argument('--columns', nargs='+', default=None, help='Columns to emulate (default: the six headline series)')
+    p_fit.add_argument('--seed', type=int, default=None)
+    p_fit.add_argument('--out', default='surrogate.npz')
+    p_pred = sur.add_parser('predict', help='Predicted trajectories with 5-95% bands for one parameter point')
+    p_pred.add_argument('model', help='Surrogate written by "surrogate fit"')
+    p_pred.add_argument('--set', nargs='*', default=[], metavar='KEY=VALUE', help='e.g. beta=1.5 spillover_radius=4')
+    p_pred.add_argument('--mean-only', action='store_true', help='Bands for the mean trajectory, not for one run')
+    p_pred.add_argument('--out', default='surrogate-prediction.csv')
+    p_pred.add_argument('--scenario', default=None,
+                        help='Store the prediction under this scenario name instead, for the Figure scripts')
+    p_pred.add_argument('--store', default=None, help='Results store for --scenario (default: $TIS_ABM_STORE or results/)')
+    p_sug = sur.add_parser('suggest', help='Sweep spec of the runs that would improve the emulator most')
+    p_sug.add_argument('model', help='Surrogate written by "surrogate fit"')
+    p_sug.add_argument('--count', type=int, default=8)
+    p_sug.add_argument('--candidates', type=int, default=1000)
+    p_sug.add_argument('--seed', type=int, default=None)
+    p_sug.add_argument('--seeds', type=int, nargs='+', default=[1], help='Seeds to run every suggested point with')
+    p_sug.add_argument('--name', default='surrogate_next')
+    p_sug.add_argument('--out', default='surrogate-next.json')
+
+    p_fig = sub.add_parser('figures', help='Render every out-of-date Figure script in parallel (Agg backend)')
+    p_fig.add_argument('scripts', nargs='*', help='Scripts to consider (default: all, e.g. "Figure 4/Figure 4.py")')
+    p_fig.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    p_fig.add_argument('--force', action='store_true', help='Render even if inputs are unchanged')
+
+    p_bench = sub.add_parser('bench', help='Performance benchmarks compared with a stored baseline')
+    p_bench.add_argument('workloads', nargs='*', help='Workloads to run (default: all of tis_abm.bench.WORKLOADS)')
+    p_bench.add_argument('--out', default='bench-results.json')
+    p_bench.add_argument('--baseline', default=None, help='Baseline report (default: benchmarks/baseline.json)')
+    p_bench.add_argument('--update-baseline', action='store_true', help='Store these results as the new baseline')
+    p_bench.add_argument('--speed-tolerance', type=float, default=None, help='Allowed slowdown (default: 0.25)')
+    p_bench.add_argument('--memory-tolerance', type=float, default=None, help='Allowed memory growth (default: 0.20)')
+
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    if getattr(args, 'monitor', None):
+        # Set for the sweep's worker processes too
+        os.environ[MONITOR_ENV] = args.monitor
+    if args.command == 'monitor':
+        from .monitor import Monitor, serve, watch
+
+        monitor = Monitor(args.listen).start()
+        host, port = monitor.address
+        try:
+            if args.terminal:
+                watch(monitor, args.refresh)
+            else:
+                print(f"Monitoring {host}:{port}; dashboard on http://127.0.0.1:{args.http}/ (Ctrl-C to stop)")
+                serve(monitor, args.http, refresh=args.refresh)
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.command == 'bench':
+        _bench(args)
+        return
+    if args.command == 'surrogate':
+        _surrogate(args, start)
+        return
+    if args.command == 'ingest':
+        from .ingest import CHUNK_ROWS, ingest
+
+        mapping = {}
+        for pair in args.map:
+            reporter, sep, column = pair.rpartition('=')
+            if not sep or column not in SCHEMA:
+                parser.error(f"--map expects REPORTER=COLUMN with a column of {SCHEMA}, got {pair!r}")
+            mapping[reporter] = column
+        ingest(args.table, args.store, args.scenario, mapping, args.chunk_rows or CHUNK_ROWS)
+        print(f"Success: ingested in {time.perf_counter() - start:.2f} s")
+        return
+    if args.command == 'figures':
+        from .build import build
+
+        built, failed = build(args.scripts or None, workers=args.workers, force=args.force)
+        if failed:
+            raise SystemExit(f"Failed: {len(failed)} figure script(s) did not render: {', '.join(failed)}")
+        print(f"Success: {len(built)} figure script(s) rendered in {time.perf_counter() - start:.2f} s")
+        return
+    if args.command == 'shocks':
+        from .shocks import load_scenarios, stress_test
+        from .sweep import load_spec
+
+        spec = load_spec(args.spec)
+        names, schedules = load_scenarios(spec)
+        print(f"Shocks '{spec.get('name', args.spec)}': {len(schedules)} schedules x {len(spec.get('seeds', [1]))} seed(s)")
+        df = stress_test(schedules, spec.get('base'), seeds=spec.get('seeds', [1]), names=names,
+                         batch_size=spec.get('batch_size', 128), workers=args.workers)
+        df.round(4).to_csv(args.out, index=False)
+        print(f"Success: resilience of {len(df)} runs written to {args.out} in {time.perf_counter() - start:.2f} s")
+        return
+    if args.command == 'sensitivity':
+        from .sensitivity import analyze
+        from .sweep import load_spec
+
+        spec = load_spec(args.spec)
+        spec.update({k: v for k, v in dict(method=args.method, samples=args.samples).items() if v is not None})
+        runs, indices = analyze(spec, workers=args.workers)
+        runs.round(6).to_csv(f'{args.out}-runs.csv', index=False)
+        indices.round(4).to_csv(f'{args.out}-indices.csv', index=False)
+        print(f"Success: indices of {len(runs)} runs written to {args.out}-indices.csv "
+              f"in {time.perf_counter() - start:.2f} s")
+        return
+    if args.command == 'fiscal':
+        _fiscal(args, start)
+        return
+    if args.command == 'calibrate':
+        from .calibration import calibrate
+        from .sweep import load_spec
+
+        spec = load_spec(args.spec)
+        df, best, targets = calibrate(spec, os.path.dirname(os.path.abspath(args.spec)), workers=args.workers)
+        df.round(6).to_csv(f'{args.out}-evaluations.csv', index=False)
+        top = df.loc[df['distance'].idxmin()]
+        for name, target in targets.items():
+            print(f"  {name:<28} target {target:>10.4f}  best {top[name]:>10.4f}")
+        with open(f'{args.out}-best.json', 'w', encoding='utf-8') as f:
+            json.dump(dict(name=spec.get('name', 'calibrated'), distance=float(top['distance']), params=best),
+                      f, indent=2)
+            f.write('\n')
+        print(f"Success: best of {len(df)} candidates (distance {top['distance']:.4f}) written to "
+              f"{args.out}-best.json in {time.perf_counter() - start:.2f} s")
+        return
+    if args.command == 'sweep':
+        from .sweep import load_spec, run_sweep
+
+        spec = load_spec(args.spec)
+        root = run_sweep(spec, args.out or os.path.join('sweeps', spec.get('name', 'sweep')), args.workers)
+        print(f"Success: sweep stored in {root} after {time.perf_counter() - start:.2f} s")
+        return
+    if args.command == 'run':
+        from .checkpoint import Snapshot, check_compatible, join, load_state, save_state
+        from .clusters import ClusterTracker
+        from .gridstream import GridStreamWriter
+        from .profiling import Profiler
+        from .threshold import ThresholdDetector
+
+        if args.resume and args.stop_at_threshold:
+            # The detector needs the run's history from tick 0 to establish its baseline
+            parser.error('--stop-at-threshold cannot be combined with --resume')
+        if args.replicate and args.rng != 'counter':
+            parser.error('--replicate needs --rng counter')
+        detector = ThresholdDetector(stop=args.stop_at_threshold)
+        tracker = ClusterTracker()
+        profiler = Profiler()
+        profiled = args.profile or args.profile_ticks
+        observers = ([detector] + ([tracker] if args.clusters else []) + ([profiler] if profiled else [])
+                     + publishers('run', args.replicate))
+        params, state, history = _params_from_args(args), None, None
+        if args.resume:
+            state, _, history = load_state(args.resume)
+            check_compatible(state, params)
+        keep = Snapshot()
+        with GridStreamWriter(args.grid_stream) if args.grid_stream else nullcontext() as writer:
+            table = simulate(params, args.seed, observers=observers + [keep] + ([writer] if writer else []),
+                             state=state, first_replicate=args.replicate)
+        if history is not None:
+            table = join(history, table, params.record_every)
+        if args.save_state:
+            save_state(keep.state, args.save_state, params, table)
+        df = to_frame(table[0])
+        if args.clusters:
+            for column, values in tracker.columns(df['tick']).items():
+                df[column] = np.round(values, 4)
+        if args.profile:
+            for column, values in profiler.columns(df['tick']).items():
+                df[column] = np.round(values, 6)
+        if args.profile_ticks:
+            profiler.frame().round(6).to_csv(args.profile_ticks, index=False)
+        threshold = detector.result()
+        if threshold['crossed'] and not args.resume:
+            print(f"SVI threshold crossed at tick {threshold['tick']} (SVI = {threshold['svi']:.4f}, "
+                  f"confidence {threshold['confidence']:.2f})")
+    elif args.command == 'ensemble':
+        from .ensemble import ensemble
+
+        df = ensemble(_params_from_args(args), seed=args.seed, replicates=args.replicates,
+                      batch_size=args.batch_size)
+    df.to_csv(args.out, index=False)
+    print(f"Success: {len(df)} rows written to {args.out} in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
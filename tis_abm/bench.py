@@ -0,0 +1,173 @@
+import json
+import os
+import platform
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from .engine import footprint, simulate
+from .params import policy_params, scale_world
+from .profiling import Profiler
+
+# ==================== Performance Benchmarks ====================
+# Each workload runs in a fresh worker process, one at a time, so its peak RSS
+# is its own and no two workloads compete for cores.  Per workload:
+#
+#   ticks_per_sec      simulated ticks per wall-clock second (median of ``repeat``)
+#   peak_rss_mb        peak resident set size of the worker process
+#   bytes_per_slot     growth of the RSS over the imported-but-idle worker,
+#                      divided by the agent slots allocated (R * capacities)
+#   state_bytes_per_slot
+#                      bytes held by the state arrays alone per agent slot
+#                      (engine.footprint); the rest of the RSS growth is the
+#                      working arrays of one tick
+#   state_bytes_per_live_agent
+#                      the same bytes per live agent at the end of the run,
+#                      which depends on how full the slots are
+#   mechanisms         share of the run spent in each phase of the tick
+#                      (see tis_abm.profiling; 'Other' is recording and observers)
+#
+# Results are written as JSON and compared with a stored baseline: a workload
+# fails when it is slower or uses more memory than the baseline beyond the
+# tolerance.  Workloads that take under SHORT_SECONDS are timed against the
+# wider SHORT_SPEED_TOLERANCE, since scheduler noise is a larger share of
+# them.  Baselines are machine-specific; refresh them with --update-baseline
+# on the machine that runs the nightly sweeps.
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'benchmarks', 'baseline.json')
+
+# Allowed relative slowdown in ticks/sec and growth in peak RSS before a workload fails
+SPEED_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.20
+
+# Baseline run time below which a workload counts as short, and its speed tolerance
+SHORT_SECONDS = 2.0
+SHORT_SPEED_TOLERANCE = 0.40
+
+# name -> grid size, replicates, ticks, extra parameters, repeats
+WORKLOADS = {
+    'baseline': dict(grid_size=33, replicates=1, ticks=500, repeat=5),
+    'shock': dict(grid_size=33, replicates=1, ticks=500, overrides=dict(shock_tick=200), repeat=5),
+    'ensemble-16': dict(grid_size=33, replicates=16, ticks=200, repeat=3),
+    'ensemble-64': dict(grid_size=33, replicates=64, ticks=100, repeat=3),
+    'ensemble-256': dict(grid_size=33, replicates=256, ticks=50, repeat=3),
+    'ensemble-256-single': dict(grid_size=33, replicates=256, ticks=50, overrides=dict(precision='single'),
+                                repeat=3),
+    'grid-100': dict(grid_size=100, replicates=1, ticks=200, repeat=3),
+    'grid-300': dict(grid_size=300, replicates=1, ticks=50, repeat=3),
+    'grid-1000': dict(grid_size=1000, replicates=1, ticks=20, repeat=3),
+}
+
+
+def _peak_rss_bytes():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+def _current_rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return _peak_rss_bytes()
+
+
+def workload_params(spec):
+    base = scale_world(grid_size=spec['grid_size'])
+    return policy_params('dynamic', base, ticks=spec['ticks'], **spec.get('overrides', {}))
+
+
+def run_workload(spec, seed=1):
+    """Run one workload in this process and return its measurements."""
+    p = workload_params(spec)
+    R = spec['replicates']
+    idle_rss = _current_rss_bytes()
+    runs = []
+    final = {}
+    for _ in range(spec.get('repeat', 1)):
+        profiler = Profiler()
+        start = time.perf_counter()
+        simulate(p, seed, R, observers=[profiler, lambda state: final.update(state=state)])
+        seconds = time.perf_counter() - start
+        runs.append((seconds, profiler.totals(), profiler.ticks[-1] if profiler.ticks else 0))
+    # The median run: robust to one slow or unusually fast repeat
+    best, best_timings, ticks = sorted(runs, key=lambda run: run[0])[len(runs) // 2]
+    peak_rss = _peak_rss_bytes()
+    sizes = footprint(final['state'])
+    slots = R * (p.max_manufacturers + p.max_suppliers)
+    best_timings['Other'] = max(0.0, best - sum(best_timings.values()))
+    return dict(
+        grid_size=p.grid_size, replicates=R, ticks=ticks, agents=R * (p.n_manufacturers + p.n_suppliers),
+        seconds=round(best, 4), ticks_per_sec=round(ticks / best, 3),
+        replicate_ticks_per_sec=round(R * ticks / best, 3),
+        peak_rss_mb=round(peak_rss / 2 ** 20, 2),
+        bytes_per_slot=round(max(0, peak_rss - idle_rss) / slots, 1),
+        state_bytes_per_slot=round(sizes['bytes_per_slot'], 1),
+        state_bytes_per_live_agent=round(sizes['bytes_per_agent'], 1),
+        mechanisms={k: round(v / best, 4) for k, v in sorted(best_timings.items())},
+    )
+
+
+def machine():
+    return dict(platform=platform.platform(), python=platform.python_version(), numpy=np.__version__,
+                processor=platform.processor() or platform.machine(), cpus=os.cpu_count())
+
+
+def run_suite(names=None, log=print):
+    """Run the named workloads (default: all), each in a fresh worker process."""
+    names = names or list(WORKLOADS)
+    unknown = sorted(set(names) - set(WORKLOADS))
+    if unknown:
+        raise ValueError(f"Unknown workload(s) {unknown}; expected some of {list(WORKLOADS)}")
+    results = {}
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results[name] = pool.submit(run_workload, WORKLOADS[name]).result()
+        r = results[name]
+        log(f"  {name:<20} {r['ticks_per_sec']:>9.1f} ticks/s  {r['peak_rss_mb']:>8.1f} MB peak  "
+            f"{r['bytes_per_slot']:>8.1f} B/slot  {r['state_bytes_per_slot']:>6.1f} B/slot "
+            f"{r['state_bytes_per_live_agent']:>6.1f} B/agent state")
+    return dict(created=datetime.now(timezone.utc).isoformat(timespec='seconds'), machine=machine(),
+                workloads=results)
+
+
+# ==================== Baseline Comparison ====================
+def load_report(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_report(report, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(report, baseline, speed_tolerance=SPEED_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """Per-workload comparison with a baseline report; a list of dicts with a ``status``.
+
+    Status is 'slower' or 'memory' (failures), 'ok', or 'new' when the baseline
+    has no such workload.  Short workloads get at least SHORT_SPEED_TOLERANCE.
+    """
+    rows = []
+    for name, r in report['workloads'].items():
+        b = baseline['workloads'].get(name)
+        if b is None:
+            rows.append(dict(workload=name, status='new'))
+            continue
+        speed = r['ticks_per_sec'] / b['ticks_per_sec']
+        memory = r['peak_rss_mb'] / b['peak_rss_mb']
+        tolerance = max(speed_tolerance, SHORT_SPEED_TOLERANCE) if b['seconds'] < SHORT_SECONDS else speed_tolerance
+        status = 'slower' if speed < 1 - tolerance else 'memory' if memory > 1 + memory_tolerance else 'ok'
+        rows.append(dict(workload=name, status=status, speed=round(speed, 3), memory=round(memory, 3)))
+    return rows
+
+
+def failures(rows):
+    return [row for row in rows if row['status'] in ('slower', 'memory')]
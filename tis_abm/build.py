@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import runpy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .store import Store
+
+# ==================== Figure Build ====================
+# Every top-level folder holding a .py script is a figure.  Each script runs in
+# its own worker process under the non-interactive Agg backend, from its own
+# folder, exactly as `python "Figure 4.py"` would.  While it runs, an audit
+# hook records what it actually reads:
+#
+#   files       every file opened for reading inside the repository (CSVs, grid
+#               streams, the script itself) plus the tis_abm modules it uses
+#   scenarios   every (store, scenario) read through the results store, with the
+#               source CSV of imported scenarios counted as a file
+#
+# .figure-cache.json keeps, per script, the hashes of those inputs, the outputs
+# written and the file names in its folder.  A figure is rendered again only
+# when an input changed, a file appeared in its folder or an output is missing,
+# so editing one CSV rebuilds only the figures that read it.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_FILE = '.figure-cache.json'
+
+# Top-level folders that never hold figure scripts
+EXCLUDED_DIRS = {'tis_abm', 'tests', 'sweeps', 'results', 'figures', 'benchmarks'}
+
+
+def discover(root=REPO_ROOT):
+    """Paths of every figure script, relative to ``root``."""
+    scripts = []
+    for entry in sorted(os.listdir(root)):
+        folder = os.path.join(root, entry)
+        if entry.startswith('.') or entry in EXCLUDED_DIRS or not os.path.isdir(folder):
+            continue
+        scripts.extend(os.path.join(entry, name) for name in sorted(os.listdir(folder)) if name.endswith('.py'))
+    return scripts
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(files, scenarios, root=REPO_ROOT):
+    """Content hashes of input files and live run ids of input scenarios (None when missing)."""
+    hashes = {}
+    for rel in files:
+        path = os.path.join(root, rel)
+        hashes[rel] = file_hash(path) if os.path.isfile(path) else None
+    runs = {}
+    for store_root, scenario in scenarios:
+        store = Store(os.path.join(root, store_root))
+        runs[f'{store_root}::{scenario}'] = [run['run'] for run in store.find(scenario=scenario)]
+    return {'files': hashes, 'scenarios': runs}
+
+
+def listing(script, outputs, root=REPO_ROOT):
+    """Files next to a script other than its outputs; a new data file there triggers a rebuild."""
+    folder = os.path.dirname(script)
+    return sorted(name for name in os.listdir(os.path.join(root, folder))
+                  if os.path.isfile(os.path.join(root, folder, name))
+                  and os.path.join(folder, name) not in outputs)
+
+
+# ==================== Worker ====================
+def _relative(path, root):
+    path = os.path.abspath(os.fsdecode(path))
+    rel = os.path.relpath(path, root)
+    return None if rel.startswith('..') else rel
+
+
+def _is_write(mode, flags):
+    if isinstance(mode, str):
+        return any(c in mode for c in 'wax+')
+    return bool(flags & (os.O_WRONLY | os.O_RDWR | os.O_CREAT))
+
+
+def render(script, root=REPO_ROOT):
+    """Run one figure script headlessly and report what it read and wrote."""
+    import matplotlib
+    matplotlib.use('Agg')
+
+    reads, writes, scenarios, stores = set(), set(), set(), set()
+
+    def audit(event, args):
+        if event == 'open' and isinstance(args[0], (str, bytes, os.PathLike)):
+            rel = _relative(args[0], root)
+            if rel is not None:
+                mode, flags = args[1], args[2] if len(args) > 2 else 0
+                (writes if _is_write(mode, flags or 0) else reads).add(rel)
+        elif event == 'tis_abm.store.read':
+            store_root, run = args
+            stores.add(os.path.abspath(store_root))
+            scenarios.add((_relative(store_root, root) or os.path.abspath(store_root), run['scenario']))
+            source = run['params'].get('source')
+            if source and _relative(source, root) is not None:
+                reads.add(_relative(source, root))
+
+    path = os.path.join(root, script)
+    sys.addaudithook(audit)
+    os.chdir(os.path.dirname(path))
+    sys.argv = [path]
+    start = time.perf_counter()
+    namespace = runpy.run_path(path, run_name='__main__')
+    seconds = time.perf_counter() - start
+
+    # tis_abm helpers the script used (already imported, so not seen as opens)
+    for value in namespace.values():
+        module = sys.modules.get(getattr(value, '__module__', None) or '')
+        if module is not None and module.__name__.startswith('tis_abm'):
+            reads.add(_relative(module.__file__, root))
+
+    def in_store(rel):
+        return any(os.path.join(root, rel).startswith(s + os.sep) for s in stores)
+
+    def keep(rel):
+        return (os.path.isfile(os.path.join(root, rel)) and '__pycache__' not in rel
+                and rel not in writes and not in_store(rel))
+
+    def keep_output(rel):
+        return not in_store(rel) and not rel.endswith('.tmp')
+
+    return dict(script=script, seconds=seconds,
+                inputs=sorted({script} | {r for r in reads if keep(r)}),
+                scenarios=sorted(scenarios),
+                outputs=sorted(w for w in writes if keep_output(w)))
+
+
+# ==================== Build ====================
+def load_cache(root=REPO_ROOT):
+    path = os.path.join(root, CACHE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_cache(cache, root):
+    path = os.path.join(root, CACHE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def is_current(entry, root=REPO_ROOT):
+    """Whether a cached build of a script is still valid."""
+    if not entry or not all(os.path.exists(os.path.join(root, out)) for out in entry['outputs']):
+        return False
+    if listing(entry['script'], entry['outputs'], root) != entry['listing']:
+        return False
+    files = list(entry['fingerprint']['files'])
+    scenarios = [tuple(key.split('::', 1)) for key in entry['fingerprint']['scenarios']]
+    return fingerprint(files, scenarios, root) == entry['fingerprint']
+
+
+def build(scripts=None, root=REPO_ROOT, workers=None, force=False, log=print):
+    """Render every out-of-date figure script in parallel; returns (rendered, failed) scripts."""
+    cache = load_cache(root)
+    scripts = scripts or discover(root)
+    todo = [s for s in scripts if force or not is_current(cache.get(s), root)]
+    log(f"Figures: {len(scripts)} scripts, {len(scripts) - len(todo)} up to date")
+    if not todo:
+        return [], []
+
+    built, failed = [], []
+    # One fresh process per script: scripts set global rcParams and chdir
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, max_tasks_per_child=1) as pool:
+        futures = {pool.submit(render, script, root): script for script in todo}
+        for future in as_completed(futures):
+            script = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                cache.pop(script, None)
+                failed.append(script)
+                log(f"  {script} failed: {exc!r}")
+                continue
+            result['fingerprint'] = fingerprint(result['inputs'], result['scenarios'], root)
+            result['listing'] = listing(script, result['outputs'], root)
+            cache[script] = result
+            _save_cache(cache, root)
+            built.append(script)
+            log(f"  {script} ({result['seconds']:.2f} s) -> {', '.join(result['outputs'])}")
+    return built, failed
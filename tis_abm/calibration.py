@@ -0,0 +1,306 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .clusters import ClusterTracker
+from .engine import reporters, simulate, to_frame
+from .params import Params
+from .sensitivity import sobol
+from .sweep import make_params
+
+# ==================== Pattern Statistics (P1-P4) ====================
+# Summary statistics of one recorded trajectory, computed the same way for a
+# reference table (a NetLogo export, a sweep run) and for a candidate run:
+#
+#   P1 S-curve adoption      GreenMidpoint, AIGenMidpoint (first tick halfway
+#                            from the initial to the final level), GreenFinal
+#                            (final coverage ratio), AIGenFinal
+#   P2 spatial clustering    LargestClusterShare at the end (only for tables
+#                            with the cluster columns; candidate runs then
+#                            track clusters too)
+#   P3 demand takeoff        DemandTakeoffTick (first tick with Demand at
+#                            TAKEOFF_RATIO times its start), DemandGrowth
+#                            (final over initial demand)
+#   P4 resilience            ShockTrough (deepest GreenZones loss within
+#                            SHOCK_WINDOW ticks of the shock, relative to the
+#                            last row before it), ShockRecovery (ticks until
+#                            the pre-shock level is regained); only with a
+#                            shock tick
+#
+# Events that never happen count as one tick past the last recorded row, so
+# the statistics depend on the tick grid: candidate runs are subsampled to the
+# ticks of the experiment's reference table before they are compared.
+
+STATISTICS = ['GreenMidpoint', 'AIGenMidpoint', 'GreenFinal', 'AIGenFinal', 'LargestClusterShare',
+              'DemandTakeoffTick', 'DemandGrowth', 'ShockTrough', 'ShockRecovery']
+
+TAKEOFF_RATIO = 1.5
+SHOCK_WINDOW = 60
+
+# Distance contribution of a target statistic a candidate run could not produce
+MISSING_PENALTY = 10.0
+
+
+def _first_tick(ticks, reached):
+    hits = np.flatnonzero(reached)
+    return float(ticks[hits[0]]) if len(hits) else float(ticks[-1] + 1)
+
+
+def _midpoint(ticks, values):
+    if abs(values[-1] - values[0]) < 1e-9:
+        return float(ticks[-1] + 1)
+    half = values[0] + 0.5 * (values[-1] - values[0])
+    return _first_tick(ticks, (values - half) * np.sign(values[-1] - values[0]) >= 0)
+
+
+def pattern_statistics(df, shock_tick=None):
+    """Dict of STATISTICS for one trajectory table (NaN where the table cannot tell)."""
+    df = df.sort_values('tick')
+    ticks = df['tick'].to_numpy()
+    patches = df['Patches'].to_numpy()[-1] if 'Patches' in df.columns else Params().grid_size ** 2
+    green = df['GreenZones'].to_numpy() / patches
+    gen = df['AvgAIGen'].to_numpy()
+    demand = df['Demand'].to_numpy()
+    stats = dict(GreenMidpoint=_midpoint(ticks, green), AIGenMidpoint=_midpoint(ticks, gen),
+                 GreenFinal=float(green[-1]), AIGenFinal=float(gen[-1]),
+                 LargestClusterShare=float(df['LargestClusterShare'].iloc[-1])
+                 if 'LargestClusterShare' in df.columns else np.nan,
+                 DemandTakeoffTick=_first_tick(ticks, demand >= TAKEOFF_RATIO * demand[0]),
+                 DemandGrowth=float(demand[-1] / max(demand[0], 1e-9)),
+                 ShockTrough=np.nan, ShockRecovery=np.nan)
+    if shock_tick is not None and shock_tick >= 0 and (ticks < shock_tick).any():
+        zones = df['GreenZones'].to_numpy()
+        before = zones[ticks < shock_tick][-1]
+        window = (ticks >= shock_tick) & (ticks <= shock_tick + SHOCK_WINDOW)
+        if window.any():
+            stats['ShockTrough'] = float(max(0.0, 1.0 - zones[window].min() / max(before, 1e-9)))
+            after = ticks >= shock_tick
+            stats['ShockRecovery'] = _first_tick(ticks[after], zones[after] >= before) - shock_tick
+    return stats
+
+
+def reference_statistics(path, shock_tick=None):
+    """Pattern statistics of a reference CSV (e.g. smart-green-manufacturing-data-v8.0.csv)."""
+    return pattern_statistics(pd.read_csv(path), shock_tick)
+
+
+def reference_table(experiment, spec_dir='.'):
+    """An experiment's reference CSV as a DataFrame (None when it has none)."""
+    if not experiment.get('reference'):
+        return None
+    return pd.read_csv(os.path.join(spec_dir, experiment['reference']))
+
+
+# ==================== Early Rejection ====================
+class EarlyRejection:
+    """Observer stopping a run that is clearly stagnant.
+
+    At ``tick`` the run is rejected when any column in ``min_growth`` has
+    grown less than its relative threshold since tick 0 in every replicate.
+    """
+
+    def __init__(self, tick=150, min_growth=None):
+        self.tick = tick
+        self.min_growth = min_growth or {'AvgAIGen': 0.02, 'Demand': 0.05}
+        self.start = None
+        self.rejected = False
+
+    def __call__(self, state):
+        if self.start is None:
+            self.start = reporters(state)
+            return False
+        if state.tick != self.tick:
+            return False
+        self.rejected = self._stagnant(self.start, reporters(state))
+        return self.rejected
+
+    def _stagnant(self, start, now):
+        return any(
+            not ((np.asarray(now[column]) - start[column]) / np.maximum(np.abs(start[column]), 1e-9)
+                 >= threshold).any()
+            for column, threshold in self.min_growth.items())
+
+    def rejects(self, df):
+        """Whether a recorded table (e.g. a reference CSV) would be rejected, judged at its last row up to ``tick``."""
+        rows = df.sort_values('tick')
+        rows = rows[rows['tick'] <= self.tick]
+        if len(rows) < 2 or any(column not in rows.columns for column in self.min_growth):
+            return False
+        return self._stagnant(rows.iloc[0], rows.iloc[-1])
+
+
+# ==================== Objective ====================
+def experiment_targets(experiment, spec_dir='.'):
+    """Target statistics of one experiment: its reference CSV's, updated by explicit "targets"."""
+    targets = {}
+    if experiment.get('reference'):
+        path = os.path.join(spec_dir, experiment['reference'])
+        targets = reference_statistics(path, experiment.get('base', {}).get('shock_tick'))
+    targets.update(experiment.get('targets', {}))
+    keep = experiment.get('statistics')
+    return {k: float(v) for k, v in targets.items() if np.isfinite(v) and (keep is None or k in keep)}
+
+
+def evaluate(overrides, experiments, seeds, reject=None):
+    """Distance of one candidate to every experiment's targets, and its statistics.
+
+    Each experiment runs ``seeds`` as replicates of one simulation; the
+    statistics are averaged over replicates, each computed on the rows at the
+    experiment's reference ``ticks`` when it has them.  The distance is the root mean
+    square of (statistic - target) / scale over all targets, where the scale
+    is the target's magnitude (at least 1 for tick counts).  A run stopped by
+    early rejection gets an infinite distance.
+    """
+    squares, stats = [], {}
+    for i, experiment in enumerate(experiments):
+        base = experiment.get('base', {})
+        p = make_params({**base, **overrides})
+        targets = experiment['targets']
+        tracker = ClusterTracker() if 'LargestClusterShare' in targets else None
+        rejection = EarlyRejection(**reject) if reject else None
+        observers = [o for o in (tracker, rejection) if o is not None]
+        tables = simulate(p, np.random.SeedSequence(list(seeds)), replicates=len(seeds), observers=observers)
+        if rejection is not None and rejection.rejected:
+            return np.inf, dict(stats, rejected=True)
+        per_run = []
+        for r, table in enumerate(tables):
+            df = to_frame(table)
+            if experiment.get('ticks') is not None:
+                df = df[df['tick'].isin(experiment['ticks'])].reset_index(drop=True)
+            if tracker is not None:
+                df['LargestClusterShare'] = tracker.columns(df['tick'], r)['LargestClusterShare']
+            per_run.append(pattern_statistics(df, p.shock_tick))
+        mean = pd.DataFrame(per_run).mean()
+        for name, target in targets.items():
+            value = mean[name]
+            stats[f"{experiment.get('name', i)}.{name}"] = value
+            scale = max(abs(target), 1.0 if name.endswith(('Tick', 'Midpoint', 'Recovery')) else 1e-9)
+            squares.append(MISSING_PENALTY ** 2 if not np.isfinite(value) else ((value - target) / scale) ** 2)
+    return float(np.sqrt(np.mean(squares))), dict(stats, rejected=False)
+
+
+def _evaluate_unit(unit, factors, experiments, seeds, reject):
+    lows = np.array([lo for lo, _ in factors.values()])
+    highs = np.array([hi for _, hi in factors.values()])
+    overrides = dict(zip(factors, map(float, lows + np.clip(unit, 0.0, 1.0) * (highs - lows))))
+    distance, stats = evaluate(overrides, experiments, seeds, reject)
+    return overrides, distance, stats
+
+
+# ==================== Search ====================
+def _run_batch(pool, units, factors, experiments, seeds, reject):
+    futures = [pool.submit(_evaluate_unit, u, factors, experiments, seeds, reject) for u in units]
+    return [f.result() for f in futures]
+
+
+def _records(results, **labels):
+    return [dict(labels, **overrides, distance=distance, **stats) for overrides, distance, stats in results]
+
+
+def cma_es(pool, factors, experiments, seeds, reject, generations=20, population=None, sigma=0.3,
+           seed=None, log=print):
+    """Minimize the distance with CMA-ES in the unit box of the factors (Hansen's standard settings)."""
+    n = len(factors)
+    rng = np.random.default_rng(seed)
+    lam = population or 4 + int(3 * np.log(n))
+    mu = lam // 2
+    weights = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+    weights /= weights.sum()
+    mu_eff = 1.0 / (weights ** 2).sum()
+    c_sigma = (mu_eff + 2) / (n + mu_eff + 5)
+    d_sigma = 1 + 2 * max(0.0, np.sqrt((mu_eff - 1) / (n + 1)) - 1) + c_sigma
+    c_c = (4 + mu_eff / n) / (n + 4 + 2 * mu_eff / n)
+    c_1 = 2 / ((n + 1.3) ** 2 + mu_eff)
+    c_mu = min(1 - c_1, 2 * (mu_eff - 2 + 1 / mu_eff) / ((n + 2) ** 2 + mu_eff))
+    chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+    mean, C = np.full(n, 0.5), np.eye(n)
+    p_sigma, p_c = np.zeros(n), np.zeros(n)
+    records = []
+    for generation in range(generations):
+        eigenvalues, B = np.linalg.eigh(C)
+        D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        z = rng.standard_normal((lam, n))
+        y = z * D @ B.T
+        units = mean + sigma * y
+        results = _run_batch(pool, units, factors, experiments, seeds, reject)
+        records.extend(_records(results, generation=generation))
+        # Candidates outside the box are evaluated on its boundary and penalized by their distance to it
+        fitness = np.array([d for _, d, _ in results]) + np.abs(units - np.clip(units, 0, 1)).sum(axis=1)
+        order = np.argsort(fitness)
+        y_w = weights @ y[order[:mu]]
+        mean = mean + sigma * y_w
+        C_inv_sqrt = B @ np.diag(1 / D) @ B.T
+        p_sigma = (1 - c_sigma) * p_sigma + np.sqrt(c_sigma * (2 - c_sigma) * mu_eff) * C_inv_sqrt @ y_w
+        h_sigma = (np.linalg.norm(p_sigma) / np.sqrt(1 - (1 - c_sigma) ** (2 * (generation + 1)))
+                   < (1.4 + 2 / (n + 1)) * chi_n)
+        p_c = (1 - c_c) * p_c + h_sigma * np.sqrt(c_c * (2 - c_c) * mu_eff) * y_w
+        rank_mu = (weights[:, None] * y[order[:mu]]).T @ y[order[:mu]]
+        C = ((1 - c_1 - c_mu) * C + c_1 * (np.outer(p_c, p_c) + (1 - h_sigma) * c_c * (2 - c_c) * C)
+             + c_mu * rank_mu)
+        sigma *= np.exp((c_sigma / d_sigma) * (np.linalg.norm(p_sigma) / chi_n - 1))
+        rejected = sum(stats['rejected'] for _, _, stats in results)
+        log(f"  generation {generation + 1}/{generations}: best {fitness[order[0]]:.4f}, "
+            f"sigma {sigma:.3f}, {rejected}/{lam} rejected early")
+    return records
+
+
+def abc_rejection(pool, factors, experiments, seeds, reject, samples=256, accept=0.05, log=print):
+    """Rejection ABC: ``samples`` Sobol draws from the uniform prior box, the closest ``accept`` share kept."""
+    units = sobol(samples, len(factors))
+    results = _run_batch(pool, units, factors, experiments, seeds, reject)
+    records = _records(results, generation=0)
+    distances = np.array([r['distance'] for r in records])
+    cutoff = np.quantile(distances[np.isfinite(distances)], accept) if np.isfinite(distances).any() else np.inf
+    for record in records:
+        record['accepted'] = bool(record['distance'] <= cutoff)
+    rejected = sum(r['rejected'] for r in records)
+    log(f"  {samples} draws, {rejected} rejected early, epsilon {cutoff:.4f}")
+    return records
+
+
+def calibrate(spec, spec_dir='.', workers=None, log=print):
+    """Run a calibration spec; returns (evaluations DataFrame, best overrides, targets).
+
+    A spec is a JSON document: {"method": "cmaes" | "abc", "factors": {name:
+    [low, high]}, "experiments": [{"name", "reference": CSV, "base":
+    overrides, "targets": {statistic: value}, "statistics": [...]}],
+    "seeds": [...], "reject": {"tick", "min_growth"} (default: stagnant
+    at tick 150; a reference it would reject is an error) or null, plus
+    "generations" / "population" / "sigma" (CMA-ES) or "samples" / "accept"
+    (ABC).  Reference paths are relative to ``spec_dir``.
+    """
+    factors = {k: tuple(v) for k, v in spec['factors'].items()}
+    seeds = spec.get('seeds', [1])
+    reject = spec.get('reject', dict(tick=150))
+    experiments = [dict(e, targets=experiment_targets(e, spec_dir)) for e in spec['experiments']]
+    for e in experiments:
+        reference = reference_table(e, spec_dir)
+        if reference is not None:
+            e['ticks'] = sorted(int(t) for t in reference['tick'].unique())
+            if reject and EarlyRejection(**reject).rejects(reference):
+                raise ValueError(f"Experiment {e.get('name')!r}: its reference {e['reference']} would itself be "
+                                 f"rejected early by {reject}; lower \"min_growth\" or set \"reject\": null")
+        if not e['targets']:
+            raise ValueError(f"Experiment {e.get('name')!r} has no target statistics")
+        if {'ShockTrough', 'ShockRecovery'} & set(e['targets']) and e.get('base', {}).get('shock_tick', -1) < 0:
+            raise ValueError(f"Experiment {e.get('name')!r} targets shock statistics but sets no shock_tick")
+    method = spec.get('method', 'cmaes')
+    workers = workers or os.cpu_count() or 1
+    log(f"Calibration ({method}): {len(factors)} factors, "
+        f"{sum(len(e['targets']) for e in experiments)} target statistics, {len(seeds)} seed(s) per candidate")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if method == 'cmaes':
+            records = cma_es(pool, factors, experiments, seeds, reject, spec.get('generations', 20),
+                             spec.get('population'), spec.get('sigma', 0.3), spec.get('seed'), log)
+        elif method == 'abc':
+            records = abc_rejection(pool, factors, experiments, seeds, reject, spec.get('samples', 256),
+                                    spec.get('accept', 0.05), log)
+        else:
+            raise ValueError(f"Unknown calibration method {method!r}; expected 'cmaes' or 'abc'")
+    df = pd.DataFrame(records)
+    best = df.loc[df['distance'].idxmin(), list(factors)].to_dict()
+    targets = {f"{e.get('name', i)}.{k}": v for i, e in enumerate(experiments) for k, v in e['targets'].items()}
+    return df, {k: float(v) for k, v in best.items()}, targets
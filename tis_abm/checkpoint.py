@@ -0,0 +1,143 @@
+import io
+import json
+from dataclasses import asdict, fields
+
+import numpy as np
+
+from .engine import State, simulate
+from .params import Params, SCHEMA
+from .streams import load_rng, save_rng
+
+# ==================== State Snapshots ====================
+# A snapshot is one compressed .npz archive holding every array of the State
+# (grid, countdowns, all agent slots including dead ones, budget, fund,
+# market variables), the exact bit-generator state of the RNG (or the key of
+# counter streams, see tis_abm.streams), the tick, the parameters it was run
+# with, and optionally the rows recorded so far.
+# Restoring it and stepping on is bit-identical to never having stopped, so
+# counterfactuals (a shock, another policy) can branch off one shared prefix:
+#
+#   prefix  = simulate(p.with_(ticks=199), seed, observers=[keep := Snapshot(199)])
+#   shocked = simulate(p.with_(shock_tick=200), state=keep.restore())
+
+SNAPSHOT_VERSION = 1
+
+# State fields that are not arrays saved as-is
+_SPECIAL = {'rng', 'tick', 'claims', 'profile'}
+
+
+def _array_fields():
+    return [f.name for f in fields(State) if f.name not in _SPECIAL]
+
+
+def dumps(state, params=None, history=None):
+    """Serialize a state (plus optional parameters and recorded rows) to bytes."""
+    meta = dict(version=SNAPSHOT_VERSION, tick=state.tick, rng=save_rng(state.rng),
+                params=asdict(params) if params is not None else None, schema=SCHEMA)
+    arrays = {name: getattr(state, name) for name in _array_fields()}
+    if history is not None:
+        arrays['history'] = history
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, meta=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8), **arrays)
+    return buffer.getvalue()
+
+
+def loads(data):
+    """Inverse of dumps(): returns (state, params or None, history or None)."""
+    with np.load(io.BytesIO(data)) as archive:
+        meta = json.loads(archive['meta'].tobytes().decode('utf-8'))
+        if meta['version'] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {meta['version']}; expected {SNAPSHOT_VERSION}")
+        if meta['schema'] != SCHEMA:
+            raise ValueError("Snapshot was recorded with a different output schema")
+        arrays = {name: archive[name] for name in _array_fields()}
+        history = archive['history'] if 'history' in archive.files else None
+    state = State(rng=load_rng(meta['rng']), tick=meta['tick'], **arrays)
+    params = Params(**meta['params']) if meta['params'] is not None else None
+    return state, params, history
+
+
+def save_state(state, path, params=None, history=None):
+    """Write a snapshot to ``path`` (conventionally *.npz)."""
+    with open(path, 'wb') as f:
+        f.write(dumps(state, params, history))
+
+
+def load_state(path):
+    """Read a snapshot written by save_state(): returns (state, params or None, history or None)."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def check_compatible(state, params):
+    """Raise ValueError if ``params`` cannot continue ``state`` (grid size or agent capacities differ)."""
+    G = state.green.shape[-1]
+    if (G, state.m_alive.shape[1], state.s_alive.shape[1]) != (params.grid_size, params.max_manufacturers,
+                                                               params.max_suppliers):
+        raise ValueError(f"Snapshot has a {G}x{G} grid and {state.m_alive.shape[1]}/{state.s_alive.shape[1]} "
+                         f"agent slots; parameters expect {params.grid_size}x{params.grid_size} and "
+                         f"{params.max_manufacturers}/{params.max_suppliers}")
+
+
+class Snapshot:
+    """Observer keeping a snapshot of the state at ``tick`` (default: the last tick it sees)."""
+
+    def __init__(self, tick=None, params=None):
+        self.tick = tick
+        self.params = params
+        self.state = None
+        self._data = None
+
+    def __call__(self, state):
+        if self.tick is None:
+            # The run mutates this state in place; it is serialized when first asked for
+            self.state, self._data = state, None
+        elif state.tick == self.tick:
+            self._data = dumps(state, self.params)
+
+    @property
+    def data(self):
+        if self._data is None and self.state is not None:
+            self._data = dumps(self.state, self.params)
+        return self._data
+
+    def restore(self):
+        """A fresh, independent copy of the captured state."""
+        if self.data is None:
+            raise ValueError('No state captured yet')
+        return loads(self.data)[0]
+
+
+def join(prefix, continuation, record_every):
+    """Recorded rows of a prefix followed by those of a run resumed from its last tick.
+
+    Both are (R, rows, columns) tables.  The resumed run's first row (the fork
+    tick) is kept only if it falls on the recording interval and is not already
+    in the prefix, so the result has the rows of an uninterrupted run.
+    """
+    if prefix is None or prefix.shape[1] == 0:
+        return continuation
+    ticks = continuation[0, :, 0]
+    keep = (ticks > prefix[0, -1, 0]) & (ticks % record_every == 0)
+    return np.concatenate([prefix, continuation[:, keep]], axis=1)
+
+
+def run_forks(params, variants, fork_tick, seed=None, replicates=1):
+    """Run the shared prefix to ``fork_tick`` once, then every variant from that state.
+
+    ``variants`` maps a name to parameter overrides applied after the fork
+    (e.g. ``{'normal': {}, 'shock': {'shock_tick': 200}}``).  Returns a dict of
+    name -> (R, rows, len(SCHEMA)) tables covering the whole run, as if each
+    variant had been simulated from tick 0 with its overrides taking effect
+    after ``fork_tick``.
+    """
+    p = params or Params()
+    keep = Snapshot(fork_tick)
+    prefix = simulate(p.with_(ticks=fork_tick), seed, replicates, observers=[keep])
+    tables = {}
+    for name, overrides in variants.items():
+        variant = p.with_(**overrides)
+        state = keep.restore()
+        check_compatible(state, variant)
+        tables[name] = join(prefix, simulate(variant, state=state), variant.record_every)
+    return tables
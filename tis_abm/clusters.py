@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+
+# ==================== Green-Cluster Analytics (Pattern P2) ====================
+# Connected green components on the toroidal grid (4-neighbourhood), tracked
+# with a union-find forest over the cells of every replicate at once:
+#
+#   parent   flat (R * G * G,) array; a root points to itself and every link
+#            points to a smaller cell index, so the forest never has cycles
+#
+# Each tick only the cells that turned green are linked to their green
+# neighbours: all new edges are hooked in one vectorized pass (the larger root
+# is attached to the smaller one), and pointer jumping compresses the paths,
+# repeated until every edge joins one root.  Union-find cannot split a
+# component, so a replicate that lost green cells (a shock) is relabelled from
+# scratch.  Per-tick statistics then come from one bincount over the roots.
+#
+# A cluster percolates when it touches every row or every column of the grid,
+# i.e. it spans the torus in at least one direction.
+
+# Per-tick columns added next to the reporters (see ClusterTracker.frame)
+CLUSTER_COLUMNS = ['Clusters', 'LargestCluster', 'LargestClusterShare', 'MeanClusterSize', 'Percolating']
+
+# Stage boundaries of Pattern P2 (see detect_stages)
+GROWTH_FACTOR = 2.0       # points -> clusters: mean cluster size doubled from the start
+ISLAND_SHARE = 0.25       # island formation: one cluster holds a quarter of all green cells
+
+
+# Cluster-size histogram bins: sizes 1, 2-3, 4-7, 8-15, ...
+def size_bins(cells):
+    return int(np.ceil(np.log2(cells + 1)))
+
+
+def size_bin_labels(cells):
+    edges = 2 ** np.arange(size_bins(cells) + 1)
+    return [f'{lo}' if hi - lo == 1 else f'{lo}-{hi - 1}' for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+class ClusterTracker:
+    """Observer labelling green clusters incrementally and recording per-tick statistics.
+
+    After a run, ``frame(replicate)`` returns one row per tick with the
+    CLUSTER_COLUMNS (LargestClusterShare is relative to all green cells) and
+    ``size_distribution`` holds the (ticks, R, bins) cluster-size histogram.
+    """
+
+    def __init__(self):
+        self.parent = None
+        self.ticks, self.clusters, self.largest, self.largest_share = [], [], [], []
+        self.mean_size, self.percolating, self.histograms = [], [], []
+
+    def _neighbours(self, cells):
+        """Flat indices of the 4 toroidal neighbours of flat cell indices, shape (4, n)."""
+        G, N = self.size, self.size * self.size
+        r, local = np.divmod(cells, N)
+        y, x = np.divmod(local, G)
+        base = r * N
+        return np.stack([base + y * G + (x + 1) % G, base + y * G + (x - 1) % G,
+                         base + ((y + 1) % G) * G + x, base + ((y - 1) % G) * G + x])
+
+    def _compress(self):
+        parent = self.parent
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+        self.parent = parent
+
+    def _link(self, new, green):
+        """Union every newly green cell with its green neighbours."""
+        cells = np.flatnonzero(new)
+        if len(cells) == 0:
+            return
+        nbrs = self._neighbours(cells)
+        u = np.broadcast_to(cells, nbrs.shape)[green[nbrs]]
+        v = nbrs[green[nbrs]]
+        while len(u):
+            ru, rv = self.parent[u], self.parent[v]
+            diff = ru != rv
+            if not diff.any():
+                break
+            u, v, ru, rv = u[diff], v[diff], ru[diff], rv[diff]
+            np.minimum.at(self.parent, np.maximum(ru, rv), np.minimum(ru, rv))
+            self._compress()
+
+    def __call__(self, state):
+        R, G, _ = state.green.shape
+        green = state.green.reshape(-1)
+        if self.parent is None:
+            self.size, self.replicates = G, R
+            self.parent = np.arange(R * G * G)
+            self.previous = np.zeros_like(green)
+        new = green & ~self.previous
+
+        lost = (self.previous & ~green).reshape(R, -1).any(axis=1)
+        if lost.any():
+            reset = np.repeat(lost, G * G)
+            self.parent[reset] = np.flatnonzero(reset)
+            new = np.where(reset, green, new)
+        self._link(new, green)
+        self.previous = green.copy()
+        self._record(state.tick, green)
+
+    def _record(self, tick, green):
+        R, G, N = self.replicates, self.size, self.size * self.size
+        cells = np.flatnonzero(green)
+        roots = self.parent[cells]
+        sizes = np.bincount(roots, minlength=R * N)
+        root_ids = np.flatnonzero(sizes)
+        root_sizes = sizes[root_ids]
+        owner = root_ids // N
+        n_clusters = np.bincount(owner, minlength=R)
+        largest = np.zeros(R, dtype=np.int64)
+        np.maximum.at(largest, owner, root_sizes)
+        n_green = np.bincount(cells // N, minlength=R)
+
+        # Rows and columns touched by each cluster large enough to span the grid
+        spans = np.zeros(R, dtype=bool)
+        big_ids = root_ids[root_sizes >= G]
+        if len(big_ids):
+            compact = np.full(R * N, -1)
+            compact[big_ids] = np.arange(len(big_ids))
+            cluster = compact[roots]
+            member = cluster >= 0
+            y, x = np.divmod(cells[member] % N, G)
+            rows = np.zeros((len(big_ids), G), dtype=bool)
+            cols = np.zeros((len(big_ids), G), dtype=bool)
+            rows[cluster[member], y] = True
+            cols[cluster[member], x] = True
+            spans[big_ids[rows.all(axis=1) | cols.all(axis=1)] // N] = True
+
+        n_bins = size_bins(N)
+        bins = np.minimum(np.log2(root_sizes).astype(int), n_bins - 1)
+        hist = np.bincount(owner * n_bins + bins, minlength=R * n_bins).reshape(R, n_bins)
+
+        self.ticks.append(tick)
+        self.clusters.append(n_clusters)
+        self.largest.append(largest)
+        self.largest_share.append(np.where(n_green > 0, largest / np.maximum(n_green, 1), 0.0))
+        self.mean_size.append(n_green / np.maximum(n_clusters, 1))
+        self.percolating.append(spans)
+        self.histograms.append(hist)
+
+    def labels(self, replicate=0):
+        """(G, G) cluster labels of the current grid (-1 for non-green cells)."""
+        N = self.size * self.size
+        roots = self.parent[replicate * N:(replicate + 1) * N] - replicate * N
+        return np.where(self.previous[replicate * N:(replicate + 1) * N], roots, -1).reshape(self.size, self.size)
+
+    def frame(self, replicate=0):
+        """Per-tick cluster statistics of one replicate."""
+        return pd.DataFrame({
+            'tick': self.ticks,
+            'Clusters': [c[replicate] for c in self.clusters],
+            'LargestCluster': [c[replicate] for c in self.largest],
+            'LargestClusterShare': [c[replicate] for c in self.largest_share],
+            'MeanClusterSize': [c[replicate] for c in self.mean_size],
+            'Percolating': [int(c[replicate]) for c in self.percolating],
+        })
+
+    def columns(self, ticks, replicate=0):
+        """Dict of CLUSTER_COLUMNS sampled at ``ticks`` (e.g. the recorded rows of a run); NaN where not tracked."""
+        frame = self.frame(replicate).set_index('tick').reindex(np.asarray(ticks, dtype=int))
+        return {c: frame[c].to_numpy() for c in CLUSTER_COLUMNS}
+
+    @property
+    def size_distribution(self):
+        """(ticks, R, bins) histogram of cluster sizes; see size_bin_labels()."""
+        return np.stack(self.histograms)
+
+
+def detect_stages(df):
+    """First tick of each Pattern P2 stage in a table with the cluster columns.
+
+    Initial is the first row; Preliminary starts when the mean cluster size has
+    grown GROWTH_FACTOR-fold (points merge into clusters), Island Formation when
+    the largest cluster holds ISLAND_SHARE of the green cells, and Network
+    Ubiquity when percolation sets in for good (for ensemble means: in at least
+    half of the runs).  Stages never reached map to None.
+    """
+    df = df.sort_values('tick').reset_index(drop=True)
+    ticks = df['tick'].to_numpy()
+
+    def first(mask):
+        hits = np.flatnonzero(mask)
+        return int(ticks[hits[0]]) if len(hits) else None
+
+    percolating = df['Percolating'].to_numpy() >= 0.5
+    settled = np.flip(np.logical_and.accumulate(np.flip(percolating)))
+    return {
+        'Initial': int(ticks[0]),
+        'Preliminary': first(df['MeanClusterSize'] >= GROWTH_FACTOR * df['MeanClusterSize'].iloc[0]),
+        'Island Formation': first(df['LargestClusterShare'] >= ISLAND_SHARE),
+        'Network Ubiquity': first(settled),
+    }
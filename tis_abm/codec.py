@@ -0,0 +1,158 @@
+import numpy as np
+
+# ==================== Delta / Varint Column Codec ====================
+# Per-tick series move little from one tick to the next, so the store packs
+# every column of a run into blocks of BLOCK_ROWS values, with the smallest of:
+#
+#   delta    integer columns, and float columns whose values are exact at some
+#            number of decimals up to MAX_DECIMALS (CSV imports, rounded
+#            exports) taken as value * 10**decimals: first differences,
+#            zigzag-mapped to unsigned and written as LEB128 varints (7 bits
+#            per byte, high bit set while more bytes follow)
+#   xor      other floats: the bits of each value XOR those of the previous
+#            value, as varints, so the sign, exponent and leading mantissa
+#            bits two values share cost nothing
+#   raw      the fixed-width values
+#
+# All three are lossless (decoded arrays are bit-identical).  Every block
+# starts afresh from its first value, so a tick window decodes only the blocks
+# it overlaps, and a block decodes in a few vectorized passes with no Python
+# loop per value.
+
+BLOCK_ROWS = 256
+
+MAX_DECIMALS = 6
+
+# Largest integer a float64 holds exactly: bound on value * 10**decimals
+_EXACT = 2.0 ** 53
+
+
+def zigzag(d):
+    """Signed int64 -> uint64 with small magnitudes small (0, -1, 1, -2 -> 0, 1, 2, 3)."""
+    d = d.astype(np.int64)
+    return ((d << np.int64(1)) ^ (d >> np.int64(63))).view(np.uint64)
+
+
+def unzigzag(u):
+    """Inverse of zigzag()."""
+    return (u >> np.uint64(1)).view(np.int64) ^ -(u & np.uint64(1)).view(np.int64)
+
+
+def varint_lengths(u):
+    """Bytes of the LEB128 varint of every uint64 in ``u`` (1 to 10)."""
+    n = np.ones(len(u), dtype=np.int64)
+    for k in range(1, 10):
+        n += u >= np.uint64(1 << (7 * k))
+    return n
+
+
+def varint_encode(u):
+    """LEB128 varints of a uint64 array as one uint8 array; returns (bytes, length of each varint)."""
+    u = np.asarray(u, dtype=np.uint64)
+    n = varint_lengths(u)
+    width = int(n.max()) if len(u) else 0
+    # (values, width) matrix of 7-bit groups with the continuation bit set, of
+    # which the first n of every row are kept in row order
+    shifts = np.uint64(7) * np.arange(width, dtype=np.uint64)
+    groups = ((u[:, None] >> shifts) & np.uint64(0x7F)).astype(np.uint8) | np.uint8(0x80)
+    groups[np.arange(len(u)), n - 1] &= np.uint8(0x7F)
+    return groups[np.arange(width) < n[:, None]], n
+
+
+def varint_decode(b):
+    """uint64 values of a uint8 array of complete LEB128 varints."""
+    b = np.asarray(b, dtype=np.uint8)
+    if not len(b):
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(b < 0x80)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    j = np.arange(len(b)) - np.repeat(starts, ends - starts + 1)
+    parts = (b & 0x7F).astype(np.uint64) << (np.uint64(7) * j.astype(np.uint64))
+    return np.bitwise_or.reduceat(parts, starts)
+
+
+def _exact(values, decimals):
+    """Whether every value comes back bit-identical from int64 value * 10**decimals, as decode() rebuilds it."""
+    scale = 10.0 ** decimals
+    q = np.round(values * scale)
+    # int64 has no -0.0, so a negative zero is never exact
+    return np.abs(q).max() < _EXACT and np.array_equal((q.astype(np.int64) / scale).view(np.int64),
+                                                       values.view(np.int64))
+
+
+def _decimals(values):
+    """Fewest decimals at which every value is exact, or None (checked at MAX_DECIMALS first)."""
+    if not len(values) or not np.isfinite(values).all() or not _exact(values, MAX_DECIMALS):
+        return None
+    return next(d for d in range(MAX_DECIMALS + 1) if _exact(values, d))
+
+
+def _block_starts(rows):
+    return np.arange(0, rows, BLOCK_ROWS)
+
+
+def encode(values, dtype):
+    """Pack a column as (header, uint8 bytes); the JSON-ready header holds the codec, dtype and block offsets."""
+    dtype = np.dtype(dtype)
+    values = np.asarray(values).astype(dtype)
+    rows = len(values)
+    starts = _block_starts(rows)
+    header, words = None, None
+
+    decimals = 0 if dtype.kind in 'iu' else _decimals(values.astype(np.float64))
+    if decimals is not None:
+        q = values.astype(np.int64) if dtype.kind in 'iu' else np.round(values * 10.0 ** decimals).astype(np.int64)
+        d = np.diff(q, prepend=np.int64(0))
+        d[starts] = q[starts]
+        header, words = dict(codec='delta', decimals=decimals), zigzag(d)
+    elif dtype.kind == 'f':
+        bits = values.astype(np.float64).view(np.uint64)
+        x = bits.copy()
+        x[1:] ^= bits[:-1]
+        x[starts] = bits[starts]
+        header, words = dict(codec='xor'), x
+
+    # Varints only when they beat the fixed-width values
+    if words is not None and varint_lengths(words).sum() < rows * dtype.itemsize:
+        data, n = varint_encode(words)
+        ends = np.concatenate([[0], np.cumsum(n)])
+        header.update(dtype=dtype.str, blocks=np.append(ends[starts], ends[-1]).tolist())
+        return header, data
+    header = dict(codec='raw', dtype=dtype.str, blocks=(np.append(starts, rows) * dtype.itemsize).tolist())
+    return header, np.frombuffer(values.tobytes(), dtype=np.uint8)
+
+
+def block_range(header, lo, hi):
+    """(first block, end block) of a packed column covering rows [lo, hi)."""
+    return lo // BLOCK_ROWS, min(-(-hi // BLOCK_ROWS), len(header['blocks']) - 1)
+
+
+def decode(data, header, lo, hi, offset=0):
+    """Rows [lo, hi) of a packed column whose bytes ``data`` start at byte ``offset`` of it.
+
+    Only the blocks covering the window are decoded, and ``data`` need only
+    hold those: bytes header['blocks'][first] to header['blocks'][end] for
+    (first, end) = block_range(header, lo, hi).
+    """
+    dtype = np.dtype(header['dtype'])
+    first, end = block_range(header, lo, hi)
+    blocks = header['blocks']
+    data = np.asarray(data, dtype=np.uint8)[blocks[first] - offset:blocks[end] - offset]
+    base = first * BLOCK_ROWS
+    window = slice(lo - base, hi - base)
+    if header['codec'] == 'raw':
+        return np.frombuffer(data.tobytes(), dtype=dtype)[window].copy()
+
+    words = varint_decode(data)
+    count = len(words)
+    starts = _block_starts(count)
+    block = np.arange(count) // BLOCK_ROWS
+    if header['codec'] == 'delta':
+        d = unzigzag(words)
+        total = np.cumsum(d)
+        q = total - (total[starts] - d[starts])[block]
+        values = q if dtype.kind in 'iu' else q / 10.0 ** header['decimals']
+    else:
+        total = np.bitwise_xor.accumulate(words)
+        values = (total ^ (total[starts] ^ words[starts])[block]).view(np.float64)
+    return values[window].astype(dtype)
@@ -0,0 +1,551 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, fields
+
+from . import fiscal, spillover
+from .market import market_price, svi_demand
+from .streams import draw, streams
+from .params import EXPORT_DECIMALS, INTEGER_COLUMNS, Params, SCHEMA
+
+# ==================== Model State ====================
+# Every array carries a leading replicate axis R, so one call to step() advances
+# R independent worlds at once.  Agents live in fixed-capacity slots with an
+# ``alive`` mask; entry fills dead slots and exit clears the mask.
+#
+# The state is a struct of arrays: one array per agent attribute, so each
+# mechanism streams through only the attributes it reads.  Generations are
+# int8 (G1-G3) and masks and the green grid one byte per entry.  The float
+# attributes (positions, headings, competitiveness, AI levels, countdowns)
+# are float64 by default; ``precision='single'`` stores them as float32 and
+# rounds them back to it at the end of every tick, so single-precision runs
+# are statistically equivalent to the default but not bit-identical to it.
+# footprint() reports the bytes per agent.  The slots are sized by
+# max_manufacturers/max_suppliers, not by the live count: supplier entry
+# scales with the filled share of those slots, and every slot's initial
+# position is drawn up front, so the capacities are part of the model and
+# the state of a sparsely populated run stays well above 100 bytes per agent.
+
+# Storage dtype of the float state arrays for each Params.precision
+FLOAT_DTYPES = {'double': np.float64, 'single': np.float32}
+GENERATION_DTYPE = np.int8
+
+# State arrays stored at Params.precision
+FLOAT_FIELDS = ['countdown', 'm_x', 'm_y', 'm_heading', 'm_comp', 'm_ai', 's_x', 's_y', 's_heading', 's_comp']
+
+
+@dataclass
+class State:
+    """Complete simulation state for R replicates."""
+    rng: object              # np.random.Generator, or streams.CounterStreams with rng='counter'
+    tick: int
+    green: np.ndarray        # (R, G, G) bool
+    countdown: np.ndarray    # (R, G, G) float
+    m_alive: np.ndarray      # (R, Mcap) bool
+    m_x: np.ndarray
+    m_y: np.ndarray
+    m_heading: np.ndarray
+    m_comp: np.ndarray
+    m_ai: np.ndarray
+    m_gen: np.ndarray        # (R, Mcap) int8
+    s_alive: np.ndarray      # (R, Scap) bool
+    s_x: np.ndarray
+    s_y: np.ndarray
+    s_heading: np.ndarray
+    s_comp: np.ndarray
+    budget: np.ndarray       # (R,)
+    fund: np.ndarray
+    price: np.ndarray
+    demand: np.ndarray
+    supply: np.ndarray
+    svi: np.ndarray
+    claims: dict = None      # subsidy claims drawn in the last tick: {'green': (R,), 'ai': (R,)}
+    profile: object = None   # tis_abm.profiling.Profiler while a run is profiled
+
+    @property
+    def replicates(self):
+        return self.green.shape[0]
+
+
+def float_dtype(params):
+    """Storage dtype of the float state arrays under ``params.precision``."""
+    if params.precision not in FLOAT_DTYPES:
+        raise ValueError(f"Unknown precision '{params.precision}'; expected one of {sorted(FLOAT_DTYPES)}")
+    return FLOAT_DTYPES[params.precision]
+
+
+def _store(state, dtype):
+    """Cast the float state arrays back to their storage dtype after a tick."""
+    for name in FLOAT_FIELDS:
+        setattr(state, name, getattr(state, name).astype(dtype, copy=False))
+
+
+def footprint(state):
+    """Bytes held by the state arrays: total, per agent slot, per live agent, and per patch.
+
+    Per-agent figures charge the patch and per-replicate arrays to the agents
+    too, so they are the whole state divided by the agent count.
+    """
+    arrays = [getattr(state, f.name) for f in fields(State) if isinstance(getattr(state, f.name), np.ndarray)]
+    total = sum(a.nbytes for a in arrays)
+    slots = state.m_alive.size + state.s_alive.size
+    live = int(state.m_alive.sum() + state.s_alive.sum())
+    patches = state.green.nbytes + state.countdown.nbytes
+    return dict(bytes=total, slots=slots, agents=live, bytes_per_slot=total / slots,
+                bytes_per_agent=total / max(live, 1), bytes_per_patch=patches / state.green.size)
+
+
+def init_state(params=None, seed=None, replicates=1, first_replicate=0):
+    """Create the tick-0 state (Algorithm 1, lines 1-4).
+
+    With ``rng='counter'`` the replicates are numbered from ``first_replicate``
+    (see tis_abm.streams).
+    """
+    p = params or Params()
+    rng = streams(p.rng, seed, replicates, first_replicate)
+    R, G = replicates, p.grid_size
+    if p.n_manufacturers > p.max_manufacturers or p.n_suppliers > p.max_suppliers:
+        raise ValueError("Initial populations exceed the agent capacity; raise max_manufacturers/max_suppliers "
+                         "or use params.scale_world()")
+
+    green = draw(rng, 0, 'init_green', 'random', (R, G, G)) < p.initial_green_share
+    countdown = np.where(green, 0.0, draw(rng, 0, 'init_countdown', 'integers', (R, G, G), 0,
+                                          p.initial_countdown)).astype(float)
+
+    m_alive = np.zeros((R, p.max_manufacturers), dtype=bool)
+    m_alive[:, :p.n_manufacturers] = True
+    s_alive = np.zeros((R, p.max_suppliers), dtype=bool)
+    s_alive[:, :p.n_suppliers] = True
+
+    def positions(kind, n):
+        return (draw(rng, 0, f'init_{kind}_x', 'random', (R, n)) * G,
+                draw(rng, 0, f'init_{kind}_y', 'random', (R, n)) * G,
+                draw(rng, 0, f'init_{kind}_heading', 'random', (R, n)) * 360.0)
+
+    m_x, m_y, m_heading = positions('manufacturer', p.max_manufacturers)
+    s_x, s_y, s_heading = positions('supplier', p.max_suppliers)
+    zeros = np.zeros(R)
+
+    state = State(
+        rng=rng, tick=0, green=green, countdown=countdown,
+        m_alive=m_alive, m_x=m_x, m_y=m_y, m_heading=m_heading,
+        m_comp=np.where(m_alive, 30.0, 0.0), m_ai=np.zeros((R, p.max_manufacturers)),
+        m_gen=np.ones((R, p.max_manufacturers), dtype=GENERATION_DTYPE),
+        s_alive=s_alive, s_x=s_x, s_y=s_y, s_heading=s_heading,
+        s_comp=np.where(s_alive, 16.0, 0.0),
+        budget=np.full(R, p.initial_budget), fund=np.full(R, p.initial_fund),
+        price=np.full(R, p.base_price), demand=np.full(R, p.base_demand),
+        supply=np.full(R, float(p.n_suppliers)), svi=zeros.copy(),
+    )
+    _store(state, float_dtype(p))
+    return state
+
+
+# ==================== Helper Functions ====================
+def _masked_mean(values, mask, empty):
+    n = mask.sum(axis=1)
+    total = np.where(mask, values, 0.0).sum(axis=1)
+    return np.where(n > 0, total / np.maximum(n, 1), empty)
+
+
+def _torus_delta(a, b, size):
+    """Shortest signed displacement from a to b on a ring of the given size."""
+    return (b - a + size / 2) % size - size / 2
+
+
+def _patch_index(x, y, size):
+    # Coordinates are never negative, so truncation is the floor
+    return (x.astype(np.int64) % size) * size + (y.astype(np.int64) % size)
+
+
+def _occupied(alive):
+    """Number of leading slots that hold every live agent (entry refills the lowest free slots)."""
+    used = alive.any(axis=0)
+    return int(used.nonzero()[0][-1]) + 1 if used.any() else 0
+
+
+def _lap(state, phase):
+    """Attribute the time since the previous lap to ``phase`` when the run is profiled."""
+    if state.profile is not None:
+        state.profile.lap(phase)
+
+
+def _count(state, event, mask):
+    """Count the agents or patches flagged in ``mask`` as ``event`` when the run is profiled."""
+    if state.profile is not None:
+        state.profile.count(event, mask)
+
+
+def _draw(state, mechanism, kind, shape=None, low=0.0, high=1.0, at=None):
+    """Random draw of this tick's ``mechanism`` (see tis_abm.streams.draw)."""
+    return draw(state.rng, state.tick, mechanism, kind, shape, low, high, at)
+
+
+def _spillover_method(p, radius, profile, sources, targets):
+    """The spillover method of a run.
+
+    'auto' picks the kernel from the populations of the whole batch.  With
+    counter streams the arithmetic must not depend on the batch either, so
+    'auto' is fixed from the initial populations of one replicate instead.
+    """
+    if p.rng == 'counter' and p.spillover_method == 'auto':
+        return spillover.choose_method(1, p.grid_size, radius, profile, sources, targets)
+    return p.spillover_method
+
+
+def _walk(x, y, heading, step, size):
+    rad = np.deg2rad(heading)
+    return (x + step * np.sin(rad)) % size, (y + step * np.cos(rad)) % size
+
+
+def _spawn(alive, parents, limit):
+    """Assign one child slot per parent, up to ``limit`` births per replicate.
+
+    Returns (replicate, parent, child) index arrays; parents beyond the free
+    capacity of their replicate are dropped.
+    """
+    rank = np.cumsum(parents, axis=1) - 1
+    allowed = parents & (rank < limit[:, None])
+    rr, pp = np.nonzero(allowed)
+    free_first = np.argsort(alive, axis=1, kind='stable')
+    return rr, pp, free_first[rr, rank[rr, pp]]
+
+
+def _pay_out(eligible, amount, budget):
+    """Pay ``amount`` to eligible agents in slot order while the budget lasts.
+
+    The k-th claim is paid while k * amount fits the budget, as in
+    fiscal.pay_claims(), so replaying the claim counts reproduces the budget.
+    """
+    rank = np.cumsum(eligible, axis=1)
+    paid = eligible & (rank * amount[:, None] <= budget[:, None])
+    return paid, budget - paid.sum(axis=1) * amount
+
+
+def generation_cost(gen, params):
+    """Competitiveness needed to move from generation ``gen`` to ``gen + 1``."""
+    p = params
+    if p.cost_regime == 'linear':
+        return p.generation_cost_base + p.generation_cost_step * gen
+    if p.cost_regime == 'exponential':
+        growth = 1.0 + p.generation_cost_step / p.generation_cost_base
+        return p.generation_cost_base * growth ** gen
+    raise ValueError(f"Unknown cost regime '{p.cost_regime}'")
+
+
+# ==================== Mechanisms (Algorithm 1, blocks A-H) ====================
+def _market(state, p):
+    """(A) supply and SVI-driven demand, (B) price formation."""
+    n_m = state.m_alive.sum(axis=1)
+    n_s = state.s_alive.sum(axis=1)
+    quality = _masked_mean(state.m_ai, state.m_alive, 0.0)
+    green_ratio = state.green.mean(axis=(1, 2))
+    healthy = (state.s_alive & (state.s_comp > 5)).sum(axis=1)
+    resilience = np.where(n_s > 0, healthy / np.maximum(n_s, 1), 0.1)
+
+    w = p.w_quality + p.w_green + p.w_resilience
+    state.svi = (p.w_quality * quality + p.w_green * green_ratio + p.w_resilience * resilience) / w
+    state.demand = svi_demand(state.svi, p)
+    state.supply = n_s.astype(float)
+
+    noise = _draw(state, 'price_noise', 'uniform', (state.replicates,), 1 - p.price_noise, 1 + p.price_noise)
+    state.price = market_price(state.demand, state.supply, p, noise)
+    return n_m, n_s
+
+
+def _fiscal(state, p, n_m, green_ratio):
+    """(D) taxes feed the transition fund, which releases counter-cyclically into the budget."""
+    n_low = (state.m_alive & (state.m_ai < fiscal.BROWN_LEVEL)).sum(axis=1)
+    shocked = fiscal.shock_window(state.tick, p.shock_tick)
+    state.budget, state.fund, green_subsidy, ai_subsidy = fiscal.fiscal_step(
+        state.budget, state.fund, n_m, n_low, green_ratio, shocked, p)
+    return green_subsidy, ai_subsidy
+
+
+def _move_manufacturers(state, p, alive):
+    """Head for a brown patch within the search radius, otherwise wander.
+
+    The search samples a handful of patches in the radius instead of scanning
+    all of them; with few brown patches left most firms simply wander, and
+    once the whole batch is green (from about tick 200 on) the search is
+    skipped.
+    """
+    G, R = p.grid_size, state.replicates
+    n = _occupied(alive)
+    live, x, y, heading = alive[:, :n], state.m_x[:, :n], state.m_y[:, :n], state.m_heading[:, :n]
+    candidates = 8
+    dx, dy, _ = spillover.kernel_taps(p.move_radius, 'disc')
+    pick = _draw(state, 'move_target', 'integers', (R, n, candidates), 0, dx.size)
+    wander = heading + _draw(state, 'move_wander', 'uniform', heading.shape, -25.0, 25.0)
+    if state.green.all():
+        new_x, new_y = _walk(x, y, wander, 0.5, G)
+        new_heading = wander
+    else:
+        px = (x.astype(np.int64)[:, :, None] + dx[pick]) % G
+        py = (y.astype(np.int64)[:, :, None] + dy[pick]) % G
+        flat = state.green.reshape(R, -1)
+        brown = ~np.take_along_axis(flat, (px * G + py).reshape(R, -1), axis=1).reshape(R, n, candidates)
+        has_target = brown.any(axis=2)
+        first = brown.argmax(axis=2)[:, :, None]
+        tx = np.take_along_axis(px, first, axis=2)[:, :, 0] + 0.5
+        ty = np.take_along_axis(py, first, axis=2)[:, :, 0] + 0.5
+        toward = np.rad2deg(np.arctan2(_torus_delta(x, tx, G), _torus_delta(y, ty, G)))
+        new_heading = np.where(has_target, toward, wander)
+        new_x, new_y = _walk(x, y, new_heading, np.where(has_target, 1.0, 0.5), G)
+    state.m_heading[:, :n] = np.where(live, new_heading, heading)
+    state.m_x[:, :n] = np.where(live, new_x, x)
+    state.m_y[:, :n] = np.where(live, new_y, y)
+
+
+def _manufacturers(state, p, green_subsidy, ai_subsidy):
+    """(E) movement, green certification, spillovers, upgrades, subsidies, entry and exit."""
+    G, R = p.grid_size, state.replicates
+    alive = state.m_alive
+    _move_manufacturers(state, p, alive)
+    _lap(state, 'Movement')
+
+    # Green certification: firms on brown patches work the countdown down
+    cell = _patch_index(state.m_x, state.m_y, G)
+    flat_green = state.green.reshape(R, -1)
+    on_green = alive & np.take_along_axis(flat_green, cell, axis=1)
+    state.m_comp = state.m_comp + 0.9 * on_green
+    on_brown = alive & ~on_green
+    flat_cd = state.countdown.reshape(R, -1)
+    offset = np.arange(R)[:, None] * G * G
+    np.subtract.at(flat_cd.reshape(-1), (cell + offset)[on_brown], 5.0 * state.m_ai[on_brown])
+    certified = ~flat_green & (flat_cd <= 0)
+    flat_green |= certified
+    flat_cd[certified] = 0.0
+    _count(state, 'Certifications', certified)
+    _lap(state, 'Certification')
+
+    # Spillover to suppliers within the supplier radius: the AI levels of nearby manufacturers
+    s_cell = _patch_index(state.s_x, state.s_y, G)
+    method = _spillover_method(p, p.supplier_radius, 'disc', p.n_manufacturers, p.n_suppliers)
+    near_ai = spillover.neighbour_sum(cell, state.m_ai, alive, s_cell, p.supplier_radius, 'disc', G,
+                                      method, where=state.s_alive)
+    state.s_comp = state.s_comp + p.spillover_intensity * near_ai
+    _lap(state, 'Spillover')
+
+    state.m_comp = state.m_comp - 0.3 + p.delta * state.m_ai
+
+    # Discrete generation upgrade
+    cost = generation_cost(state.m_gen, p)
+    up_gen = alive & (state.m_comp > 8) & (state.m_ai > 0.7) & (state.m_gen < p.max_generation) & (state.m_comp > cost)
+    state.m_comp = np.where(up_gen, state.m_comp - cost, state.m_comp)
+    state.m_gen = np.where(up_gen, state.m_gen + 1, state.m_gen)
+    state.m_ai = np.where(up_gen, 0.6 * state.m_ai + 0.3, state.m_ai)
+
+    # Continuous AI upgrade
+    cost = 8 + 12 * state.m_ai
+    up_ai = alive & (state.m_comp > 4) & (state.m_ai < 1) & (state.m_comp > cost)
+    state.m_comp = np.where(up_ai, state.m_comp - cost, state.m_comp)
+    state.m_ai = np.where(up_ai, np.minimum(1.0, state.m_ai + 0.09), state.m_ai)
+    _count(state, 'GenUpgrades', up_gen)
+    _count(state, 'AIUpgrades', up_ai)
+    _lap(state, 'Upgrades')
+
+    # Knowledge diffusion: learn from one random capable neighbour j within the spillover
+    # radius with probability a_j / (1.5 + 0.5 d).  Averaged over the uniform pick of j this
+    # is the decay-weighted teacher sum divided by the teacher count around each firm.
+    teacher = alive & (state.m_ai > 0.1)
+    pull = spillover.neighbour_sum(cell, state.m_ai, teacher, cell, p.spillover_radius, 'decay', G,
+                                   _spillover_method(p, p.spillover_radius, 'decay', p.n_manufacturers,
+                                                     p.n_manufacturers), where=alive)
+    count = spillover.neighbour_sum(cell, 1.0, teacher, cell, p.spillover_radius, 'disc', G,
+                                    _spillover_method(p, p.spillover_radius, 'disc', p.n_manufacturers,
+                                                      p.n_manufacturers), where=alive)
+    own_weight = spillover.kernel_taps(p.spillover_radius, 'decay')[2].max()
+    pull = pull - teacher * state.m_ai * own_weight
+    count = np.rint(count) - teacher
+    prob = np.where(count > 0, pull / np.maximum(count, 1), 0.0)
+    learn = alive & (_draw(state, 'diffusion', 'random', alive.shape) < prob)
+    state.m_ai = np.where(learn, np.minimum(1.0, state.m_ai + 0.05), state.m_ai)
+    _count(state, 'Learned', learn)
+    _lap(state, 'Diffusion')
+
+    # Stochastic subsidies, paid in slot order while the budget lasts
+    green_claims = on_green & (_draw(state, 'green_subsidy', 'random', alive.shape) < p.subsidy_prob)
+    paid, state.budget = _pay_out(green_claims, green_subsidy, state.budget)
+    state.m_comp = state.m_comp + paid * green_subsidy[:, None]
+    _count(state, 'GreenSubsidies', paid)
+    ai_claims = alive & (state.m_ai > 0.3) & (_draw(state, 'ai_subsidy', 'random', alive.shape) < p.subsidy_prob)
+    state.claims = dict(green=green_claims.sum(axis=1), ai=ai_claims.sum(axis=1))
+    paid, state.budget = _pay_out(ai_claims, ai_subsidy, state.budget)
+    state.m_comp = state.m_comp + paid * ai_subsidy[:, None]
+    _count(state, 'AISubsidies', paid)
+
+    # Backwardness tax after the warm-up period
+    if state.tick > 50:
+        state.m_comp = state.m_comp - 0.8 * np.reshape(p.carbon_tax, (-1, 1)) * (alive & (state.m_ai < 0.4))
+    _lap(state, 'Subsidies')
+
+    # Entry: split competitiveness with a new firm placed next to the parent
+    n_m = alive.sum(axis=1)
+    birth = _draw(state, 'manufacturer_birth', 'random', alive.shape)
+    parents = alive & (state.m_comp > 10) & (birth < p.manufacturer_birth_prob)
+    rr, pp, cc = _spawn(alive, parents, p.max_manufacturers - n_m)
+    state.m_comp[rr, pp] /= 2
+    state.m_x[rr, cc] = (state.m_x[rr, pp] + _draw(state, 'manufacturer_x', 'uniform', low=-1, at=(rr, cc))) % G
+    state.m_y[rr, cc] = (state.m_y[rr, pp] + _draw(state, 'manufacturer_y', 'uniform', low=-1, at=(rr, cc))) % G
+    state.m_heading[rr, cc] = _draw(state, 'manufacturer_heading', 'random', at=(rr, cc)) * 360.0
+    state.m_ai[rr, cc], state.m_gen[rr, cc], state.m_comp[rr, cc] = 0.3, 1, 15.0
+    alive[rr, cc] = True
+
+    # Exit
+    if state.profile is not None:
+        state.profile.count('ManufacturerEntries', np.bincount(rr, minlength=R))
+        state.profile.count('ManufacturerExits', alive & (state.m_comp < 0))
+    state.m_alive = alive & (state.m_comp >= 0)
+    _lap(state, 'Entry')
+
+
+def _suppliers(state, p):
+    """(F) random walk, green-zone gains, price-sensitive entry and exit."""
+    G, R = p.grid_size, state.replicates
+    alive = state.s_alive
+    wander = _draw(state, 'supplier_wander', 'uniform', alive.shape, -25.0, 25.0)
+    # Only the occupied slots move: a free slot gets a fresh position and heading when it is refilled
+    n = _occupied(alive)
+    heading, x, y = (np.array(a, dtype=float) for a in (state.s_heading, state.s_x, state.s_y))
+    heading[:, :n] += wander[:, :n]
+    x[:, :n], y[:, :n] = _walk(x[:, :n], y[:, :n], heading[:, :n], 0.7, G)
+    state.s_heading, state.s_x, state.s_y = heading, x, y
+
+    on_green = np.take_along_axis(state.green.reshape(R, -1), _patch_index(state.s_x, state.s_y, G), axis=1)
+    mean_ai = _masked_mean(state.m_ai, state.m_alive, 0.0)
+    state.s_comp = np.where(on_green, state.s_comp + 1 + p.gamma * mean_ai[:, None], state.s_comp - 0.65)
+
+    n_s = alive.sum(axis=1)
+    n_m = state.m_alive.sum(axis=1)
+    fill = n_s / p.max_suppliers
+    prob = (p.supplier_birth_prob * state.price ** 0.7 * (1 - np.minimum(1.0, fill))
+            * (1 - fill ** 0.3) * (state.price / 1.0) ** 0.5)
+    room = n_s / np.maximum(1, n_m) < 10
+    parents = (alive & on_green & (state.s_comp > 12) & room[:, None]
+               & (_draw(state, 'supplier_birth', 'random', alive.shape) < prob[:, None]))
+    rr, pp, cc = _spawn(alive, parents, p.max_suppliers - n_s)
+    state.s_comp[rr, pp] /= 2
+    state.s_comp[rr, cc] = state.s_comp[rr, pp]
+    state.s_x[rr, cc] = (state.s_x[rr, pp] + _draw(state, 'supplier_x', 'uniform', low=-1, at=(rr, cc))) % G
+    state.s_y[rr, cc] = (state.s_y[rr, pp] + _draw(state, 'supplier_y', 'uniform', low=-1, at=(rr, cc))) % G
+    state.s_heading[rr, cc] = _draw(state, 'supplier_heading', 'random', at=(rr, cc)) * 360.0
+    alive[rr, cc] = True
+
+    if state.profile is not None:
+        state.profile.count('SupplierEntries', np.bincount(rr, minlength=R))
+        state.profile.count('SupplierExits', alive & (state.s_comp < 0))
+    state.s_alive = alive & (state.s_comp >= 0)
+
+
+def _patches(state, p):
+    """(G) background green transition, accelerated by the average AI level."""
+    mean_ai = _masked_mean(state.m_ai, state.m_alive, 0.0)
+    brown = ~state.green
+    state.countdown = np.where(brown, state.countdown - (0.1 + 0.5 * p.epsilon * mean_ai)[:, None, None],
+                               state.countdown)
+    certified = brown & (state.countdown <= 0)
+    state.green = state.green | certified
+    state.countdown[certified] = 0.0
+    _count(state, 'BackgroundGreening', certified)
+
+
+def apply_shock(state, params, hit):
+    """(H) external shock in the replicates flagged by ``hit``: patches revert to brown, firms lose competitiveness."""
+    p, R = params, state.replicates
+    if not hit.any():
+        return
+    cells = p.grid_size * p.grid_size
+    k = int(p.shock_patch_share * cells)
+    chosen = np.argsort(_draw(state, 'shock_patches', 'random', (R, cells)), axis=1)[:, :k]
+    affected = np.zeros((R, cells), dtype=bool)
+    np.put_along_axis(affected, chosen, True, axis=1)
+    affected &= hit[:, None]
+    _count(state, 'ShockedPatches', affected)
+    green, countdown = state.green.reshape(R, -1), state.countdown.reshape(R, -1)
+    green[affected] = False
+    countdown[affected] += _draw(state, 'shock_countdown', 'integers', low=0, high=30, at=np.nonzero(affected))
+    state.m_comp = np.where(hit[:, None], state.m_comp * (1 - p.shock_magnitude), state.m_comp)
+
+
+def step(state, params):
+    """Advance every replicate by one tick."""
+    p = params
+    state.tick += 1
+    _lap(state, None)
+    n_m, _ = _market(state, p)
+    _lap(state, 'Market')
+    green_ratio = state.green.mean(axis=(1, 2))
+    green_subsidy, ai_subsidy = _fiscal(state, p, n_m, green_ratio)
+    _lap(state, 'Fiscal')
+    _manufacturers(state, p, green_subsidy, ai_subsidy)
+    _suppliers(state, p)
+    _lap(state, 'Suppliers')
+    _patches(state, p)
+    _lap(state, 'Patches')
+
+    hit = _draw(state, 'shock_hit', 'random', (state.replicates,)) < p.shock_prob
+    if state.tick == p.shock_tick:
+        hit[:] = True
+    apply_shock(state, p, hit)
+    _lap(state, 'Shock')
+    _store(state, float_dtype(p))
+
+
+# ==================== Recording ====================
+def reporters(state):
+    """Current values of the exported reporters, one (R,) array per schema column."""
+    return {
+        'tick': np.full(state.replicates, state.tick),
+        'NumAIFactories': state.m_alive.sum(axis=1),
+        'NumSuppliers': state.s_alive.sum(axis=1),
+        'GreenZones': state.green.sum(axis=(1, 2)),
+        'AvgAILevel': _masked_mean(state.m_ai, state.m_alive, 0.0),
+        'AvgAIGen': _masked_mean(state.m_gen, state.m_alive, 1.0),
+        'MarketPrice': state.price,
+        'GovBudget': state.budget,
+        'TransitionFund': state.fund,
+        'Supply': state.supply,
+        'Demand': state.demand,
+        'Patches': np.full(state.replicates, state.green[0].size),
+    }
+
+
+def simulate(params=None, seed=None, replicates=1, observers=(), state=None, first_replicate=0):
+    """Run R replicates and return an (R, rows, len(SCHEMA)) array of recorded reporters.
+
+    Each observer is called as ``observer(state)`` at tick 0 and after every tick;
+    a true return value stops the run after that tick.  Given a ``state`` (e.g. a
+    restored snapshot, see tis_abm.checkpoint) the run continues from its tick up
+    to ``params.ticks`` instead, and the first row is that of the given state;
+    ``seed`` and ``replicates`` are then ignored.  With ``rng='counter'`` the
+    replicates are numbered from ``first_replicate``, so replicate i of a
+    larger ensemble can be rerun alone as ``simulate(p, seed, 1, first_replicate=i)``.
+    """
+    p = params or Params()
+    if state is None:
+        state = init_state(p, seed, replicates, first_replicate)
+    for observe in observers:
+        observe(state)
+    rows = [reporters(state)]
+    while state.tick < p.ticks:
+        if not (state.m_alive.any(axis=1) | state.s_alive.any(axis=1)).any():
+            break
+        step(state, p)
+        stop = [observe(state) for observe in observers]
+        if state.tick % p.record_every == 0:
+            rows.append(reporters(state))
+        if any(stop):
+            break
+    return np.stack([np.stack([row[c] for c in SCHEMA], axis=-1) for row in rows], axis=1).astype(float)
+
+
+def to_frame(table):
+    """One replicate's (rows, columns) array as a DataFrame in the exported schema."""
+    df = pd.DataFrame(table, columns=SCHEMA)
+    df[INTEGER_COLUMNS] = df[INTEGER_COLUMNS].astype(int)
+    return df.round(EXPORT_DECIMALS)
+
+
+def run(params=None, seed=None, observers=()):
+    """Single headless run returning the smart-green-manufacturing-data-v8.0.csv table."""
+    return to_frame(simulate(params, seed, replicates=1, observers=observers)[0])
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from .params import Params, SCHEMA
+from .engine import simulate
+from .monitor import publishers
+
+# Quantile bands reported next to the mean and standard deviation
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def run_ensemble(params=None, seed=None, replicates=100, batch_size=64):
+    """Run R replicates as stacked array computations, ``batch_size`` replicates per batch.
+
+    Returns an (R, rows, len(SCHEMA)) array.  Batching bounds peak memory;
+    each batch gets an independent child seed.  With ``rng='counter'`` every
+    batch shares the master seed and numbers its replicates on from the
+    previous one instead, so the result does not depend on ``batch_size``.
+    Batches stream to a live monitor when one is configured (tis_abm.monitor).
+    """
+    p = params or Params()
+    starts = range(0, replicates, batch_size)
+    sizes = [min(batch_size, replicates - start) for start in starts]
+    if p.rng == 'counter':
+        master = np.random.SeedSequence(seed)
+        tables = [simulate(p, master, n, observers=publishers('ensemble', start), first_replicate=start)
+                  for start, n in zip(starts, sizes)]
+    else:
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        tables = [simulate(p, s, replicates=n, observers=publishers('ensemble', start))
+                  for start, s, n in zip(starts, seeds, sizes)]
+    rows = min(t.shape[1] for t in tables)
+    return np.concatenate([t[:, :rows] for t in tables], axis=0)
+
+
+def quantile_label(q):
+    return f'q{int(round(q * 100)):02d}'
+
+
+def summarize(tables, quantiles=QUANTILES):
+    """Per-tick ensemble statistics.
+
+    Mean values keep the plain schema column names so the Figure scripts can
+    read a summary like a single run; ``<column>_std`` and ``<column>_qNN``
+    hold the spread.
+    """
+    ticks = tables[0, :, 0]
+    values = tables[:, :, 1:]
+    mean = values.mean(axis=0)
+    std = values.std(axis=0, ddof=1) if len(tables) > 1 else np.zeros_like(mean)
+    bands = np.quantile(values, quantiles, axis=0)
+
+    data = {'tick': ticks.astype(int)}
+    for i, column in enumerate(SCHEMA[1:]):
+        data[column] = mean[:, i]
+    for i, column in enumerate(SCHEMA[1:]):
+        data[f'{column}_std'] = std[:, i]
+        for q, band in zip(quantiles, bands):
+            data[f'{column}_{quantile_label(q)}'] = band[:, i]
+    df = pd.DataFrame(data)
+    df.insert(1, 'replicates', len(tables))
+    return df.round(4)
+
+
+def ensemble(params=None, seed=None, replicates=100, batch_size=64, quantiles=QUANTILES):
+    """Run an ensemble and return its per-tick summary table."""
+    return summarize(run_ensemble(params, seed, replicates, batch_size), quantiles)
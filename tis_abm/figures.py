@@ -0,0 +1,78 @@
+import os
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+
+from .gridstream import FIRST_YEAR, TICKS_PER_YEAR
+
+# ==================== Shared Helpers for the Figure Scripts ====================
+# Policy targets marked on every time-series panel: 2030 (t=144), 2060 (t=504)
+MILESTONES = {144: '2030\nCarbon Peak', 504: '2060\nCarbon Neutrality'}
+
+# Patches of the 33 x 33 NetLogo world, for exports without a Patches column
+NETLOGO_PATCHES = 33 * 33
+
+
+def total_patches(df):
+    """Number of patches a table was recorded on, to turn GreenZones into a coverage ratio."""
+    if 'Patches' in df.columns:
+        recorded = df['Patches'].to_numpy()
+        recorded = recorded[recorded > 0]
+        if len(recorded):
+            return int(round(recorded.max()))
+    return NETLOGO_PATCHES
+
+
+def value_at(df, tick, column):
+    """``column`` at ``tick``, interpolated between the recorded ticks when that tick was not recorded."""
+    df = df.sort_values('tick')
+    return float(np.interp(tick, df['tick'].to_numpy(dtype=float), df[column].to_numpy(dtype=float)))
+
+
+def calendar_year(tick):
+    """Calendar year of a monthly time step (tick 0 is January 2018)."""
+    return FIRST_YEAR + int(tick // TICKS_PER_YEAR)
+
+
+def save_plot(fig, filename, directory='figures', show=False):
+    """Save figure in both high-resolution PNG and vector PDF formats."""
+    os.makedirs(directory, exist_ok=True)
+    fig.savefig(os.path.join(directory, f'{filename}.png'), bbox_inches='tight', dpi=300)
+    fig.savefig(os.path.join(directory, f'{filename}.pdf'), bbox_inches='tight')
+    if show and matplotlib.get_backend().lower() != 'agg':
+        plt.show()
+    plt.close(fig)
+
+
+def plot_with_band(ax, df, column, scale=1.0, **kwargs):
+    """Plot a series; ensemble summaries also get a 5-95% quantile ribbon."""
+    line, = ax.plot(df['tick'], df[column] / scale, **kwargs)
+    lo, hi = f'{column}_q05', f'{column}_q95'
+    if lo in df.columns and hi in df.columns:
+        ax.fill_between(df['tick'], df[lo] / scale, df[hi] / scale,
+                        color=line.get_color(), alpha=0.2, linewidth=0)
+    return line
+
+
+def add_calendar_year_axis(ax, step=60, milestones=True, label_height=0.96, alpha=0.8):
+    """Add a top calendar-year axis and, optionally, annotate the 2030/2060 policy milestones."""
+    ax.set_xlabel('Time Step')
+
+    secax = ax.secondary_xaxis('top')
+    secax.set_xlabel('Calendar Year', color='darkred')
+    year_ticks = np.arange(0, 501, step)
+    year_labels = [str(calendar_year(t)) for t in year_ticks]
+    secax.set_ticks(year_ticks)
+    secax.set_xticklabels(year_labels, color='darkred', fontsize=14)
+
+    if not milestones:
+        return
+    for tick, label in MILESTONES.items():
+        if tick <= 500:
+            ax.axvline(x=tick, color='gray', linestyle='--', linewidth=1.5, alpha=alpha)
+            ax.text(
+                tick, ax.get_ylim()[1] * label_height, label,
+                ha='center', va='top', color='gray', fontsize=11,
+                bbox=dict(boxstyle="round,pad=0.3", facecolor="white", edgecolor="gray", alpha=0.9)
+            )
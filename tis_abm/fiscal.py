@@ -0,0 +1,235 @@
+import numpy as np
+import pandas as pd
+
+from .params import Params, policy_params
+
+# ==================== Fiscal Subsystem (Algorithm 1, block D; Figure 1 loop) ====================
+# Taxes feed the transition fund, the fund releases counter-cyclically into the
+# government budget, and the budget scales the subsidies paid to firms.  One
+# tick of it is fiscal_step(), which the engine calls and which takes its
+# inputs as arrays:
+#
+#   manufacturers   active manufacturers (energy tax base)
+#   brown           manufacturers with AI level below BROWN_LEVEL (carbon tax base)
+#   green_ratio     green share of the grid (the release rate rises as it falls)
+#   shocked         whether a scheduled shock hit within SHOCK_RESPONSE_TICKS
+#
+# The rule is read from the RULE_FIELDS of a Params, and every rule field may
+# be an array instead of a number: with (R,) arrays each replicate of an
+# engine run follows its own rule (coupled_params), and with (P, 1) arrays
+# replay() applies P rules to the same recorded inputs in one pass.
+
+RULE_FIELDS = ['carbon_tax', 'energy_tax', 'green_subsidy', 'ai_subsidy', 'budget_floor', 'shock_release']
+
+# Fiscal inputs per tick, as recorded by FiscalRecorder
+INPUTS = ['manufacturers', 'brown', 'green_ratio', 'green_claims', 'ai_claims', 'shocked']
+
+# Manufacturers below this AI level pay the carbon tax
+BROWN_LEVEL = 0.5
+
+# Tax shares: carbon tax assessed on brown firms, and the parts of each tax paid into the fund
+CARBON_ASSESSED = 0.8
+FUND_CARBON_SHARE = 0.4
+FUND_ENERGY_SHARE = 0.3
+
+# Fund release rate: base + gap * (1 - green ratio), boosted by up to RELEASE_BOOST_CAP
+# as the fund grows past RELEASE_BOOST_SCALE, and never more than RELEASE_MAX of the fund
+RELEASE_BASE = 0.15
+RELEASE_GAP = 0.2
+RELEASE_BOOST_SCALE = 100.0
+RELEASE_BOOST_CAP = 2.0
+RELEASE_MAX = 0.9
+
+# Subsidies are paid in full while the budget is at least this, and scaled down below it
+FULL_SUBSIDY_BUDGET = 200.0
+
+# Ticks after a scheduled shock during which shock_release adds to the release rate
+SHOCK_RESPONSE_TICKS = 12
+
+REGIMES = ['static', 'dynamic', 'mixed']
+
+
+def shock_window(tick, shock_tick):
+    """Whether ``tick`` falls within SHOCK_RESPONSE_TICKS after a scheduled shock."""
+    return shock_tick >= 0 and 0 < tick - shock_tick <= SHOCK_RESPONSE_TICKS
+
+
+def fiscal_step(budget, fund, manufacturers, brown, green_ratio, shocked, rule):
+    """One tick of taxes -> fund -> budget; returns (budget, fund, green subsidy, AI subsidy).
+
+    The subsidies are the amounts per paid claim this tick.  All arguments
+    broadcast against each other.
+    """
+    carbon = CARBON_ASSESSED * rule.carbon_tax * brown
+    energy = rule.energy_tax * manufacturers
+    fund = fund + FUND_CARBON_SHARE * carbon + FUND_ENERGY_SHARE * energy
+
+    release_rate = ((RELEASE_BASE + RELEASE_GAP * (1 - green_ratio) + rule.shock_release * shocked)
+                    * (1 + np.minimum(fund / RELEASE_BOOST_SCALE, RELEASE_BOOST_CAP)))
+    released = np.minimum(release_rate * fund, RELEASE_MAX * fund)
+    fund = fund - released
+    budget = np.maximum(budget + released, rule.budget_floor)
+
+    scale = np.minimum(1.0, budget / FULL_SUBSIDY_BUDGET)
+    return budget, fund, scale * rule.green_subsidy, scale * rule.ai_subsidy
+
+
+def pay_claims(budget, amount, claims):
+    """Pay ``claims`` of ``amount`` each while the budget lasts; returns (spent, budget).
+
+    As in the engine the k-th claim is paid while k * amount fits the
+    budget, so whole claims are paid and the remainder is kept.
+    """
+    budget, amount, claims = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (budget, amount, claims)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fits = np.where(amount > 0, np.floor(budget / amount), np.where(budget >= 0, np.inf, 0.0))
+        # Correct the division's rounding to the largest k with k * amount <= budget
+        fits = np.where((fits + 1) * amount <= budget, fits + 1, fits)
+        fits = np.where(fits * amount > budget, fits - 1, fits)
+    spent = np.clip(np.minimum(claims, fits), 0.0, None) * amount
+    return spent, budget - spent
+
+
+# ==================== Rules ====================
+def rule_params(rules, base=None, shape=(-1, 1)):
+    """Params whose RULE_FIELDS are arrays over ``rules`` (dicts of overrides), reshaped to ``shape``.
+
+    Fields a rule leaves out keep the value of ``base`` (default: dynamic regime).
+    """
+    base = base or policy_params('dynamic')
+    arrays = {f: np.array([float(r.get(f, getattr(base, f))) for r in rules]).reshape(shape)
+              for f in RULE_FIELDS}
+    return base.with_(**arrays)
+
+
+def coupled_params(params, rules, replicates=1):
+    """Params for one engine batch in which every rule runs ``replicates`` replicates, rule-major.
+
+    simulate(coupled_params(p, rules, R), seed, len(rules) * R) couples all the
+    rules to the full model at once.
+    """
+    repeated = [r for r in rules for _ in range(replicates)]
+    return rule_params(repeated, params, shape=(-1,))
+
+
+def regime_simplex(steps=20):
+    """(P, 3) weights on REGIMES covering the simplex in 1/steps increments."""
+    return np.array([(i / steps, j / steps, (steps - i - j) / steps)
+                     for i in range(steps + 1) for j in range(steps + 1 - i)])
+
+
+def blend_regimes(weights):
+    """Rule overrides mixing the Table 7 regimes with each row of (P, 3) ``weights``."""
+    values = np.array([[getattr(policy_params(r), f) for f in RULE_FIELDS] for r in REGIMES])
+    rules = []
+    for w in np.atleast_2d(weights):
+        rule = {f'w_{r}': float(x) for r, x in zip(REGIMES, w)}
+        rule.update(zip(RULE_FIELDS, (np.asarray(w) @ values).tolist()))
+        rules.append(rule)
+    return rules
+
+
+# ==================== Recorded Inputs ====================
+class FiscalRecorder:
+    """Observer recording the fiscal inputs of every tick of a run as (ticks, R) arrays.
+
+    The state after tick t is what the fiscal step of tick t + 1 sees, and
+    the subsidy claims are those the engine drew during tick t + 1
+    (State.claims), so replay() of the run's own rule reproduces its budget.
+    """
+
+    def __init__(self, params=None):
+        self.params = params or Params()
+        self.rows = {name: [] for name in INPUTS}
+        self.initial = None
+
+    def __call__(self, state):
+        p = self.params
+        if self.initial is None:
+            self.initial = dict(budget=state.budget.copy(), fund=state.fund.copy())
+        else:
+            self.rows['green_claims'].append(state.claims['green'])
+            self.rows['ai_claims'].append(state.claims['ai'])
+        if state.tick >= p.ticks:
+            return
+        alive = state.m_alive
+        self.rows['manufacturers'].append(alive.sum(axis=1))
+        self.rows['brown'].append((alive & (state.m_ai < BROWN_LEVEL)).sum(axis=1))
+        self.rows['green_ratio'].append(state.green.mean(axis=(1, 2)))
+        self.rows['shocked'].append(np.full(state.replicates, shock_window(state.tick + 1, p.shock_tick)))
+
+    def inputs(self):
+        """Dict of INPUTS -> (ticks, R) arrays, row t feeding tick t + 1."""
+        ticks = len(self.rows['green_claims'])
+        return {name: np.array(rows[:ticks], dtype=float) for name, rows in self.rows.items()}
+
+
+def inputs_from_table(df, params=None):
+    """Estimated per-tick fiscal inputs (ticks, 1) of an exported table such as a NetLogo CSV.
+
+    The exports record manufacturers and green zones every ``record_every``
+    ticks but not the firms behind the tax bases and claims, so those are
+    estimated: the brown share falls linearly from 1 to 0 as AvgAILevel rises
+    to BROWN_LEVEL, green claims assume firms spread like the green patches,
+    and AI claims assume every firm past AI level 0.3 once AvgAILevel is.
+    """
+    p = params or Params()
+    df = df.sort_values('tick')
+    ticks = np.arange(int(df['tick'].iloc[0]), int(df['tick'].iloc[-1]))
+    patches = df['Patches'].to_numpy()[-1] if 'Patches' in df.columns else p.grid_size ** 2
+
+    def interp(values):
+        return np.interp(ticks, df['tick'].to_numpy(), np.asarray(values, dtype=float))[:, None]
+
+    firms = interp(df['NumAIFactories'])
+    level = interp(df['AvgAILevel'])
+    green = interp(df['GreenZones'] / patches)
+    return dict(manufacturers=firms, brown=firms * np.clip(1 - level / BROWN_LEVEL, 0, 1), green_ratio=green,
+                green_claims=p.subsidy_prob * firms * green,
+                ai_claims=p.subsidy_prob * firms * (level > 0.3),
+                shocked=np.array([shock_window(t + 1, p.shock_tick) for t in ticks], dtype=float)[:, None])
+
+
+# ==================== Batch Replay ====================
+def replay(inputs, rules, initial_budget=None, initial_fund=None):
+    """Run ``rules`` (a Params from rule_params) over recorded ``inputs`` for every tick at once.
+
+    Firm behaviour and the claims drawn are held at the recorded trajectory
+    (subsidies paid do not feed back into competitiveness), so for the rule
+    that produced a FiscalRecorder recording the budget and fund match the
+    engine run exactly; other rules are what-ifs on the same firms.
+    Returns dict of (ticks, P, R) arrays:
+    GovBudget, TransitionFund, GreenSubsidies, AISubsidies (amounts paid).
+    """
+    rule = rules
+    T, R = inputs['manufacturers'].shape
+    P = np.broadcast_shapes(*(np.shape(getattr(rule, f)) for f in RULE_FIELDS))[0]
+    budget = np.broadcast_to(rule.initial_budget if initial_budget is None else initial_budget, (P, R)).astype(float)
+    fund = np.broadcast_to(rule.initial_fund if initial_fund is None else initial_fund, (P, R)).astype(float)
+    out = {name: np.empty((T, P, R)) for name in ['GovBudget', 'TransitionFund', 'GreenSubsidies', 'AISubsidies']}
+    for t in range(T):
+        budget, fund, green_amount, ai_amount = fiscal_step(
+            budget, fund, inputs['manufacturers'][t], inputs['brown'][t], inputs['green_ratio'][t],
+            inputs['shocked'][t], rule)
+        green_spent, budget = pay_claims(budget, green_amount, inputs['green_claims'][t])
+        ai_spent, budget = pay_claims(budget, ai_amount, inputs['ai_claims'][t])
+        out['GovBudget'][t], out['TransitionFund'][t] = budget, fund
+        out['GreenSubsidies'][t], out['AISubsidies'][t] = green_spent, ai_spent
+    return out
+
+
+def policy_metrics(rules, result):
+    """One row per rule: its fields and replicate means of the budget path and subsidies paid."""
+    df = pd.DataFrame(rules)
+    budget = result['GovBudget']
+    df['FinalBudget'] = budget[-1].mean(axis=-1)
+    df['MinBudget'] = budget.min(axis=0).mean(axis=-1)
+    df['FinalFund'] = result['TransitionFund'][-1].mean(axis=-1)
+    df['GreenSubsidiesPaid'] = result['GreenSubsidies'].sum(axis=0).mean(axis=-1)
+    df['AISubsidiesPaid'] = result['AISubsidies'].sum(axis=0).mean(axis=-1)
+    return df
+
+
+def search(inputs, rules, base=None, initial_budget=None, initial_fund=None):
+    """Replay every rule (dicts of overrides) over ``inputs`` and return policy_metrics()."""
+    return policy_metrics(rules, replay(inputs, rule_params(rules, base), initial_budget, initial_fund))
@@ -0,0 +1,101 @@
+import os
+import struct
+
+import numpy as np
+
+# ==================== Bit-Packed Green-Grid Stream ====================
+# Append-only binary file with one frame per tick:
+#
+#   header   b'TISG', version, grid size, replicates, first tick   (5 x 4 bytes)
+#   frame    for each replicate, the G x G green mask packed 8 cells per byte
+#
+# A 33 x 33 grid packs into 137 bytes per replicate and tick, so a 500-tick
+# run is about 69 KB.  Frames have a fixed size, so any tick is a random-access
+# slice of the memory-mapped file.
+
+MAGIC = b'TISG'
+VERSION = 1
+HEADER = struct.Struct('<4siiii')
+
+FIRST_YEAR = 2018
+TICKS_PER_YEAR = 12
+
+
+def year_to_tick(year):
+    return (year - FIRST_YEAR) * TICKS_PER_YEAR
+
+
+class GridStreamWriter:
+    """Observer that appends the green grid of every replicate on every tick."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __call__(self, state):
+        if self.file is None:
+            R, G, _ = state.green.shape
+            self.file = open(self.path, 'wb')
+            self.file.write(HEADER.pack(MAGIC, VERSION, G, R, state.tick))
+        self.file.write(np.packbits(state.green.reshape(state.replicates, -1), axis=1).tobytes())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GridStream:
+    """Random-access reader over a grid stream file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, self.grid_size, self.replicates, self.first_tick = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} grid stream')
+        self.frame_bytes = (self.grid_size * self.grid_size + 7) // 8
+        stride = self.replicates * self.frame_bytes
+        self.frames = (os.path.getsize(path) - HEADER.size) // stride
+        self._data = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER.size,
+                               shape=(self.frames, self.replicates, self.frame_bytes))
+
+    @property
+    def ticks(self):
+        return np.arange(self.first_tick, self.first_tick + self.frames)
+
+    def _unpack(self, packed):
+        cells = self.grid_size * self.grid_size
+        bits = np.unpackbits(packed, axis=-1, count=cells)
+        return bits.reshape(*packed.shape[:-1], self.grid_size, self.grid_size).astype(bool)
+
+    def _index(self, ticks):
+        i = np.asarray(ticks) - self.first_tick
+        outside = (i < 0) | (i >= self.frames)
+        if np.any(outside):
+            tick = np.asarray(ticks)[outside].flat[0]
+            raise IndexError(f'tick {tick} not in stream ({self.first_tick}..{self.first_tick + self.frames - 1})')
+        return i
+
+    def frame(self, tick, replicate=0):
+        """(G, G) green mask at ``tick``."""
+        return self._unpack(self._data[self._index(tick), replicate])
+
+    def select(self, ticks, replicate=0):
+        """(len(ticks), G, G) green masks; raises IndexError for ticks outside the stream."""
+        return self._unpack(self._data[self._index(ticks), replicate])
+
+    def years(self, years, replicate=0):
+        """Green masks at the first month of each calendar year."""
+        return self.select([year_to_tick(y) for y in years], replicate)
+
+    def coverage(self, replicate=0):
+        """Number of green patches per tick, straight from the packed bytes."""
+        table = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+        return table[self._data[:, replicate]].sum(axis=1)
@@ -0,0 +1,198 @@
+import csv
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .params import SCHEMA
+from .store import COLUMN_DTYPES, MISSING_INT, Store, default_root
+
+# ==================== BehaviorSpace Ingestion ====================
+# NetLogo BehaviorSpace "table" output starts with six metadata lines (title,
+# model, experiment, date, and the world extent) followed by one row per run
+# and step:
+#
+#   "[run number]", <parameter columns>..., "[step]", <reporter columns>...
+#
+# With parallel runs the rows of different runs are interleaved.  ingest()
+# reads such a file in CHUNK_ROWS-row chunks and never holds more than one
+# chunk and one run in memory:
+#
+#   1. each chunk's rows are appended to a scratch file per run (float64
+#      records of step and reporters), and the parameters of each run are
+#      taken from its first row;
+#   2. every run is then read back, sorted by step and appended to the
+#      columnar store, so its rows are contiguous there.
+#
+# Reporters are mapped onto the schema (tick, NumAIFactories ... Demand) by
+# their NetLogo expression (REPORTERS, compared case- and punctuation-
+# insensitively) or by an explicit mapping; Patches comes from the world
+# extent.  Each parameter combination becomes one scenario, labelled like a
+# sweep point (name/beta=2.0,spillover_radius=3), and each run one seed, so
+# load_results(scenario) averages the repetitions like any sweep.
+
+TITLE = 'BehaviorSpace results'
+HEADER_LINES = 6
+RUN_COLUMN = '[run number]'
+STEP_COLUMN = '[step]'
+
+CHUNK_ROWS = 100_000
+
+# Runs appended to the store between commits of its meta.json
+COMMIT_EVERY = 200
+
+# Normalized reporter expression -> schema column
+REPORTERS = {
+    'countmanufacturers': 'NumAIFactories',
+    'countaifactories': 'NumAIFactories',
+    'countfactories': 'NumAIFactories',
+    'countsuppliers': 'NumSuppliers',
+    'countpatcheswithgreen': 'GreenZones',
+    'countpatcheswithpcolorgreen': 'GreenZones',
+    'greenzones': 'GreenZones',
+    'meanailevelofmanufacturers': 'AvgAILevel',
+    'meanailevelofaifactories': 'AvgAILevel',
+    'meanaigenerationofmanufacturers': 'AvgAIGen',
+    'meanaigenofmanufacturers': 'AvgAIGen',
+    'meanaigenerationofaifactories': 'AvgAIGen',
+    'marketprice': 'MarketPrice',
+    'price': 'MarketPrice',
+    'govbudget': 'GovBudget',
+    'governmentbudget': 'GovBudget',
+    'budget': 'GovBudget',
+    'transitionfund': 'TransitionFund',
+    'fund': 'TransitionFund',
+    'supply': 'Supply',
+    'totalsupply': 'Supply',
+    'demand': 'Demand',
+    'totaldemand': 'Demand',
+}
+
+
+def normalize(expression):
+    """Lower-case letters and digits of a reporter expression ('mean [ai-level] of manufacturers' -> ...)."""
+    return re.sub(r'[^0-9a-z]', '', expression.lower())
+
+
+def parameter_name(name):
+    """Params-style name of a BehaviorSpace parameter ('spillover-radius' -> 'spillover_radius')."""
+    return re.sub(r'[^0-9a-zA-Z]+', '_', name).strip('_')
+
+
+def _value(text):
+    text = text.strip().strip('"')
+    if text in ('true', 'false'):
+        return text == 'true'
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return int(number) if number.is_integer() and not any(c in text for c in '.eE') else number
+
+
+def read_header(path):
+    """Metadata of a BehaviorSpace table: experiment, model, date, patches and columns.
+
+    Raises ValueError for files that are not BehaviorSpace table output.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        lines = [row for _, row in zip(range(HEADER_LINES + 1), csv.reader(f))]
+    if len(lines) <= HEADER_LINES or not lines[0] or not lines[0][0].startswith(TITLE):
+        raise ValueError(f'{path} is not a BehaviorSpace results file')
+    columns = lines[HEADER_LINES]
+    if RUN_COLUMN not in columns or STEP_COLUMN not in columns:
+        raise ValueError(f'{path} is not in BehaviorSpace table format (spreadsheet output is not supported)')
+    extent = dict(zip(lines[4], (float(v) for v in lines[5])))
+    patches = None
+    if {'min-pxcor', 'max-pxcor', 'min-pycor', 'max-pycor'} <= set(extent):
+        patches = int((extent['max-pxcor'] - extent['min-pxcor'] + 1) * (extent['max-pycor'] - extent['min-pycor'] + 1))
+    return dict(model=lines[1][0], experiment=lines[2][0], date=lines[3][0], patches=patches, columns=columns)
+
+
+def map_reporters(columns, mapping=None):
+    """Reporter column -> schema column for the reporters of a table (``mapping`` takes precedence)."""
+    reporters = columns[columns.index(STEP_COLUMN) + 1:]
+    explicit = {normalize(k): v for k, v in (mapping or {}).items()}
+    mapped = {}
+    for reporter in reporters:
+        key = normalize(reporter)
+        column = explicit.get(key) or REPORTERS.get(key) or next((c for c in SCHEMA if normalize(c) == key), None)
+        if column is not None and column not in mapped.values():
+            mapped[reporter] = column
+    return mapped
+
+
+def _label(params, varying):
+    return ','.join(f'{k}={params[k]}' for k in varying)
+
+
+def ingest(path, root=None, scenario=None, mapping=None, chunk_rows=CHUNK_ROWS, log=print):
+    """Load a BehaviorSpace table into the columnar store at ``root`` (default: the results store).
+
+    ``scenario`` names the experiment (default: its BehaviorSpace name);
+    ``mapping`` maps further reporter expressions to schema columns.
+    Re-ingesting a file replaces its runs.  Returns the store's run records.
+    """
+    header = read_header(path)
+    columns = header['columns']
+    name = scenario or header['experiment'] or os.path.splitext(os.path.basename(path))[0]
+    mapped = map_reporters(columns, mapping)
+    if not mapped:
+        raise ValueError(f'None of the reporters of {path} map onto the schema; pass a mapping')
+    parameters = columns[columns.index(RUN_COLUMN) + 1:columns.index(STEP_COLUMN)]
+    skipped = [c for c in columns[columns.index(STEP_COLUMN) + 1:] if c not in mapped]
+    if skipped:
+        log(f"  Reporters without a schema column (skipped): {', '.join(skipped)}")
+    fields = [STEP_COLUMN] + list(mapped)
+
+    store = Store(root or default_root())
+    os.makedirs(store.root, exist_ok=True)
+    run_params, rows = {}, 0
+    with tempfile.TemporaryDirectory(prefix='ingest-', dir=store.root) as scratch:
+        # Pass 1: de-interleave the chunks into one scratch file per run
+        reader = pd.read_csv(path, skiprows=HEADER_LINES, chunksize=chunk_rows,
+                             usecols=[RUN_COLUMN, *parameters, *fields],
+                             dtype={RUN_COLUMN: np.int64, **{p: str for p in parameters}})
+        for chunk in reader:
+            values = chunk[fields].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            runs = chunk[RUN_COLUMN].to_numpy()
+            order = np.argsort(runs, kind='stable')
+            starts = np.flatnonzero(np.r_[True, np.diff(runs[order]) != 0])
+            for lo, hi in zip(starts, np.r_[starts[1:], len(order)]):
+                run = int(runs[order[lo]])
+                if run not in run_params:
+                    first = chunk.iloc[order[lo]]
+                    run_params[run] = {parameter_name(p): _value(str(first[p])) for p in parameters}
+                with open(os.path.join(scratch, f'{run}.bin'), 'ab') as f:
+                    values[order[lo:hi]].tofile(f)
+            rows += len(chunk)
+            log(f"  {rows:,} rows, {len(run_params)} runs")
+
+        # Pass 2: one contiguous, step-ordered run at a time
+        varying = [k for k in (parameter_name(p) for p in parameters)
+                   if len({repr(params[k]) for params in run_params.values()}) > 1]
+        records = []
+        source = dict(source=os.path.abspath(path), experiment=header['experiment'])
+        with store.lock():
+            for n, run in enumerate(sorted(run_params), 1):
+                table = np.fromfile(os.path.join(scratch, f'{run}.bin')).reshape(-1, len(fields))
+                table = table[np.argsort(table[:, 0], kind='stable')]
+                data = {'tick': table[:, 0]}
+                data.update((column, table[:, i + 1]) for i, column in enumerate(mapped.values()))
+                if header['patches'] and 'Patches' not in data:
+                    data['Patches'] = np.full(len(table), header['patches'])
+                for column, values in data.items():
+                    # Missing counts are stored as MISSING_INT unless the column holds fractions
+                    counts = values[~np.isnan(values)]
+                    if np.dtype(COLUMN_DTYPES.get(column, 'float64')).kind == 'i' and (counts == np.round(counts)).all():
+                        data[column] = np.where(np.isnan(values), MISSING_INT, values)
+                params = run_params[run]
+                label = f'{name}/{_label(params, varying)}' if varying else name
+                records.append(store.append(label, data, seed=run, params={**params, **source},
+                                            key=f'behaviorspace:{name}:{run}', replace=True,
+                                            commit=n % COMMIT_EVERY == 0))
+            store.commit()
+    log(f"Ingested {len(records)} runs ({rows:,} rows) of '{name}' into {store.root}")
+    return records
@@ -0,0 +1,96 @@
+import numpy as np
+
+# ==================== Market Clearing (Algorithm 1, block B) ====================
+# Price formation as a clearing problem, solved for every replicate and every
+# market at once: inputs are arrays of any shape (replicates, or replicates x
+# markets) and so is the price.  The market has
+#
+#   demand   D(p) = D0 (p / p0) ** -a
+#   supply   S(p) = S0 (p / p0) ** b,   with a + b = 1 / price_elasticity
+#
+# where D0 is the SVI-driven demand and S0 the active suppliers (at least one),
+# so excess demand falls with the price and the clearing price has the closed
+# form p* = p0 (D0 / S0) ** price_elasticity whatever the split of a and b.
+# The engine perturbs it by the price noise and clips it to
+# [price_min, price_max].  bisect() solves any other monotone excess-demand
+# function with the same array layout, so alternative curves need no loop.
+
+# Share of 1 / price_elasticity taken by the demand side in excess_demand()
+DEMAND_SHARE = 0.5
+
+
+def svi_demand(svi, params):
+    """Emergent demand: flat at D0 below the SVI threshold, then a power-law takeoff."""
+    p = params
+    return p.base_demand * (1.0 + p.demand_scale * np.maximum(svi - p.svi_threshold, 0.0)) ** p.beta
+
+
+def clearing_price(demand, supply, params):
+    """Closed-form clearing price of the constant-elasticity market (before noise and bounds)."""
+    p = params
+    return p.base_price * (demand / np.maximum(1.0, supply)) ** p.price_elasticity
+
+
+def market_price(demand, supply, params, noise=None):
+    """Price the engine records: clearing price times ``noise`` (if given), clipped to the price bounds."""
+    p = params
+    price = clearing_price(demand, supply, p)
+    if noise is not None:
+        price = price * noise
+    return np.clip(price, p.price_min, p.price_max)
+
+
+def excess_demand(price, demand, supply, params):
+    """D(p) - S(p) of the constant-elasticity market, elementwise."""
+    p = params
+    exponent = 1.0 / p.price_elasticity
+    relative = price / p.base_price
+    return demand * relative ** (-DEMAND_SHARE * exponent) - np.maximum(1.0, supply) * relative ** (
+        (1.0 - DEMAND_SHARE) * exponent)
+
+
+def bisect(excess, lo, hi, tol=1e-12, max_iter=200):
+    """Vectorized bisection for the root of a decreasing ``excess(price)`` in [lo, hi].
+
+    ``lo`` and ``hi`` broadcast to the shape of the problem; every element is
+    halved in the same pass.  Elements without a sign change end at the bound
+    the root lies beyond, i.e. the clipped clearing price.
+    """
+    lo, hi = np.broadcast_arrays(np.asarray(lo, dtype=float), np.asarray(hi, dtype=float))
+    lo, hi = lo.copy(), hi.copy()
+    below, above = excess(lo) <= 0, excess(hi) >= 0
+    for _ in range(max_iter):
+        if np.all(hi - lo <= tol * np.maximum(1.0, np.abs(hi))):
+            break
+        mid = 0.5 * (lo + hi)
+        rising = excess(mid) > 0
+        lo = np.where(rising, mid, lo)
+        hi = np.where(rising, hi, mid)
+    price = 0.5 * (lo + hi)
+    return np.where(below, lo, np.where(above, hi, price))
+
+
+def clear(demand, supply, params, method='closed'):
+    """Clipped clearing price of every market, by the closed form or by bisection."""
+    p = params
+    if method == 'closed':
+        return market_price(demand, supply, p)
+    if method == 'bisect':
+        demand, supply = np.broadcast_arrays(np.asarray(demand, dtype=float), np.asarray(supply, dtype=float))
+        return bisect(lambda price: excess_demand(price, demand, supply, p),
+                      np.full(demand.shape, p.price_min), np.full(demand.shape, p.price_max))
+    raise ValueError(f"Unknown clearing method '{method}'; expected 'closed' or 'bisect'")
+
+
+def response(svi, params, supply=None, method='closed'):
+    """Demand and clearing price along an SVI grid (the Figure 7 response) as a dict of arrays.
+
+    ``supply`` defaults to the initial supplier count; any of ``svi`` and
+    ``supply`` may be arrays, e.g. replicates x SVI points.
+    """
+    p = params
+    svi = np.asarray(svi, dtype=float)
+    supply = np.full(svi.shape, float(p.n_suppliers)) if supply is None else np.asarray(supply, dtype=float)
+    demand = svi_demand(svi, p)
+    return dict(SVI=svi, Demand=demand, Supply=np.broadcast_to(supply, demand.shape),
+                MarketPrice=clear(demand, supply, p, method))
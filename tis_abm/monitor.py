@@ -0,0 +1,401 @@
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from .engine import reporters
+
+# ==================== Live Run Monitor ====================
+# Runs publish their tick stream over UDP on localhost, and one monitor
+# process collects it and draws the Figure 4 six-panel view as the runs
+# progress, in the browser or in the terminal:
+#
+#   python -m tis_abm monitor                          # http://127.0.0.1:8766/
+#   python -m tis_abm ensemble --replicates 10000 --monitor 127.0.0.1:8765
+#
+# A TickPublisher observer sends one datagram per tick (per CHUNK replicates):
+# the run name, the tick, the first replicate and the six panel values of
+# every replicate as float32.  Its socket never blocks.  A datagram that does
+# not fit into the send buffer, or that the monitor is too busy to read, is
+# dropped, so streaming never holds up the engine and the monitor only shows
+# fewer points.  run, ensemble and sweep publish every run when started with
+# --monitor, or whenever TIS_ABM_MONITOR=host:port is set.
+#
+# For drawing, every panel of a run is reduced to at most MAX_POINTS points
+# per line: the replicate mean by LTTB (largest triangle three buckets), the
+# range across replicates by min/max decimation of its envelope, and at most
+# MAX_LINES individual trajectories, also by LTTB.  Thousands of replicates
+# then cost the browser no more than a handful.
+
+MONITOR_ENV = 'TIS_ABM_MONITOR'
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+HTTP_PORT = 8766
+
+# magic, version, tick, first replicate, replicates, run-name length; then the name and (replicates, 6) float32
+MAGIC = b'TISM'
+VERSION = 1
+HEADER = struct.Struct('<4siiiii')
+
+# Replicates per datagram (6 float32 each keeps a datagram under 48 KB)
+CHUNK = 2000
+
+# Display budget per panel and run
+MAX_POINTS = 300
+MAX_LINES = 100
+
+# Seconds between dashboard refreshes
+REFRESH = 1.0
+
+# Figure 4 panels: title and colour
+PANELS = [('(a) Manufacturer Count', '#1f77b4'), ('(b) Supplier Count', '#ff7f0e'),
+          ('(c) Green Coverage Rate', '#2ca02c'), ('(d) Average AI Generation', '#9467bd'),
+          ('(e) Relative Energy Intensity', '#d62728'), ('(f) Market Price', '#8c564b')]
+
+
+def parse_address(address):
+    host, _, port = (address or DEFAULT_ADDRESS).rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def panel_values(state):
+    """(R, 6) float32 values of the Figure 4 panels for every replicate."""
+    r = reporters(state)
+    return np.stack([r['NumAIFactories'], r['NumSuppliers'], r['GreenZones'] / r['Patches'], r['AvgAIGen'],
+                     1 / (r['AvgAIGen'] + 0.1), r['MarketPrice']], axis=1).astype(np.float32)
+
+
+# ==================== Publishing ====================
+class TickPublisher:
+    """Observer streaming the panel values of every replicate to a monitor; drops datagrams instead of blocking."""
+
+    def __init__(self, address=None, name='run', first=0, every=1):
+        self.address = parse_address(address)
+        self.name = name.encode('utf-8')
+        self.first = first
+        self.every = every
+        self.sent = self.dropped = 0
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def __call__(self, state):
+        if state.tick % self.every:
+            return
+        values = panel_values(state)
+        for start in range(0, len(values), CHUNK):
+            chunk = values[start:start + CHUNK]
+            packet = HEADER.pack(MAGIC, VERSION, state.tick, self.first + start, len(chunk), len(self.name))
+            try:
+                self.socket.sendto(packet + self.name + chunk.tobytes(), self.address)
+                self.sent += 1
+            except OSError:
+                self.dropped += 1
+
+
+def publishers(name, first=0, address=None):
+    """[TickPublisher] for ``address`` (default: $TIS_ABM_MONITOR), or [] when no monitor is configured."""
+    address = address or os.environ.get(MONITOR_ENV)
+    return [TickPublisher(address, name, first)] if address else []
+
+
+# ==================== Downsampling ====================
+def lttb(x, Y, points=MAX_POINTS):
+    """Largest-triangle-three-buckets downsampling of every row of ``Y`` (L, T) over shared ``x`` (T,).
+
+    Returns (X, Y) of shape (L, points): the first and last samples plus the
+    sample of each bucket spanning the largest triangle with the previously
+    kept sample and the mean of the next bucket.  NaNs are never preferred.
+    """
+    x, Y = np.asarray(x, dtype=float), np.atleast_2d(np.asarray(Y, dtype=float))
+    L, T = Y.shape
+    if T <= points or points < 3:
+        return np.broadcast_to(x, Y.shape).copy(), Y.copy()
+    rows = np.arange(L)
+    edges = np.floor(np.linspace(1, T - 1, points - 1)).astype(np.int64)
+    keep = np.zeros((L, points), dtype=np.int64)
+    keep[:, -1] = T - 1
+    a = keep[:, 0]
+    for i in range(points - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else T
+        if nhi <= nlo:
+            nlo, nhi = T - 1, T
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)   # all-NaN buckets
+            cx, cy = x[nlo:nhi].mean(), np.nanmean(Y[:, nlo:nhi], axis=1)
+        xa, ya = x[a], Y[rows, a]
+        area = np.abs((xa - cx)[:, None] * (Y[:, lo:hi] - ya[:, None])
+                      - (xa[:, None] - x[lo:hi]) * (cy - ya)[:, None])
+        a = lo + np.where(np.isnan(area), -np.inf, area).argmax(axis=1)
+        keep[:, i + 1] = a
+    return x[keep], Y[rows[:, None], keep]
+
+
+def minmax(x, lo, hi, points=MAX_POINTS):
+    """Min/max decimation of an envelope (lo, hi) over ``x`` into at most ``points`` buckets: (x, lo, hi)."""
+    x, lo, hi = (np.asarray(v, dtype=float) for v in (x, lo, hi))
+    if len(x) <= points:
+        return x, lo, hi
+    starts = np.floor(np.linspace(0, len(x), points, endpoint=False)).astype(np.int64)
+    return x[starts], np.fmin.reduceat(lo, starts), np.fmax.reduceat(hi, starts)
+
+
+# ==================== Collecting ====================
+class _Run:
+    """(ticks, replicates, 6) panel values of one named run, NaN where nothing arrived.
+
+    The sum, count, minimum and maximum across replicates are kept up to date
+    per tick as datagrams arrive, so a frame costs the same for 10 or 10,000
+    replicates.  A datagram for a slot that is already filled means the run
+    was started again, and the run is cleared first.
+    """
+
+    def __init__(self):
+        self.values = np.full((0, 0, len(PANELS)), np.nan, dtype=np.float32)
+        self.total, self.count = np.zeros((0, len(PANELS))), np.zeros(0, dtype=np.int64)
+        self.low, self.high = np.zeros((0, len(PANELS))), np.zeros((0, len(PANELS)))
+        self.seen = np.zeros(0, dtype=bool)
+        self.updated = 0.0
+
+    def _grow(self, ticks, replicates):
+        T, R, _ = self.values.shape
+        values = np.full((ticks, replicates, len(PANELS)), np.nan, dtype=np.float32)
+        values[:T, :R] = self.values
+        self.values = values
+        self.seen = np.concatenate([self.seen, np.zeros(replicates - R, dtype=bool)])
+        for name, fill in [('total', 0.0), ('count', 0), ('low', np.inf), ('high', -np.inf)]:
+            old = getattr(self, name)
+            new = np.full((ticks,) + old.shape[1:], fill, dtype=old.dtype)
+            new[:T] = old
+            setattr(self, name, new)
+
+    def put(self, tick, first, values):
+        T, R, _ = self.values.shape
+        need_t, need_r = tick + 1, first + len(values)
+        if need_t > T or need_r > R:
+            self._grow(max(need_t, 2 * T), max(need_r, R))
+        elif np.isfinite(self.values[tick, first:first + len(values), 0]).any():
+            self.__init__()
+            self._grow(need_t, need_r)
+        self.values[tick, first:first + len(values)] = values
+        self.seen[first:first + len(values)] = True
+        self.total[tick] += values.sum(axis=0)
+        self.count[tick] += len(values)
+        self.low[tick] = np.minimum(self.low[tick], values.min(axis=0))
+        self.high[tick] = np.maximum(self.high[tick], values.max(axis=0))
+        self.updated = time.time()
+
+
+class Monitor:
+    """Collects published tick streams on a UDP port and downsamples them for display."""
+
+    def __init__(self, address=None, max_points=MAX_POINTS, max_lines=MAX_LINES):
+        self.address = parse_address(address)
+        self.max_points = max_points
+        self.max_lines = max_lines
+        self.runs = {}
+        self.received = 0
+        self.lock = threading.Lock()
+        self.socket = None
+        self._cache = (0.0, None)
+
+    def start(self):
+        """Bind the port and receive in a daemon thread."""
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+        self.socket.bind(self.address)
+        threading.Thread(target=self._receive, daemon=True).start()
+        return self
+
+    def _receive(self):
+        while True:
+            self.receive(self.socket.recv(1 << 16))
+
+    def receive(self, packet):
+        """Store one datagram; malformed ones are ignored."""
+        if len(packet) < HEADER.size:
+            return
+        magic, version, tick, first, count, length = HEADER.unpack_from(packet)
+        if magic != MAGIC or version != VERSION:
+            return
+        name = packet[HEADER.size:HEADER.size + length].decode('utf-8', 'replace')
+        values = np.frombuffer(packet, dtype=np.float32, offset=HEADER.size + length)
+        if values.size != count * len(PANELS):
+            return
+        with self.lock:
+            self.runs.setdefault(name, _Run()).put(tick, first, values.reshape(count, len(PANELS)))
+            self.received += 1
+
+    def frame(self):
+        """Downsampled view of every run: per panel the mean line, the min/max band and sample trajectories."""
+        runs = {}
+        with self.lock:
+            for name, run in self.runs.items():
+                ticks = np.flatnonzero(run.count)
+                if not len(ticks):
+                    continue
+                replicates = np.flatnonzero(run.seen)
+                shown = replicates[np.linspace(0, len(replicates) - 1, min(len(replicates), self.max_lines))
+                                   .astype(np.int64)]
+                mean = run.total[ticks] / run.count[ticks, None]
+                lo, hi = run.low[ticks], run.high[ticks]
+                lines = run.values[:, shown][ticks]
+                panels = []
+                for k in range(len(PANELS)):
+                    mx, my = lttb(ticks, mean[None, :, k], self.max_points)
+                    bx, blo, bhi = minmax(ticks, lo[:, k], hi[:, k], self.max_points)
+                    lx, ly = lttb(ticks, lines[:, :, k].T, self.max_points)
+                    panels.append(dict(mean=_finite(mx[0], my[0]), band=_finite(bx, blo, bhi),
+                                       lines=[_finite(x, y) for x, y in zip(lx, ly)]))
+                runs[name] = dict(replicates=int(len(replicates)), tick=int(ticks[-1]), panels=panels,
+                                  updated=run.updated)
+        return dict(panels=[dict(title=t, color=c) for t, c in PANELS], runs=runs, received=self.received)
+
+    def frame_json(self, max_age=REFRESH / 2):
+        """frame() as JSON, recomputed at most every ``max_age`` seconds."""
+        made, data = self._cache
+        if data is None or time.time() - made > max_age:
+            data = json.dumps(self.frame()).encode('utf-8')
+            self._cache = (time.time(), data)
+        return data
+
+
+def _finite(x, *columns):
+    """[x, *columns] as lists rounded for display, keeping points where every column is finite."""
+    ok = np.isfinite(x) & np.logical_and.reduce([np.isfinite(c) for c in columns])
+    return [np.round(np.asarray(v)[ok], 4).tolist() for v in (x, *columns)]
+
+
+# ==================== Views ====================
+SPARK = '▁▂▃▄▅▆▇█'
+
+
+def sparkline(values, width=60):
+    """Unicode sparkline of ``values`` resampled to ``width`` characters."""
+    values = np.asarray(values, dtype=float)
+    if not len(values):
+        return ''
+    values = values[np.linspace(0, len(values) - 1, min(width, len(values))).astype(np.int64)]
+    lo, hi = values.min(), values.max()
+    scale = (values - lo) / (hi - lo) if hi > lo else np.zeros_like(values)
+    return ''.join(SPARK[int(round(s * (len(SPARK) - 1)))] for s in scale)
+
+
+def render_text(frame, width=60):
+    """Terminal view of a frame: one sparkline of the replicate mean per panel and run."""
+    lines = [f"tis_abm monitor: {len(frame['runs'])} run(s), {frame['received']} datagrams"]
+    for name, run in sorted(frame['runs'].items()):
+        lines.append(f"\n{name}: {run['replicates']} replicate(s), tick {run['tick']}")
+        for panel, view in zip(frame['panels'], run['panels']):
+            x, y = view['mean']
+            bx, lo, hi = view['band']
+            last = f"{y[-1]:10.4g} [{lo[-1]:.4g}, {hi[-1]:.4g}]" if y and lo else ''
+            lines.append(f"  {panel['title']:<30} {sparkline(y, width):<{width}} {last}")
+    return '\n'.join(lines)
+
+
+def watch(monitor, refresh=REFRESH, out=print):
+    """Redraw the terminal view every ``refresh`` seconds until interrupted."""
+    while True:
+        out('\x1b[H\x1b[2J' + render_text(monitor.frame()))
+        time.sleep(refresh)
+
+
+DASHBOARD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>tis_abm monitor</title>
+<style>
+body { font-family: 'Times New Roman', serif; margin: 12px; }
+#grid { display: grid; grid-template-columns: repeat(3, 1fr); gap: 8px; }
+canvas { width: 100%; height: 300px; border: 1px solid #ccc; }
+h3 { margin: 4px 0; }
+</style></head><body>
+<div id="status">waiting for runs...</div>
+<div id="grid"></div>
+<script>
+const REFRESH = __REFRESH__;
+let frame = null, canvases = [];
+function setup(panels) {
+  const grid = document.getElementById('grid');
+  panels.forEach(p => {
+    const div = document.createElement('div');
+    div.innerHTML = '<h3 style="color:' + p.color + '">' + p.title + '</h3>';
+    const c = document.createElement('canvas');
+    div.appendChild(c); grid.appendChild(div); canvases.push(c);
+  });
+}
+function draw() {
+  if (!frame) return;
+  const names = Object.keys(frame.runs).sort();
+  document.getElementById('status').textContent = names.map(n =>
+    n + ': ' + frame.runs[n].replicates + ' replicates, tick ' + frame.runs[n].tick).join(' | ') || 'waiting for runs...';
+  frame.panels.forEach((panel, k) => {
+    const c = canvases[k], ctx = c.getContext('2d');
+    c.width = c.clientWidth; c.height = c.clientHeight;
+    let x0 = Infinity, x1 = -Infinity, y0 = Infinity, y1 = -Infinity;
+    names.forEach(n => { const b = frame.runs[n].panels[k].band;
+      b[0].forEach((x, i) => { x0 = Math.min(x0, x); x1 = Math.max(x1, x);
+        y0 = Math.min(y0, b[1][i]); y1 = Math.max(y1, b[2][i]); }); });
+    if (!isFinite(x0)) return;
+    if (x1 === x0) x1 = x0 + 1; if (y1 === y0) { y0 -= 1; y1 += 1; }
+    const m = 40, sx = x => m + (x - x0) / (x1 - x0) * (c.width - m - 8),
+          sy = y => c.height - 20 - (y - y0) / (y1 - y0) * (c.height - 28);
+    ctx.fillStyle = '#333'; ctx.font = '11px serif';
+    ctx.fillText(y1.toPrecision(4), 2, 12); ctx.fillText(y0.toPrecision(4), 2, c.height - 22);
+    ctx.fillText(x0, m, c.height - 4); ctx.fillText(x1, c.width - 30, c.height - 4);
+    names.forEach(n => {
+      const view = frame.runs[n].panels[k], b = view.band;
+      ctx.globalAlpha = 0.2; ctx.fillStyle = panel.color; ctx.beginPath();
+      b[0].forEach((x, i) => i ? ctx.lineTo(sx(x), sy(b[2][i])) : ctx.moveTo(sx(x), sy(b[2][i])));
+      for (let i = b[0].length - 1; i >= 0; i--) ctx.lineTo(sx(b[0][i]), sy(b[1][i]));
+      ctx.fill();
+      const line = (xy, width, alpha) => { ctx.globalAlpha = alpha; ctx.lineWidth = width;
+        ctx.strokeStyle = panel.color; ctx.beginPath();
+        xy[0].forEach((x, i) => i ? ctx.lineTo(sx(x), sy(xy[1][i])) : ctx.moveTo(sx(x), sy(xy[1][i])));
+        ctx.stroke(); };
+      view.lines.forEach(xy => line(xy, 1, 0.15));
+      line(view.mean, 3, 1);
+    });
+    ctx.globalAlpha = 1;
+  });
+}
+async function poll() {
+  try {
+    frame = await (await fetch('frame.json')).json();
+    if (!canvases.length) setup(frame.panels);
+    requestAnimationFrame(draw);
+  } catch (e) {}
+  setTimeout(poll, REFRESH * 1000);
+}
+poll();
+</script></body></html>
+"""
+
+
+def serve(monitor, port=HTTP_PORT, host='127.0.0.1', refresh=REFRESH):
+    """Serve the dashboard on http://host:port/ until interrupted."""
+    page = DASHBOARD.replace('__REFRESH__', str(refresh)).encode('utf-8')
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith('/frame.json'):
+                body, kind = monitor.frame_json(refresh / 2), 'application/json'
+            elif self.path in ('/', '/index.html'):
+                body, kind = page, 'text/html; charset=utf-8'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', kind)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer((host, port), Handler).serve_forever()
@@ -0,0 +1,127 @@
+from dataclasses import dataclass, replace
+
+# ==================== Output Schema (matches smart-green-manufacturing-data-v8.0.csv) ====================
+# Patches (grid cells in the world) is recorded after the NetLogo columns, so plots
+# can turn GreenZones into a coverage ratio for any grid size.
+SCHEMA = ['tick', 'NumAIFactories', 'NumSuppliers', 'GreenZones', 'AvgAILevel', 'AvgAIGen',
+          'MarketPrice', 'GovBudget', 'TransitionFund', 'Supply', 'Demand', 'Patches']
+
+# Columns written as whole numbers in the exported NetLogo tables
+INTEGER_COLUMNS = ['tick', 'NumAIFactories', 'NumSuppliers', 'GreenZones', 'Patches']
+
+# Decimals of the other columns in the exported tables (and in sweep stores)
+EXPORT_DECIMALS = 4
+
+
+# ==================== Baseline Parameters (Table 2, Appendix A.3, Algorithm 1) ====================
+@dataclass(frozen=True)
+class Params:
+    """Baseline model parameters; field names follow the NetLogo interface sliders."""
+    # Spatial grid and populations
+    grid_size: int = 33
+    n_manufacturers: int = 50
+    n_suppliers: int = 100
+    max_manufacturers: int = 600
+    max_suppliers: int = 1000
+    initial_green_share: float = 0.2
+    initial_countdown: int = 60
+    precision: str = 'double'        # 'single' stores agent and patch floats as float32
+    rng: str = 'sequential'          # 'counter' keys every draw by replicate, tick and mechanism
+
+    # Horizon and recording interval (every tick; the store packs the rows)
+    ticks: int = 500
+    record_every: int = 1
+
+    # Technology and spillovers
+    gamma: float = 0.30
+    delta: float = 0.004
+    epsilon: float = 0.80
+    spillover_radius: float = 7.0
+    spillover_intensity: float = 0.25
+    supplier_radius: float = 3.0
+    spillover_method: str = 'auto'
+    move_radius: float = 15.0
+    max_generation: int = 3
+    cost_regime: str = 'linear'
+    generation_cost_base: float = 15.0
+    generation_cost_step: float = 6.0
+
+    # SVI-driven demand and price formation
+    beta: float = 2.0
+    w_quality: float = 1.0
+    w_green: float = 1.0
+    w_resilience: float = 1.0
+    base_demand: float = 50.0
+    demand_scale: float = 3.2
+    svi_threshold: float = 0.6
+    base_price: float = 1.0
+    price_elasticity: float = 0.25
+    price_noise: float = 0.02
+    price_min: float = 0.6
+    price_max: float = 2.5
+
+    # Government budget and transition fund (Table 7, dynamic fund regime)
+    initial_budget: float = 1000.0
+    initial_fund: float = 0.0
+    budget_floor: float = 150.0
+    shock_release: float = 0.0       # extra fund release rate after a scheduled shock
+    green_subsidy: float = 0.3
+    ai_subsidy: float = 0.3
+    carbon_tax: float = 0.5
+    energy_tax: float = 0.1
+    subsidy_prob: float = 0.3
+
+    # Entry
+    manufacturer_birth_prob: float = 0.015
+    supplier_birth_prob: float = 0.012
+
+    # External shocks (README experiment 5: 25% competitiveness drop at tick 200)
+    shock_prob: float = 0.0
+    shock_tick: int = -1
+    shock_magnitude: float = 0.25
+    shock_patch_share: float = 0.04
+
+    def with_(self, **overrides):
+        """Return a copy with the given fields replaced."""
+        return replace(self, **overrides)
+
+
+def scale_world(base=None, grid_size=None, manufacturers=None, suppliers=None):
+    """Parameters for a larger (or smaller) world.
+
+    Agent counts not given keep the baseline density per patch, and slot
+    capacities keep their baseline ratio to the initial populations, so
+    ``scale_world(grid_size=1000)`` runs about 46,000 manufacturers and 92,000
+    suppliers on a million patches.  Base demand and the government budget
+    grow with the supplier and manufacturer populations, so prices and
+    subsidies per firm stay at their baseline levels.
+    """
+    p = base or Params()
+    grid_size = grid_size or p.grid_size
+    area = (grid_size / p.grid_size) ** 2
+    manufacturers = manufacturers or max(1, round(p.n_manufacturers * area))
+    suppliers = suppliers or max(1, round(p.n_suppliers * area))
+    firms = manufacturers / p.n_manufacturers
+    return p.with_(grid_size=grid_size,
+                   n_manufacturers=manufacturers, n_suppliers=suppliers,
+                   max_manufacturers=-(-manufacturers * p.max_manufacturers // p.n_manufacturers),
+                   max_suppliers=-(-suppliers * p.max_suppliers // p.n_suppliers),
+                   base_demand=p.base_demand * suppliers / p.n_suppliers,
+                   initial_budget=p.initial_budget * firms, initial_fund=p.initial_fund * firms,
+                   budget_floor=p.budget_floor * firms)
+
+
+# ==================== Policy Regimes (Table 7) ====================
+POLICY_REGIMES = {
+    'static': dict(green_subsidy=0.6, ai_subsidy=0.6, carbon_tax=0.0, energy_tax=0.0, budget_floor=0.0),
+    'dynamic': dict(green_subsidy=0.3, ai_subsidy=0.3, carbon_tax=0.5, energy_tax=0.1),
+    'mixed': dict(green_subsidy=0.6, ai_subsidy=0.6, carbon_tax=0.5, energy_tax=0.1),
+}
+
+
+def policy_params(regime, base=None, **overrides):
+    """Baseline parameters with a Table 7 policy regime applied (explicit overrides take precedence)."""
+    if regime not in POLICY_REGIMES:
+        raise ValueError(f"Unknown policy regime '{regime}'; expected one of {sorted(POLICY_REGIMES)}")
+    base = base or Params()
+    return base.with_(**{**POLICY_REGIMES[regime], **overrides})
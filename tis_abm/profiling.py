@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# ==================== Per-Mechanism Profiling ====================
+# A Profiler passed to simulate() as an observer attaches itself to the state on
+# tick 0.  From then on the engine reports to it at fixed points of each tick:
+#
+#   lap(phase)           the wall time since the previous lap belongs to ``phase``
+#   count(event, mask)   per-replicate number of agents/patches the event hit
+#
+# Without a profiler the engine only checks ``state.profile is None`` at those
+# points.  Timings are per tick for all replicates together; counts are per
+# replicate.
+
+# Phases in tick order, as recorded in the Time<phase> columns (seconds)
+PHASES = ['Market', 'Fiscal', 'Movement', 'Certification', 'Spillover', 'Upgrades', 'Diffusion',
+          'Subsidies', 'Entry', 'Suppliers', 'Patches', 'Shock']
+
+# Events counted per tick
+EVENTS = ['Certifications', 'BackgroundGreening', 'GenUpgrades', 'AIUpgrades', 'Learned',
+          'GreenSubsidies', 'AISubsidies', 'ManufacturerEntries', 'ManufacturerExits',
+          'SupplierEntries', 'SupplierExits', 'ShockedPatches']
+
+PROFILE_COLUMNS = [f'Time{phase}' for phase in PHASES] + EVENTS
+
+
+class Profiler:
+    """Observer timing each phase of a tick and counting events per tick.
+
+    ``frame(replicate)`` has one row per tick (a sidecar table);
+    ``columns(ticks, replicate)`` sums those rows over the interval ending at
+    each recorded tick, so they can sit next to the reporters of a run.
+    """
+
+    def __init__(self):
+        self.replicates = None
+        self.ticks, self.rows = [], []
+
+    def _new_row(self):
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.counts = {event: np.zeros(self.replicates, dtype=np.int64) for event in EVENTS}
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        if phase is not None:
+            self.seconds[phase] += now - self.last
+        self.last = now
+
+    def count(self, event, mask):
+        self.counts[event] += np.asarray(mask).reshape(self.replicates, -1).sum(axis=1)
+
+    def __call__(self, state):
+        if self.replicates is None:
+            self.replicates = state.replicates
+            state.profile = self
+        else:
+            self.ticks.append(state.tick)
+            self.rows.append((self.seconds, self.counts))
+        self._new_row()
+        self.last = time.perf_counter()
+
+    def frame(self, replicate=0):
+        """Per-tick phase seconds and event counts of one replicate."""
+        data = {'tick': self.ticks}
+        for phase in PHASES:
+            data[f'Time{phase}'] = [seconds[phase] for seconds, _ in self.rows]
+        for event in EVENTS:
+            data[event] = [int(counts[event][replicate]) for _, counts in self.rows]
+        return pd.DataFrame(data)
+
+    def columns(self, ticks, replicate=0):
+        """Dict of PROFILE_COLUMNS summed over the ticks since the previous entry of ``ticks``."""
+        frame = self.frame(replicate)
+        edges = np.asarray(ticks, dtype=int)
+        interval = np.searchsorted(edges, frame['tick'].to_numpy())
+        sums = frame.drop(columns='tick').groupby(interval).sum().reindex(range(len(edges)), fill_value=0)
+        return {c: sums[c].to_numpy() for c in PROFILE_COLUMNS}
+
+    def totals(self):
+        """Seconds per phase over the whole run."""
+        return {phase: float(sum(seconds[phase] for seconds, _ in self.rows)) for phase in PHASES}
@@ -0,0 +1,250 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .engine import simulate
+from .params import SCHEMA
+from .sweep import make_params
+from .threshold import ThresholdDetector
+
+# ==================== Global Sensitivity Analysis ====================
+# Two designs over the Table 2 parameters, both evaluated one parameter point
+# per task on a process pool (each task runs its seeds as replicates of one
+# batched simulate() call, with the same seeds at every point):
+#
+#   sobol    Saltelli design from a 2k-dimensional Sobol sequence: matrices
+#            A and B plus, per factor i, A with column i taken from B.  Every
+#            factor reuses the same A and B runs, so first-order (Saltelli
+#            2010) and total (Jansen) indices of k factors cost N * (k + 2)
+#            runs instead of N * 2k.
+#   morris   r one-at-a-time trajectories on a p-level grid, (k + 1) runs
+#            each; every step of a trajectory is the elementary effect of
+#            one factor, and consecutive steps share their runs.
+#
+# Confidence intervals come from bootstrapping the N sample rows (Sobol) or the
+# r trajectories (Morris).
+
+# Factor -> (low, high), roughly +-50% around the Table 2 baseline
+FACTORS = {
+    'gamma': (0.15, 0.45),
+    'delta': (0.002, 0.006),
+    'epsilon': (0.4, 1.0),
+    'spillover_radius': (3.0, 11.0),
+    'spillover_intensity': (0.1, 0.4),
+    'supplier_radius': (1.5, 4.5),
+    'beta': (1.0, 3.0),
+    'svi_threshold': (0.4, 0.8),
+    'price_elasticity': (0.1, 0.4),
+    'green_subsidy': (0.15, 0.45),
+    'ai_subsidy': (0.15, 0.45),
+    'carbon_tax': (0.25, 0.75),
+    'manufacturer_birth_prob': (0.008, 0.022),
+    'supplier_birth_prob': (0.006, 0.018),
+}
+
+# Scalar outputs of a run
+OUTPUTS = ['FinalGreenShare', 'TakeoffTick', 'MinBudget']
+
+BOOTSTRAP = 500
+CONFIDENCE = 0.95
+
+
+# ==================== Sobol Sequence ====================
+# Joe & Kuo (2008) direction numbers for dimensions 2..21: (degree, coefficients, initial m)
+_DIRECTIONS = [
+    (1, 0, (1,)), (2, 1, (1, 3)), (3, 1, (1, 3, 1)), (3, 2, (1, 1, 1)), (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)), (5, 2, (1, 1, 5, 5, 17)), (5, 4, (1, 1, 5, 5, 5)), (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)), (5, 13, (1, 1, 1, 3, 11)), (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)), (6, 13, (1, 1, 1, 15, 21, 21)), (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)), (6, 22, (1, 3, 1, 15, 13, 25)), (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)), (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+    (7, 7, (1, 1, 3, 13, 7, 35, 63)), (7, 8, (1, 3, 5, 9, 1, 25, 53)),
+    (7, 14, (1, 3, 1, 13, 9, 35, 107)), (7, 19, (1, 3, 1, 5, 27, 61, 31)),
+    (7, 21, (1, 1, 5, 11, 19, 41, 61)), (7, 28, (1, 3, 5, 3, 3, 13, 69)),
+    (7, 31, (1, 1, 7, 13, 1, 19, 1)), (7, 32, (1, 3, 7, 5, 13, 19, 59)),
+    (7, 37, (1, 1, 3, 9, 25, 29, 41)), (7, 41, (1, 3, 5, 13, 23, 1, 55)),
+    (7, 42, (1, 3, 7, 3, 13, 59, 17)), (7, 50, (1, 3, 1, 3, 5, 53, 69)),
+]
+_BITS = 30
+
+
+def _direction_numbers(dim):
+    v = np.zeros(_BITS, dtype=np.int64)
+    if dim == 0:
+        return 1 << (_BITS - 1 - np.arange(_BITS))
+    s, a, m = _DIRECTIONS[dim - 1]
+    v[:s] = [m[i] << (_BITS - 1 - i) for i in range(s)]
+    for i in range(s, _BITS):
+        v[i] = v[i - s] ^ (v[i - s] >> s)
+        for j in range(1, s):
+            if (a >> (s - 1 - j)) & 1:
+                v[i] ^= v[i - j]
+    return v
+
+
+def sobol(count, dims, skip=1):
+    """First ``count`` points of the unscrambled Sobol sequence in [0, 1)^dims (after ``skip`` points)."""
+    if dims > len(_DIRECTIONS) + 1:
+        raise ValueError(f"Sobol sequence supports up to {len(_DIRECTIONS) + 1} dimensions, got {dims}")
+    index = np.arange(skip, skip + count, dtype=np.int64)
+    gray = index ^ (index >> 1)
+    out = np.zeros((count, dims))
+    for d in range(dims):
+        v = _direction_numbers(d)
+        x = np.zeros(count, dtype=np.int64)
+        for bit in range(_BITS):
+            x ^= np.where((gray >> bit) & 1, v[bit], 0)
+        out[:, d] = x / 2.0 ** _BITS
+    return out
+
+
+# ==================== Designs ====================
+def _scale(unit, factors):
+    lows = np.array([lo for lo, _ in factors.values()])
+    highs = np.array([hi for _, hi in factors.values()])
+    return lows + unit * (highs - lows)
+
+
+def saltelli_design(samples, factors=FACTORS):
+    """(samples * (k + 2), k) parameter values: rows of A, then B, then each A_B^i block."""
+    k = len(factors)
+    base = sobol(samples, 2 * k)
+    A, B = base[:, :k], base[:, k:]
+    blocks = [A, B]
+    for i in range(k):
+        AB = A.copy()
+        AB[:, i] = B[:, i]
+        blocks.append(AB)
+    return _scale(np.concatenate(blocks), factors)
+
+
+def morris_design(trajectories, factors=FACTORS, levels=4, seed=None):
+    """(trajectories * (k + 1), k) parameter values of random one-at-a-time trajectories."""
+    k = len(factors)
+    rng = np.random.default_rng(seed)
+    step = levels / (2.0 * (levels - 1))
+    grid = np.arange(levels // 2) / (levels - 1)
+    rows = []
+    for _ in range(trajectories):
+        x = rng.choice(grid, k)
+        signs = rng.choice([-1.0, 1.0], k)
+        # Moving down from the upper half keeps every point on the grid
+        x = np.where(signs < 0, x + step, x)
+        rows.append(x.copy())
+        for i in rng.permutation(k):
+            x[i] += signs[i] * step
+            rows.append(x.copy())
+    return _scale(np.array(rows), factors)
+
+
+# ==================== Evaluation ====================
+def run_outputs(overrides, seeds):
+    """Mean over ``seeds`` (replicates of one run) of the OUTPUTS of one parameter point."""
+    p = make_params({'record_every': 1, **overrides})
+    detector = ThresholdDetector()
+    tables = simulate(p, np.random.SeedSequence(seeds), replicates=len(seeds), observers=[detector])
+    green = tables[:, -1, SCHEMA.index('GreenZones')] / tables[:, -1, SCHEMA.index('Patches')]
+    # A run that never takes off counts as taking off one tick after the horizon
+    takeoff = [detector.result(r)['tick'] for r in range(len(seeds))]
+    takeoff = np.array([p.ticks + 1 if t is None else t for t in takeoff], dtype=float)
+    budget = tables[:, :, SCHEMA.index('GovBudget')].min(axis=1)
+    return dict(FinalGreenShare=green.mean(), TakeoffTick=takeoff.mean(), MinBudget=budget.mean())
+
+
+def evaluate(design, factors=FACTORS, base=None, seeds=(1,), workers=None, log=print):
+    """Run every row of a design on a process pool; a DataFrame of the factors followed by OUTPUTS."""
+    names = list(factors)
+    points = [{**(base or {}), **dict(zip(names, map(float, row)))} for row in design]
+    workers = workers or os.cpu_count() or 1
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_outputs, point, list(seeds)) for point in points]
+        for n, future in enumerate(futures, 1):
+            results.append(future.result())
+            if n % max(1, len(points) // 20) == 0 or n == len(points):
+                log(f"  {n}/{len(points)} runs")
+    df = pd.DataFrame(design, columns=names)
+    return pd.concat([df, pd.DataFrame(results, columns=OUTPUTS)], axis=1)
+
+
+# ==================== Indices ====================
+def _interval(samples):
+    tail = (1 - CONFIDENCE) / 2
+    return np.nanquantile(samples, [tail, 1 - tail], axis=0)
+
+
+def sobol_indices(y, factors, samples, bootstrap=BOOTSTRAP, seed=None):
+    """First-order S1 and total ST indices of one output with bootstrap intervals.
+
+    ``y`` holds the outputs of saltelli_design(samples, factors) in row order.
+    """
+    k = len(factors)
+    y = np.asarray(y, dtype=float).reshape(k + 2, samples)
+    f_A, f_B, f_AB = y[0], y[1], y[2:]
+
+    def estimate(rows):
+        a, b, ab = f_A[rows], f_B[rows], f_AB[:, rows]
+        var = np.var(np.concatenate([a, b]))
+        if var == 0:
+            return np.zeros(k), np.zeros(k)
+        return (b * (ab - a)).mean(axis=1) / var, 0.5 * ((a - ab) ** 2).mean(axis=1) / var
+
+    S1, ST = estimate(np.arange(samples))
+    rng = np.random.default_rng(seed)
+    draws = [estimate(rng.integers(0, samples, samples)) for _ in range(bootstrap)]
+    S1_ci = _interval(np.array([d[0] for d in draws]))
+    ST_ci = _interval(np.array([d[1] for d in draws]))
+    return pd.DataFrame({'factor': list(factors), 'S1': S1, 'S1_lo': S1_ci[0], 'S1_hi': S1_ci[1],
+                         'ST': ST, 'ST_lo': ST_ci[0], 'ST_hi': ST_ci[1]})
+
+
+def morris_indices(design, y, factors, bootstrap=BOOTSTRAP, seed=None):
+    """Mean absolute elementary effect mu_star (with bootstrap interval), mu and sigma per factor."""
+    k = len(factors)
+    lows = np.array([lo for lo, _ in factors.values()])
+    highs = np.array([hi for _, hi in factors.values()])
+    x = (np.asarray(design) - lows) / (highs - lows)
+    x = x.reshape(-1, k + 1, k)
+    y = np.asarray(y, dtype=float).reshape(-1, k + 1)
+    dx = np.diff(x, axis=1)
+    moved = np.abs(dx).argmax(axis=2)
+    effects = np.empty((len(x), k))
+    for t in range(len(x)):
+        effects[t, moved[t]] = np.diff(y[t]) / dx[t, np.arange(k), moved[t]]
+
+    rng = np.random.default_rng(seed)
+    draws = np.array([np.abs(effects[rng.integers(0, len(x), len(x))]).mean(axis=0) for _ in range(bootstrap)])
+    ci = _interval(draws)
+    return pd.DataFrame({'factor': list(factors), 'mu_star': np.abs(effects).mean(axis=0),
+                         'mu_star_lo': ci[0], 'mu_star_hi': ci[1], 'mu': effects.mean(axis=0),
+                         'sigma': effects.std(axis=0, ddof=1) if len(x) > 1 else np.zeros(k)})
+
+
+def analyze(spec, workers=None, log=print):
+    """Run a sensitivity spec; returns (runs, indices) DataFrames.
+
+    A spec is a JSON document: {"method": "sobol" | "morris", "samples": N
+    (Sobol rows or Morris trajectories), "factors": {name: [low, high]}
+    (default FACTORS), "base": overrides for every run, "seeds": [...]}.
+    """
+    factors = {k: tuple(v) for k, v in spec.get('factors', FACTORS).items()}
+    method, samples = spec.get('method', 'sobol'), spec.get('samples', 64)
+    if method == 'sobol':
+        design = saltelli_design(samples, factors)
+    elif method == 'morris':
+        design = morris_design(samples, factors, spec.get('levels', 4), spec.get('seed'))
+    else:
+        raise ValueError(f"Unknown sensitivity method {method!r}; expected 'sobol' or 'morris'")
+    log(f"Sensitivity ({method}): {len(factors)} factors, {len(design)} runs x {len(spec.get('seeds', [1]))} seed(s)")
+    runs = evaluate(design, factors, spec.get('base'), spec.get('seeds', [1]), workers, log)
+    frames = []
+    for output in OUTPUTS:
+        if method == 'sobol':
+            df = sobol_indices(runs[output], factors, samples, seed=spec.get('seed'))
+        else:
+            df = morris_indices(design, runs[output], factors, seed=spec.get('seed'))
+        df.insert(0, 'output', output)
+        frames.append(df)
+    return runs, pd.concat(frames, ignore_index=True)
@@ -0,0 +1,247 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .engine import simulate
+from .params import SCHEMA
+from .sweep import make_params
+
+# ==================== Scheduled Shock Scenarios ====================
+# A schedule is a list of events; one schedule per replicate, so a batch of R
+# schedules runs as one vectorized simulate() call.  An event is a dict:
+#
+#   type        one of EVENT_TYPES
+#   tick        first tick it acts on (applied after that tick's step, like
+#               the built-in shock_tick)
+#   magnitude   total share lost over the event, in [0, 1]
+#   duration    ticks it is spread over (default 1): each tick removes the
+#               share 1 - (1 - magnitude) ** (1 / duration)
+#   region      [x0, y0, x1, y1] as fractions of the grid (default: all of it)
+#
+# Event types and what they hit inside the region:
+#
+#   competitiveness   manufacturers' competitiveness (README experiment 5)
+#   technology        manufacturers' AI capability
+#   suppliers         suppliers exit with the per-tick share as probability
+#   greenness         green patches revert to brown with a fresh countdown
+#   budget            the government budget (region ignored)
+#
+# Shocks draw from their own random generator, so the unshocked parts of a
+# run see the model's usual random stream: a run with the same model seed and
+# no schedule is its twin up to the first event, and the reference it is
+# scored against.  Stress tests run with counter-based streams, so a
+# replicate's numbers do not depend on what the other schedules of its batch
+# do to their replicates.
+
+EVENT_TYPES = ('competitiveness', 'technology', 'suppliers', 'greenness', 'budget')
+
+# Trajectories scored by resilience()
+RESILIENCE_COLUMNS = ['NumAIFactories', 'GreenZones', 'MarketPrice', 'GovBudget']
+
+# A trajectory has recovered once its shortfall is back within this share of the reference
+RECOVERY_TOLERANCE = 0.05
+
+WHOLE_GRID = (0.0, 0.0, 1.0, 1.0)
+
+
+def normalize_event(event):
+    """Validated copy of an event dict with defaults filled in."""
+    e = dict(event)
+    if e.get('type') not in EVENT_TYPES:
+        raise ValueError(f"Unknown shock type {e.get('type')!r}; expected one of {EVENT_TYPES}")
+    e['tick'] = int(e['tick'])
+    e['magnitude'] = float(e['magnitude'])
+    e['duration'] = int(e.get('duration', 1))
+    e['region'] = [float(v) for v in e.get('region', WHOLE_GRID)]
+    if not 0.0 <= e['magnitude'] <= 1.0:
+        raise ValueError(f"Shock magnitude must be in [0, 1], got {e['magnitude']}")
+    if e['duration'] < 1:
+        raise ValueError(f"Shock duration must be at least 1 tick, got {e['duration']}")
+    x0, y0, x1, y1 = e['region']
+    if not (0.0 <= x0 < x1 <= 1.0 and 0.0 <= y0 < y1 <= 1.0):
+        raise ValueError(f"Shock region must be [x0, y0, x1, y1] within [0, 1], got {e['region']}")
+    return e
+
+
+class ShockSchedule:
+    """Observer applying one event schedule per replicate."""
+
+    def __init__(self, schedules, seed=None):
+        events = [(r, normalize_event(e)) for r, schedule in enumerate(schedules) for e in schedule]
+        self.replicates = len(schedules)
+        self.replicate = np.array([r for r, _ in events], dtype=np.int64)
+        self.kind = np.array([EVENT_TYPES.index(e['type']) for _, e in events], dtype=np.int64)
+        self.start = np.array([e['tick'] for _, e in events], dtype=np.int64)
+        self.end = self.start + np.array([e['duration'] for _, e in events], dtype=np.int64)
+        magnitude = np.array([e['magnitude'] for _, e in events], dtype=float)
+        duration = np.array([e['duration'] for _, e in events], dtype=float)
+        self.rate = 1.0 - (1.0 - magnitude) ** (1.0 / np.maximum(duration, 1.0))
+        self.region = np.array([e['region'] for _, e in events], dtype=float).reshape(-1, 4)
+        self.rng = np.random.default_rng(seed)
+
+    def _survival(self, active, x, y, size):
+        """(R, n) product over active events of the share each agent keeps."""
+        keep = np.ones((self.replicates,) + x.shape[1:])
+        if not active.any():
+            return keep
+        rep, box = self.replicate[active], self.region[active] * size
+        xs, ys = x[rep], y[rep]
+        inside = ((xs >= box[:, 0, None]) & (xs < box[:, 2, None])
+                  & (ys >= box[:, 1, None]) & (ys < box[:, 3, None]))
+        np.multiply.at(keep, rep, 1.0 - self.rate[active, None] * inside)
+        return keep
+
+    def __call__(self, state):
+        if state.replicates != self.replicates:
+            raise ValueError(f"{self.replicates} schedules for {state.replicates} replicates")
+        live = (self.start <= state.tick) & (state.tick < self.end)
+        if not live.any():
+            return
+        G = state.green.shape[-1]
+        hits = {name: live & (self.kind == i) for i, name in enumerate(EVENT_TYPES)}
+
+        if hits['competitiveness'].any():
+            state.m_comp = state.m_comp * self._survival(hits['competitiveness'], state.m_x, state.m_y, G)
+        if hits['technology'].any():
+            state.m_ai = state.m_ai * self._survival(hits['technology'], state.m_x, state.m_y, G)
+        if hits['suppliers'].any():
+            keep = self._survival(hits['suppliers'], state.s_x, state.s_y, G)
+            state.s_alive = state.s_alive & (self.rng.random(keep.shape) < keep)
+        if hits['greenness'].any():
+            # Patch centres on the same coordinates as agents
+            centre = np.arange(G) + 0.5
+            px = np.broadcast_to(np.repeat(centre, G), (self.replicates, G * G))
+            py = np.broadcast_to(np.tile(centre, G), (self.replicates, G * G))
+            keep = self._survival(hits['greenness'], px, py, G)
+            green, countdown = state.green.reshape(self.replicates, -1), state.countdown.reshape(self.replicates, -1)
+            reverted = green & (self.rng.random(keep.shape) >= keep)
+            green[reverted] = False
+            countdown[reverted] += self.rng.integers(0, 30, reverted.sum())
+        if hits['budget'].any():
+            keep = np.ones(self.replicates)
+            np.multiply.at(keep, self.replicate[hits['budget']], 1.0 - self.rate[hits['budget']])
+            state.budget = state.budget * keep
+
+
+def first_tick(schedule):
+    """Tick of the earliest event of a schedule (None if it has none)."""
+    return min((int(e['tick']) for e in schedule), default=None)
+
+
+# ==================== Resilience Metrics ====================
+def resilience(tables, reference, starts, columns=RESILIENCE_COLUMNS, tolerance=RECOVERY_TOLERANCE):
+    """Trough depth, time to recover and area lost of each shocked trajectory.
+
+    ``tables`` is (R, rows, len(SCHEMA)), ``reference`` the unshocked
+    trajectories, either the (R, rows, len(SCHEMA)) same-seed twin of each
+    run or one (rows, len(SCHEMA)) trajectory for all, and ``starts`` the
+    (R,) tick of each first event.
+    The shortfall is (reference - value) / reference from the first event on:
+    trough is its maximum, recovery the ticks from the first event until it is
+    back within ``tolerance`` after the trough (NaN if never), and area its
+    positive part summed over ticks (in ticks of the reference level).
+    """
+    rows = min(tables.shape[1], np.shape(reference)[-2])
+    tables = tables[:, :rows]
+    reference = np.broadcast_to(np.asarray(reference)[..., :rows, :], tables.shape)
+    ticks = tables[0, :, 0]
+    dt = np.diff(ticks, prepend=ticks[0])
+    after = ticks[None, :] >= np.asarray(starts, dtype=float)[:, None]
+    out = {}
+    for column in columns:
+        i = SCHEMA.index(column)
+        ref = reference[:, :, i]
+        gap = (ref - tables[:, :, i]) / np.maximum(np.abs(ref), 1e-9)
+        gap = np.where(after, gap, 0.0)
+        trough_at = gap.argmax(axis=1)
+        trough = np.maximum(gap.max(axis=1), 0.0)
+        back = after & (gap <= tolerance) & (np.arange(len(ticks))[None, :] >= trough_at[:, None])
+        recovered = back.any(axis=1)
+        recovery = np.where(recovered, ticks[back.argmax(axis=1)] - starts, np.nan)
+        out[f'{column}_trough'] = trough
+        out[f'{column}_recovery'] = np.where(trough <= tolerance, 0.0, recovery)
+        out[f'{column}_area'] = (np.maximum(gap, 0.0) * dt[None, :]).sum(axis=1)
+    return out
+
+
+# ==================== Batched Stress Tests ====================
+def random_schedules(count, ticks=500, seed=None, max_events=3, types=EVENT_TYPES,
+                     magnitude=(0.05, 0.5), duration=(1, 24), region_share=(0.25, 1.0)):
+    """``count`` random schedules of 1..max_events events each, in the first 80% of the run."""
+    rng = np.random.default_rng(seed)
+    schedules = []
+    for _ in range(count):
+        schedule = []
+        for _ in range(rng.integers(1, max_events + 1)):
+            w, h = np.sqrt(rng.uniform(*region_share)), np.sqrt(rng.uniform(*region_share))
+            x0, y0 = rng.uniform(0, 1 - w), rng.uniform(0, 1 - h)
+            schedule.append(dict(type=str(rng.choice(types)), tick=int(rng.integers(1, int(0.8 * ticks))),
+                                 magnitude=round(float(rng.uniform(*magnitude)), 4),
+                                 duration=int(rng.integers(duration[0], duration[1] + 1)),
+                                 region=[round(float(v), 4) for v in (x0, y0, x0 + w, y0 + h)]))
+        schedules.append(sorted(schedule, key=lambda e: e['tick']))
+    return schedules
+
+
+def _run_batch(overrides, schedules, seed, tolerance):
+    model_seed, shock_seed = seed.spawn(2)
+    params = make_params(overrides)
+    tables = simulate(params, model_seed, len(schedules), observers=[ShockSchedule(schedules, shock_seed)])
+    reference = simulate(params, model_seed, len(schedules))
+    starts = np.array([first_tick(s) if s else tables[0, -1, 0] + 1 for s in schedules], dtype=float)
+    return resilience(tables, reference, starts, tolerance=tolerance)
+
+
+def stress_test(schedules, overrides=None, seeds=(1,), names=None, batch_size=128, workers=None,
+                tolerance=RECOVERY_TOLERANCE, log=print):
+    """Resilience metrics of every (schedule, seed), as a DataFrame with one row each.
+
+    Schedules run in batches of ``batch_size`` replicates on a process pool,
+    each next to an unshocked batch with the same model seed, so every run is
+    scored against its own twin.  Runs record every tick unless ``overrides``
+    says otherwise, and always use counter-based random streams: with the
+    sequential generator the draws of a batch depend on the slots occupied in
+    any replicate, so one schedule's events would change the numbers of its
+    batch-mates and the twins would drift apart.
+    """
+    overrides = {'record_every': 1, **(overrides or {}), 'rng': 'counter'}
+    schedules = [[normalize_event(e) for e in s] for s in schedules]
+    names = names or [f'schedule-{i}' for i in range(len(schedules))]
+    workers = workers or os.cpu_count() or 1
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for seed in seeds:
+            starts = range(0, len(schedules), batch_size)
+            seqs = np.random.SeedSequence(seed).spawn(len(starts))
+            futures = [pool.submit(_run_batch, overrides, schedules[i:i + batch_size], s, tolerance)
+                       for i, s in zip(starts, seqs)]
+            for i, future in zip(starts, futures):
+                metrics = future.result()
+                for j, schedule in enumerate(schedules[i:i + batch_size]):
+                    rows.append(dict(schedule=names[i + j], seed=seed, events=len(schedule),
+                                     first_tick=first_tick(schedule),
+                                     types='+'.join(sorted({e['type'] for e in schedule})),
+                                     **{k: float(v[j]) for k, v in metrics.items()}))
+                log(f"  seed {seed}: {min(i + batch_size, len(schedules))}/{len(schedules)} schedules")
+    return pd.DataFrame(rows)
+
+
+def load_scenarios(spec):
+    """Schedules of a shock spec: its explicit "schedules" followed by its "random" ones.
+
+    Returns (names, schedules).
+    """
+    names, schedules = [], []
+    for i, entry in enumerate(spec.get('schedules', [])):
+        names.append(entry.get('name', f'schedule-{i}'))
+        schedules.append(entry['events'])
+    if 'random' in spec:
+        options = dict(spec['random'])
+        count = options.pop('count')
+        options.setdefault('ticks', spec.get('base', {}).get('ticks', 500))
+        for i, schedule in enumerate(random_schedules(count, **options)):
+            names.append(f'random-{i}')
+            schedules.append(schedule)
+    return names, schedules
@@ -0,0 +1,173 @@
+import numpy as np
+from functools import lru_cache
+
+# ==================== Distance-Decay Kernels on the Toroidal Grid ====================
+# Spillovers are evaluated on patch-level density fields instead of agent pairs:
+# scatter agent capability onto the grid, convolve with a precomputed kernel,
+# and read the result back at each agent's patch.  Cost scales with grid area.
+#
+# On large, sparsely populated worlds the same sums come from a cell list
+# instead: agents are bucketed into square cells at least one radius wide, and
+# each target only visits the sources in its own and the 8 adjacent cells.
+# Cost then scales with the number of agents, not with the grid area.
+# neighbour_sum() picks whichever is cheaper.
+
+# Kernels with at most this many taps are applied as shifted sums; larger ones via FFT
+DIRECT_MAX_TAPS = 64
+
+# Relative cost of an FFT convolution per patch, of one candidate pair in the cell
+# list and of the cell list's fixed per-call work, in units of one shifted-sum tap
+# per patch (measured on 33-1000 wide grids with 50-100,000 agents)
+FFT_COST = 15.0
+PAIR_COST = 50.0
+PAIR_OVERHEAD = 2e5
+
+
+def _decay_weight(d, profile):
+    if profile == 'disc':
+        return np.ones_like(d)
+    if profile == 'decay':
+        return 1.0 / (1.5 + 0.5 * d)
+    raise ValueError(f"Unknown kernel profile '{profile}'")
+
+
+@lru_cache(maxsize=32)
+def kernel_taps(radius, profile='disc'):
+    """Offsets (dx, dy) and weights of every patch within ``radius`` of the origin."""
+    r = int(np.floor(radius))
+    dx, dy = np.meshgrid(np.arange(-r, r + 1), np.arange(-r, r + 1), indexing='ij')
+    d = np.hypot(dx, dy)
+    inside = d <= radius
+    return dx[inside], dy[inside], _decay_weight(d[inside], profile)
+
+
+@lru_cache(maxsize=32)
+def _kernel_spectrum(radius, profile, size):
+    dx, dy, w = kernel_taps(radius, profile)
+    kernel = np.zeros((size, size))
+    np.add.at(kernel, (dx % size, dy % size), w)
+    return np.fft.rfft2(kernel)
+
+
+def convolve(field, radius, profile='disc', method='auto'):
+    """Wrapped convolution of an (R, G, G) field with a distance kernel.
+
+    ``method`` is 'direct', 'fft' or 'auto' (direct for small kernels).
+    """
+    size = field.shape[-1]
+    dx, dy, w = kernel_taps(radius, profile)
+    if method == 'auto':
+        method = 'direct' if dx.size <= DIRECT_MAX_TAPS else 'fft'
+    if method == 'direct':
+        r = int(np.abs(dx).max()) if dx.size else 0
+        padded = np.pad(field, [(0, 0)] * (field.ndim - 2) + [(r, r), (r, r)], mode='wrap')
+        out = np.zeros(field.shape)
+        for i, j, weight in zip(dx, dy, w):
+            out += weight * padded[..., r - i:r - i + size, r - j:r - j + size]
+        return out
+    if method == 'fft':
+        spectrum = np.fft.rfft2(field) * _kernel_spectrum(radius, profile, size)
+        return np.fft.irfft2(spectrum, s=field.shape[-2:])
+    raise ValueError(f"Unknown convolution method '{method}'")
+
+
+def density(cell, weights, mask, replicates, size):
+    """Scatter per-agent ``weights`` onto an (R, G, G) field by flat patch index."""
+    offset = np.arange(replicates)[:, None] * size * size
+    total = np.bincount((cell + offset)[mask], weights=np.broadcast_to(weights, cell.shape)[mask],
+                        minlength=replicates * size * size)
+    return total.reshape(replicates, size, size)
+
+
+def sample(field, cell):
+    """Read an (R, G, G) field at each agent's flat patch index."""
+    return np.take_along_axis(field.reshape(field.shape[0], -1), cell, axis=1)
+
+
+# ==================== Cell List ====================
+def _cells_per_side(size, radius):
+    """Cells per grid side so that every cell is at least ``radius`` patches wide."""
+    return max(1, size // max(1, int(np.ceil(radius))))
+
+
+def _cell_of(cell, size, n):
+    px, py = np.divmod(cell, size)
+    return px * n // size, py * n // size
+
+
+def pair_sum(cell, weights, mask, targets, radius, profile='disc', size=None, where=None):
+    """Kernel-weighted sum of source ``weights`` around each target patch, via a cell list.
+
+    Equals ``sample(convolve(density(cell, weights, mask, R, size), radius, profile), targets)``
+    on grids wider than the kernel, visiting only source/target pairs in adjacent cells.
+    Targets outside ``where`` get 0.
+    """
+    R = cell.shape[0]
+    n = _cells_per_side(size, radius)
+    weights = np.broadcast_to(weights, cell.shape)
+
+    # Sources sorted by (replicate, cell); start[k] is the first source in cell k
+    r, i = np.nonzero(mask)
+    src = cell[r, i]
+    cx, cy = _cell_of(src, size, n)
+    key = (r * n + cx) * n + cy
+    order = np.argsort(key, kind='stable')
+    src, w = src[order], weights[r, i][order]
+    start = np.zeros(R * n * n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(key, minlength=R * n * n), out=start[1:])
+    sx, sy = np.divmod(src, size)
+
+    tr, ti = np.nonzero(np.ones(targets.shape, dtype=bool) if where is None else where)
+    dst = targets[tr, ti]
+    dx_, dy_ = np.divmod(dst, size)
+    tx, ty = _cell_of(dst, size, n)
+    out = np.zeros(len(dst))
+    offsets = np.unique(np.arange(-1, 2) % n)
+    for ox in offsets:
+        for oy in offsets:
+            k = (tr * n + (tx + ox) % n) * n + (ty + oy) % n
+            lo, count = start[k], start[k + 1] - start[k]
+            total = int(count.sum())
+            if total == 0:
+                continue
+            target = np.repeat(np.arange(len(dst)), count)
+            first = np.cumsum(count) - count
+            source = np.repeat(lo - first, count) + np.arange(total)
+            ddx = (sx[source] - dx_[target] + size // 2) % size - size // 2
+            ddy = (sy[source] - dy_[target] + size // 2) % size - size // 2
+            d = np.hypot(ddx, ddy)
+            inside = d <= radius
+            out += np.bincount(target[inside], weights=w[source[inside]] * _decay_weight(d[inside], profile),
+                               minlength=len(dst))
+    result = np.zeros(targets.shape)
+    result[tr, ti] = out
+    return result
+
+
+def choose_method(replicates, size, radius, profile, sources, targets):
+    """'hash' or 'grid', whichever is estimated cheaper for ``sources`` and ``targets`` agents in total."""
+    taps = kernel_taps(radius, profile)[0].size
+    grid = replicates * size * size * (taps if taps <= DIRECT_MAX_TAPS else FFT_COST)
+    n = _cells_per_side(size, radius)
+    per_cell = sources / (replicates * n * n)
+    pairs = targets * min(n, 3) ** 2 * per_cell
+    return 'hash' if PAIR_COST * pairs + PAIR_OVERHEAD < grid else 'grid'
+
+
+def neighbour_sum(cell, weights, mask, targets, radius, profile='disc', size=None, method='auto', where=None):
+    """Kernel-weighted sum of agent ``weights`` within ``radius`` of each target patch.
+
+    ``method`` is 'direct' or 'fft' (grid convolution), 'hash' (cell list, see
+    pair_sum) or 'auto', which compares the estimated cost of the grid and the
+    cell list for the current populations.  The cell list needs a grid wider
+    than the kernel; narrower grids always use the convolution.
+    """
+    R = cell.shape[0]
+    if method == 'auto':
+        n_targets = targets.size if where is None else np.count_nonzero(where)
+        method = choose_method(R, size, radius, profile, np.count_nonzero(mask), n_targets)
+    if method == 'hash' and size > 2 * int(np.floor(radius)):
+        return pair_sum(cell, weights, mask, targets, radius, profile, size, where)
+    field = density(cell, weights, mask, R, size)
+    out = sample(convolve(field, radius, profile, 'auto' if method in ('grid', 'hash') else method), targets)
+    return out if where is None else np.where(where, out, 0.0)
@@ -0,0 +1,429 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from .codec import block_range, decode, encode
+
+# ==================== Columnar Results Store ====================
+# A store is a directory holding one binary file per column plus meta.json:
+#
+#   meta.json        columns -> dtype, row count, packed bytes per column, and
+#                    the runs table (run id, scenario, parameters, seed, first
+#                    row or packed block offsets, row count, and the dtype of
+#                    every column of the run; see column_dtype())
+#   <column>.pack    packed runs: every run's column as delta/varint blocks
+#                    (tis_abm.codec), at the byte offset its run record gives
+#   <column>.bin     fixed-width values for every row of the runs appended
+#                    with packed=False (and by stores written before packing)
+#
+# Runs are recorded every tick; packed, a row of a sweep run takes about a
+# fifth of its fixed-width size.  Reading one run touches only the requested
+# columns, and a tick window decodes only the blocks it overlaps.
+#
+# Packing trades the memory mapping away: Store.column() maps a .bin column
+# and hands out zero-copy views of any rows, while a packed run is read and
+# decoded into a new array on every read (about 1 ms per run).  Stores that
+# are scanned across many runs at once, or read by tools expecting flat
+# arrays, can keep mmap-able rows with append(packed=False) or
+# "packed": false in a sweep spec; a store may hold runs of both kinds.  meta.json
+# is the commit point of an append; bytes past its sizes (an interrupted
+# append) are truncated on the next write.
+# A store has a single writer at a time; processes that may write concurrently
+# (parallel figure builds importing CSVs) serialize through Store.lock().
+
+META_FILE = 'meta.json'
+LOCK_FILE = 'write.lock'
+
+# Typed columns; anything else is stored as float64
+COLUMN_DTYPES = {
+    'run': 'int32',
+    'tick': 'int32',
+    'NumAIFactories': 'int32',
+    'NumSuppliers': 'int32',
+    'GreenZones': 'int32',
+    'Patches': 'int32',
+    'Clusters': 'int32',
+    'LargestCluster': 'int32',
+    'Percolating': 'int32',
+}
+
+# Fill value for an integer column missing from an appended run
+MISSING_INT = -1
+
+
+def column_dtype(name, values):
+    """Storage dtype of a column of one run.
+
+    The integer type of COLUMN_DTYPES is used only when every value is a
+    whole number: ensemble summaries and surrogate predictions hold per-tick
+    means of the count columns, which are kept as float64.
+    """
+    dtype = np.dtype(COLUMN_DTYPES.get(name, 'float64'))
+    values = np.asarray(values)
+    if dtype.kind == 'i' and values.dtype.kind not in 'iub':
+        values = values.astype(np.float64)
+        if not (np.isfinite(values) & (values == np.round(values))).all():
+            return np.dtype(np.float64)
+    return dtype
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Default store shared by the Figure scripts: <repo>/results, or $TIS_ABM_STORE
+DEFAULT_ROOT = os.path.join(REPO_ROOT, 'results')
+
+
+def default_root():
+    return os.environ.get('TIS_ABM_STORE', DEFAULT_ROOT)
+
+
+class Store:
+    """Append-only columnar store keyed by (scenario, parameters, seed, tick)."""
+
+    def __init__(self, root):
+        self.root = root
+        self.reload()
+
+    def reload(self):
+        """Re-read meta.json, picking up runs committed by other processes."""
+        path = os.path.join(self.root, META_FILE)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {'columns': {}, 'rows': 0, 'runs': []}
+
+    # ---------- Reading ----------
+    @property
+    def columns(self):
+        packed = self.meta.get('packed', {})
+        return list(self.meta['columns']) + [c for c in packed if c not in self.meta['columns']]
+
+    @property
+    def runs(self):
+        """Live runs as a DataFrame: run, scenario, seed, key, offset, rows, params, columns."""
+        live = [r for r in self.meta['runs'] if not r.get('deleted')]
+        return pd.DataFrame(live, columns=['run', 'scenario', 'seed', 'key', 'offset', 'rows', 'params', 'columns'])
+
+    def column(self, name):
+        """Memory-mapped view of one column across all rows."""
+        dtype = np.dtype(self.meta['columns'][name])
+        if self.meta['rows'] == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.root, f'{name}.bin'), dtype=dtype, mode='r',
+                         shape=(self.meta['rows'],))
+
+    def find(self, scenario=None, seed=None, key=None, **params):
+        """Live run records matching every given field."""
+        found = []
+        for run in self.meta['runs']:
+            if run.get('deleted'):
+                continue
+            if scenario is not None and run['scenario'] != scenario:
+                continue
+            if seed is not None and run['seed'] != seed:
+                continue
+            if key is not None and run['key'] != key:
+                continue
+            if any(run['params'].get(k) != v for k, v in params.items()):
+                continue
+            found.append(run)
+        return found
+
+    def _rows(self, run, column, lo, hi):
+        """Rows [lo, hi) of one column of a run, packed or fixed-width."""
+        packed = run.get('packed')
+        if packed is None:
+            values = np.asarray(self.column(column)[run['offset'] + lo:run['offset'] + hi])
+            dtype = np.dtype(run.get('dtypes', {}).get(column, values.dtype))
+            if dtype.kind == 'i' and values.dtype.kind == 'f':
+                # An integer column of this run in a file promoted to float64 by a later run
+                values = np.where(np.isnan(values), MISSING_INT, values)
+            return values.astype(dtype, copy=False)
+        header = packed.get(column)
+        dtype = np.dtype(COLUMN_DTYPES.get(column, 'float64'))
+        if header is None:
+            return np.full(hi - lo, MISSING_INT if dtype.kind == 'i' else np.nan, dtype=dtype)
+        # Runs packed before the dtype was recorded per run used the column's
+        header.setdefault('dtype', dtype.str)
+        first, end = block_range(header, lo, hi)
+        start, stop = header['blocks'][first], header['blocks'][end]
+        data = np.fromfile(os.path.join(self.root, f'{column}.pack'), dtype=np.uint8,
+                           count=stop - start, offset=header['offset'] + start)
+        return decode(data, header, lo, hi, offset=start)
+
+    def read(self, run, columns=None, ticks=None, stride=None):
+        """Dict of column -> array for one run record (default: the columns it was written with).
+
+        ``ticks`` = (first, last) keeps the rows of that tick window (inclusive;
+        either end may be None), and ``stride`` the rows whose tick is a
+        multiple of it, like a run recorded with record_every=stride.
+        """
+        columns = columns or run['columns']
+        sys.audit('tis_abm.store.read', self.root, run)
+        lo, hi, keep = 0, run['rows'], None
+        if ticks is not None or stride:
+            if 'tick' not in run['columns']:
+                raise ValueError(f"Run {run['run']} ({run['scenario']}) has no tick column to window by")
+            tick = self._rows(run, 'tick', 0, run['rows'])
+            first, last = ticks or (None, None)
+            lo = 0 if first is None else int(np.searchsorted(tick, first, side='left'))
+            hi = run['rows'] if last is None else int(np.searchsorted(tick, last, side='right'))
+            if stride:
+                keep = tick[lo:hi] % stride == 0
+        data = {c: self._rows(run, c, lo, hi) for c in columns}
+        return data if keep is None else {c: v[keep] for c, v in data.items()}
+
+    def select(self, scenario=None, seed=None, columns=None, ticks=None, stride=None, **params):
+        """Long DataFrame of the requested columns for every matching run."""
+        frames = []
+        for run in self.find(scenario, seed, **params):
+            df = pd.DataFrame(self.read(run, columns, ticks, stride))
+            df.insert(0, 'seed', run['seed'])
+            df.insert(0, 'scenario', run['scenario'])
+            frames.append(df)
+        if not frames:
+            return pd.DataFrame(columns=['scenario', 'seed', *(columns or [])])
+        return pd.concat(frames, ignore_index=True)
+
+    # ---------- Writing ----------
+    @contextmanager
+    def lock(self, timeout=120.0):
+        """Hold the store's writer lock (an exclusively created lock file) and reload meta.json."""
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, LOCK_FILE)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f'{path} is held by another writer (delete it if no writer is running)')
+                time.sleep(0.05)
+        try:
+            self.reload()
+            yield self
+        finally:
+            os.close(fd)
+            os.remove(path)
+
+    def commit(self):
+        """Write meta.json, making every run appended so far visible to readers."""
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, META_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.meta))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def _add_column(self, name, dtype):
+        self.meta['columns'][name] = np.dtype(dtype).name
+        fill = MISSING_INT if np.dtype(dtype).kind == 'i' else np.nan
+        np.full(self.meta['rows'], fill, dtype=dtype).tofile(os.path.join(self.root, f'{name}.bin'))
+
+    def _promote_column(self, name):
+        """Rewrite an integer column file as float64 (missing values become NaN) for a run with fractions.
+
+        Earlier runs keep their integer dtype (recorded per run) and read back
+        unchanged; meta.json is committed at once so it matches the file.
+        """
+        path = os.path.join(self.root, f'{name}.bin')
+        dtype = np.dtype(self.meta['columns'][name])
+        values = np.fromfile(path, dtype=dtype, count=self.meta['rows'])
+        np.where(values == MISSING_INT, np.nan, values.astype(np.float64)).tofile(path + '.tmp')
+        for run in self.meta['runs']:
+            if run.get('packed') is None:
+                run.setdefault('dtypes', {}).setdefault(name, dtype.name)
+        os.replace(path + '.tmp', path)
+        self.meta['columns'][name] = 'float64'
+        self.commit()
+
+    def append(self, scenario, data, seed=None, params=None, key=None, replace=False, commit=True,
+               packed=True, decimals=None):
+        """Append one run given as a DataFrame or dict of equal-length columns.
+
+        With ``replace`` any earlier run with the same key is marked deleted.
+        With ``commit=False`` the run only becomes visible at the next commit()
+        (bulk loads commit every few hundred runs instead of once per run).
+        ``packed=False`` writes fixed-width rows instead of delta/varint
+        blocks; ``decimals`` rounds float columns first (packing is lossless,
+        but full-precision floats pack to about 7 bytes a value, and to 1 or 2
+        at the 4 decimals of the exported tables).  Returns the new run record.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        data = {c: np.asarray(v) for c, v in data.items()}
+        if decimals is not None:
+            data = {c: np.round(v, decimals) if v.dtype.kind == 'f' else v for c, v in data.items()}
+        n = len(next(iter(data.values()))) if data else 0
+        rows = self.meta['rows']
+        for name, dtype in self.meta['columns'].items():
+            path = os.path.join(self.root, f'{name}.bin')
+            with open(path, 'ab') as f:
+                f.truncate(rows * np.dtype(dtype).itemsize)
+        sizes = self.meta.setdefault('packed', {})
+        for name, size in sizes.items():
+            with open(os.path.join(self.root, f'{name}.pack'), 'ab') as f:
+                f.truncate(size)
+        if packed:
+            return self._append_packed(scenario, data, n, seed, params, key, replace, commit)
+
+        dtypes = {name: column_dtype(name, values) for name, values in data.items()}
+        for name, dtype in dtypes.items():
+            if name not in self.meta['columns']:
+                self._add_column(name, dtype)
+            elif dtype.kind == 'f' and np.dtype(self.meta['columns'][name]).kind == 'i':
+                self._promote_column(name)
+
+        run_id = len(self.meta['runs'])
+        data['run'] = np.full(n, run_id)
+        if 'run' not in self.meta['columns']:
+            self._add_column('run', COLUMN_DTYPES['run'])
+        for name, dtype in self.meta['columns'].items():
+            dtype = np.dtype(dtype)
+            if name in data:
+                values = data[name].astype(dtype)
+            else:
+                values = np.full(n, MISSING_INT if dtype.kind == 'i' else np.nan, dtype=dtype)
+            with open(os.path.join(self.root, f'{name}.bin'), 'ab') as f:
+                values.tofile(f)
+
+        self.meta['rows'] = rows + n
+        return self._add_run(dict(scenario=scenario, seed=seed, key=key, offset=rows, rows=n, params=params,
+                                  columns=list(dtypes), dtypes={c: d.name for c, d in dtypes.items()}),
+                             replace, commit)
+
+    def _append_packed(self, scenario, data, n, seed, params, key, replace, commit):
+        sizes = self.meta['packed']
+        headers = {}
+        for name, values in data.items():
+            header, packed = encode(values, column_dtype(name, values))
+            header['offset'] = sizes.get(name, 0)
+            with open(os.path.join(self.root, f'{name}.pack'), 'ab') as f:
+                packed.tofile(f)
+            sizes[name] = header['offset'] + len(packed)
+            headers[name] = header
+        return self._add_run(dict(scenario=scenario, seed=seed, key=key, offset=None, rows=n, params=params,
+                                  columns=list(data), packed=headers), replace, commit)
+
+    def _add_run(self, record, replace, commit):
+        record = dict(run=len(self.meta['runs']), **record)
+        record['key'] = record['key'] or f"{record['scenario']}:{record['seed']}"
+        record['params'] = record['params'] or {}
+        if replace:
+            for run in self.find(key=record['key']):
+                run['deleted'] = True
+        self.meta['runs'].append(record)
+        if commit:
+            self.commit()
+        return record
+
+
+# ==================== Shared Loader for the Figure Scripts ====================
+def _find_csv(name, directory):
+    """Path of ``<name>.csv`` in ``directory``, tolerating stray spaces in file names."""
+    for entry in os.listdir(directory):
+        stem, ext = os.path.splitext(entry)
+        if ext.lower() == '.csv' and stem.strip() == name:
+            return os.path.join(directory, entry)
+    return None
+
+
+def _file_digest(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def csv_key(path):
+    """Run key of an imported CSV: ``csv:`` and its path relative to the repo (absolute outside it).
+
+    Figure folders hold CSVs with the same stem (Figure 4/ and Figure 5/), so
+    the stem alone would make them overwrite each other's import.
+    """
+    path = os.path.abspath(path)
+    rel = os.path.relpath(path, REPO_ROOT)
+    return 'csv:' + (path if rel.startswith('..') else rel).replace(os.sep, '/')
+
+
+def import_csv(store, name, path):
+    """Parse an exported CSV once, coercing every column to numbers, and store it as a run."""
+    df = pd.read_csv(path).apply(pd.to_numeric, errors='coerce').fillna(0)
+    stat = os.stat(path)
+    source = dict(source=os.path.abspath(path), mtime=stat.st_mtime, size=stat.st_size,
+                  sha1=_file_digest(path))
+    return store.append(name, df, params=source, key=csv_key(path), replace=True)
+
+
+def _is_stale(run, path):
+    """Whether the CSV at ``path`` differs from the one imported as ``run``.
+
+    Unchanged path, mtime and size are trusted; otherwise the content hash
+    decides, so a touched but unchanged CSV is not re-imported.
+    """
+    stat = os.stat(path)
+    params = run['params']
+    if (params.get('source') == os.path.abspath(path) and params.get('mtime') == stat.st_mtime
+            and params.get('size') == stat.st_size):
+        return False
+    return params.get('sha1') != _file_digest(path)
+
+
+def aggregate(df, columns, bands=(0.05, 0.95)):
+    """Mean per tick across seeds; with several seeds add <column>_std and quantile bands."""
+    grouped = df.groupby('tick', sort=True)[[c for c in columns if c != 'tick']]
+    out = grouped.mean()
+    if df['seed'].nunique() > 1:
+        std = grouped.std().add_suffix('_std')
+        parts = [out, std]
+        for q in bands:
+            parts.append(grouped.quantile(q).add_suffix(f'_q{int(round(q * 100)):02d}'))
+        out = pd.concat(parts, axis=1)
+    return out.reset_index()
+
+
+def load_results(name, columns=None, root=None, directory='.', seed=None, ticks=None, stride=None):
+    """Load a scenario for plotting through the columnar store.
+
+    ``name`` is a scenario in the store (a sweep scenario, or the stem of an
+    exported CSV).  An exported ``<name>.csv`` in ``directory`` is imported on
+    first use and re-imported only when the file changes.  Runs with several
+    seeds are averaged per tick, with spread columns for ribbons.  ``ticks``
+    (first, last) and ``stride`` select rows as in Store.read().  Simulated
+    runs of the scenario take precedence over the CSV; an imported CSV is
+    keyed by its path (see csv_key), so same-named CSVs in different folders
+    each load their own data.
+    """
+    store = Store(root or default_root())
+    path = _find_csv(name, directory) if os.path.isdir(directory) else None
+    runs = store.find(scenario=name, seed=seed)
+    simulated = [r for r in runs if not str(r['key']).startswith('csv:')]
+    if path and not simulated:
+        key = csv_key(path)
+        with store.lock():
+            imported = store.find(key=key)
+            if not imported or _is_stale(imported[-1], path):
+                import_csv(store, name, path)
+            runs = store.find(key=key, seed=seed)
+    else:
+        runs = simulated or runs
+    if not runs:
+        raise FileNotFoundError(f"Scenario '{name}' is neither in the store at {store.root} nor a CSV in {directory}")
+
+    columns = columns or runs[0]['columns']
+    frames = []
+    for run in runs:
+        df = pd.DataFrame(store.read(run, columns, ticks, stride))
+        df['seed'] = run['seed']
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True)
+    if len(runs) == 1 or 'tick' not in columns:
+        return df[columns]
+    return aggregate(df, columns)
@@ -0,0 +1,128 @@
+import numpy as np
+
+# ==================== Counter-Based Random Streams ====================
+# With Params.rng='counter' the engine draws from CounterStreams instead of
+# one sequential numpy Generator.  Every draw is then a pure function of
+#
+#   (master seed, replicate, tick, mechanism, agent or patch index)
+#
+# hashed with the SplitMix64 finalizer, so no generator state is carried from
+# one draw to the next.  A replicate gets the same numbers whether it runs
+# alone, in a batch of 64, or as replicate 7,312 of a 10,000-run ensemble
+# split over any number of workers, and the streams of a snapshot are just
+# the master key.  Replicates are numbered from ``first``, so any one of them
+# can be rerun on its own.
+#
+# The mechanism is a fixed index into MECHANISMS: append new names at the end
+# and never reorder them, or every counter-based run changes.
+
+MECHANISMS = [
+    'init_green', 'init_countdown',
+    'init_manufacturer_x', 'init_manufacturer_y', 'init_manufacturer_heading',
+    'init_supplier_x', 'init_supplier_y', 'init_supplier_heading',
+    'price_noise', 'move_target', 'move_wander', 'diffusion', 'green_subsidy', 'ai_subsidy',
+    'manufacturer_birth', 'manufacturer_x', 'manufacturer_y', 'manufacturer_heading',
+    'supplier_wander', 'supplier_birth', 'supplier_x', 'supplier_y', 'supplier_heading',
+    'shock_hit', 'shock_patches', 'shock_countdown',
+]
+_MECHANISM_INDEX = {name: i for i, name in enumerate(MECHANISMS)}
+
+# SplitMix64 increment and finalizer multipliers
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+# Uniforms are the top 53 bits of a hash
+_UNIT = 2.0 ** -53
+
+
+def _mix(z):
+    """SplitMix64 finalizer of a uint64 array (wrapping arithmetic)."""
+    z = (z ^ (z >> np.uint64(30))) * _MIX1
+    z = (z ^ (z >> np.uint64(27))) * _MIX2
+    return z ^ (z >> np.uint64(31))
+
+
+def master_key(seed=None):
+    """64-bit master key of an int seed, a SeedSequence, or fresh entropy for None."""
+    seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return int(seq.generate_state(1, np.uint64)[0])
+
+
+class CounterStreams:
+    """Stateless random streams for ``replicates`` replicates numbered from ``first``."""
+
+    def __init__(self, seed=None, replicates=1, first=0, key=None):
+        self.key = master_key(seed) if key is None else int(key)
+        self.replicates = replicates
+        self.first = first
+        replicate = np.arange(first, first + replicates, dtype=np.uint64)
+        self._base = _mix(np.uint64(self.key) + (replicate + np.uint64(1)) * GOLDEN)
+
+    def random(self, tick, mechanism, shape=None, at=None):
+        """Uniforms in [0, 1) of ``shape`` (leading axis: replicate) or one per (replicate, index) in ``at``."""
+        tag = _mix(np.array([(tick << 8) | _MECHANISM_INDEX[mechanism]], dtype=np.uint64))
+        stream = _mix(self._base ^ tag)
+        if at is None:
+            count = int(np.prod(shape[1:], dtype=np.int64))
+            z = stream[:, None] + (np.arange(1, count + 1, dtype=np.uint64) * GOLDEN)[None, :]
+        else:
+            rows, index = at
+            z = stream[rows] + (np.asarray(index).astype(np.uint64) + np.uint64(1)) * GOLDEN
+        u = (_mix(z) >> np.uint64(11)) * _UNIT
+        return u if at is not None else u.reshape(shape)
+
+    def to_dict(self):
+        return dict(bit_generator='CounterStreams', key=self.key, replicates=self.replicates, first=self.first)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(replicates=d['replicates'], first=d['first'], key=d['key'])
+
+
+def streams(rng, seed=None, replicates=1, first=0):
+    """The random source of a new run: a numpy Generator for 'sequential', CounterStreams for 'counter'."""
+    if rng == 'sequential':
+        if first:
+            raise ValueError("Replicates can only be numbered from first_replicate with rng='counter'")
+        return np.random.default_rng(seed)
+    if rng == 'counter':
+        return CounterStreams(seed, replicates, first)
+    raise ValueError(f"Unknown rng '{rng}'; expected 'sequential' or 'counter'")
+
+
+def draw(rng, tick, mechanism, kind, shape=None, low=0.0, high=1.0, at=None):
+    """``kind`` ('random', 'uniform' or 'integers') draws of ``shape``, or one per (replicate, index) in ``at``.
+
+    A numpy Generator makes the draw it always has (``rng.random(shape)``,
+    ``rng.uniform(low, high, shape)``, ``rng.integers(low, high, shape)``)
+    and ignores the keys; CounterStreams key it by ``tick`` and ``mechanism``
+    and by the replicate and index of every element.
+    """
+    if isinstance(rng, np.random.Generator):
+        size = shape if at is None else len(at[0])
+        if kind == 'random':
+            return rng.random(size)
+        if kind == 'uniform':
+            return rng.uniform(low, high, size)
+        return rng.integers(low, high, size)
+    u = rng.random(tick, mechanism, shape, at)
+    if kind == 'random':
+        return u
+    if kind == 'uniform':
+        return low + (high - low) * u
+    return low + np.floor(u * (high - low)).astype(np.int64)
+
+
+def save_rng(rng):
+    """JSON-ready state of a Generator or CounterStreams (see tis_abm.checkpoint)."""
+    return rng.to_dict() if isinstance(rng, CounterStreams) else rng.bit_generator.state
+
+
+def load_rng(state):
+    """Inverse of save_rng()."""
+    if state['bit_generator'] == 'CounterStreams':
+        return CounterStreams.from_dict(state)
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
@@ -0,0 +1,345 @@
+import io
+import json
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from .params import Params
+from .store import Store, default_root
+from .sweep import make_params
+
+# ==================== Trajectory Emulator ====================
+# A surrogate is trained on the runs of a sweep store.  Every run's parameters
+# (the sweep overrides that vary between runs) are encoded as a point in the
+# unit cube: numeric parameters are scaled to the range seen in training, each
+# category of a text parameter ('policy') is its own 0/1 coordinate.  Each
+# emulated column is reduced the same way:
+#
+#   trajectory   values on the common recorded ticks, (runs, ticks)
+#   components   principal components keeping VARIANCE_KEPT of the variance
+#                (at most MAX_COMPONENTS), scores whitened to unit variance
+#   kernel       one Gaussian process per column shared by its components:
+#                squared-exponential with a length scale per input plus a
+#                noise term for seed-to-seed spread, fitted by maximizing
+#                the marginal likelihood
+#
+# A prediction is a kernel-weighted sum over the training runs, so it takes
+# milliseconds; its variance is the GP variance mapped back through the
+# components plus the variance the dropped components left unexplained.
+
+# Columns emulated by default: the Figure 8 and Figure 10 panels
+EMULATED_COLUMNS = ['Demand', 'GreenZones', 'AvgAIGen', 'Supply', 'MarketPrice', 'GovBudget']
+
+VARIANCE_KEPT = 0.999
+MAX_COMPONENTS = 8
+
+# Kernel fit: runs used (a random subset of larger stores), Adam steps and step size
+FIT_RUNS = 400
+FIT_STEPS = 200
+FIT_RATE = 0.05
+
+# Normal quantile of the 5% / 95% bands
+Z_BAND = 1.6449
+
+SURROGATE_VERSION = 1
+
+
+# ==================== Parameter Encoding ====================
+class Encoding:
+    """Map sweep overrides to points of the unit cube.
+
+    ``numeric`` maps a parameter to (low, high, integer), ``categories`` a
+    text parameter to its levels, and ``base`` holds the overrides every
+    training run shared.
+    """
+
+    def __init__(self, numeric, categories, base):
+        self.numeric, self.categories, self.base = numeric, categories, base
+
+    @classmethod
+    def from_runs(cls, points):
+        keys = sorted({k for p in points for k in p})
+        numeric, categories, base = {}, {}, {}
+        for key in keys:
+            values = [_value(p, key) for p in points]
+            if all(v == values[0] for v in values):
+                base[key] = values[0]
+            elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+                numeric[key] = (float(min(values)), float(max(values)), _is_integer(key, values))
+            else:
+                categories[key] = sorted({str(v) for v in values})
+        return cls(numeric, categories, base)
+
+    @property
+    def names(self):
+        return list(self.numeric) + [f'{k}={level}' for k, levels in self.categories.items() for level in levels]
+
+    def encode(self, points):
+        """(len(points), dims) coordinates; parameters a point leaves out take their model default."""
+        columns = []
+        for key, (lo, hi, _) in self.numeric.items():
+            columns.append([(float(_value(p, key)) - lo) / ((hi - lo) or 1.0) for p in points])
+        for key, levels in self.categories.items():
+            values = [str(_value(p, key)) for p in points]
+            unknown = sorted(set(values) - set(levels))
+            if unknown:
+                raise ValueError(f"{key}={unknown[0]} was not in the training runs; expected one of {levels}")
+            columns.extend([[float(v == level) for v in values] for level in levels])
+        return np.array(columns, dtype=float).T.reshape(len(points), -1)
+
+    def sample(self, count, rng):
+        """``count`` random overrides spread over the training ranges."""
+        points = [{} for _ in range(count)]
+        for key, (lo, hi, integer) in self.numeric.items():
+            values = rng.uniform(lo, hi, count)
+            for p, v in zip(points, values):
+                p[key] = int(round(v)) if integer else round(float(v), 4)
+        for key, levels in self.categories.items():
+            for p, v in zip(points, rng.choice(levels, count)):
+                p[key] = str(v)
+        return points
+
+    def to_dict(self):
+        return dict(numeric=self.numeric, categories=self.categories, base=self.base)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({k: tuple(v) for k, v in data['numeric'].items()}, data['categories'], data['base'])
+
+
+def _is_integer(key, values):
+    """Whether a numeric sweep parameter takes whole numbers: its Params field type, else its values' type."""
+    field = Params.__dataclass_fields__.get(key)
+    if field is not None:
+        return field.type is int
+    return all(isinstance(v, int) for v in values)
+
+
+def _value(point, key):
+    """Value of ``key`` in a sweep point, falling back to the parameters the point runs with."""
+    if key in point:
+        return point[key]
+    if key == 'policy':
+        return 'dynamic'
+    if key in Params.__dataclass_fields__:
+        return getattr(make_params({k: v for k, v in point.items() if k in Params.__dataclass_fields__
+                                    or k == 'policy'}), key)
+    raise ValueError(f"Sweep parameter {key!r} has no default; give it explicitly")
+
+
+# ==================== Gaussian Process ====================
+def _sq_dist(a, b, lengths):
+    return (((a[:, None, :] - b[None, :, :]) / lengths) ** 2).sum(axis=-1)
+
+
+def _likelihood(X, Z, log_lengths, log_noise):
+    """Concentrated log marginal likelihood of whitened scores ``Z`` and its gradient."""
+    n, k = Z.shape
+    lengths, noise = np.exp(log_lengths), np.exp(log_noise)
+    K = np.exp(-0.5 * _sq_dist(X, X, lengths))
+    C = K + (noise + 1e-8) * np.eye(n)
+    L = np.linalg.cholesky(C)
+    C_inv = np.linalg.inv(L).T @ np.linalg.inv(L)
+    A = C_inv @ Z
+    scale = (Z * A).sum() / (n * k)
+    value = -0.5 * n * k * np.log(scale) - k * np.log(np.diag(L)).sum()
+    W = (A @ A.T) / scale - k * C_inv
+    WK = W * K
+    diff2 = (X[:, None, :] - X[None, :, :]) ** 2 / lengths ** 2
+    grad_lengths = 0.5 * np.einsum('ij,ijd->d', WK, diff2)
+    grad_noise = 0.5 * noise * np.trace(W)
+    return value, grad_lengths, grad_noise
+
+
+def _fit_kernel(X, Z, rng):
+    """Log length scales and log noise ratio maximizing the marginal likelihood (Adam ascent)."""
+    if len(X) > FIT_RUNS:
+        pick = rng.choice(len(X), FIT_RUNS, replace=False)
+        X, Z = X[pick], Z[pick]
+    theta = np.concatenate([np.full(X.shape[1], np.log(0.3)), [np.log(0.1)]])
+    low = np.concatenate([np.full(X.shape[1], np.log(0.02)), [np.log(1e-6)]])
+    high = np.concatenate([np.full(X.shape[1], np.log(50.0)), [np.log(10.0)]])
+    m, v = np.zeros_like(theta), np.zeros_like(theta)
+    for t in range(1, FIT_STEPS + 1):
+        _, g_lengths, g_noise = _likelihood(X, Z, theta[:-1], theta[-1])
+        g = np.append(g_lengths, g_noise) / len(X)
+        m = 0.9 * m + 0.1 * g
+        v = 0.999 * v + 0.001 * g ** 2
+        theta = np.clip(theta + FIT_RATE * (m / (1 - 0.9 ** t)) / (np.sqrt(v / (1 - 0.999 ** t)) + 1e-8), low, high)
+    return theta[:-1], theta[-1]
+
+
+class _Column:
+    """Reduced trajectories of one column and the GP over their component scores."""
+
+    def __init__(self, **arrays):
+        self.__dict__.update(arrays)
+
+    @classmethod
+    def fit(cls, X, Y, rng):
+        mean = Y.mean(axis=0)
+        U, S, Vt = np.linalg.svd(Y - mean, full_matrices=False)
+        share = np.cumsum(S ** 2) / max((S ** 2).sum(), 1e-300)
+        k = int(min(MAX_COMPONENTS, np.searchsorted(share, VARIANCE_KEPT) + 1, len(S)))
+        scores = U[:, :k] * S[:k]
+        spread = np.maximum(scores.std(axis=0), 1e-12)
+        Z = scores / spread
+        residual = ((Y - mean - scores @ Vt[:k]) ** 2).mean(axis=0)
+
+        log_lengths, log_noise = _fit_kernel(X, Z, rng)
+        lengths, noise = np.exp(log_lengths), np.exp(log_noise)
+        C = np.exp(-0.5 * _sq_dist(X, X, lengths)) + (noise + 1e-8) * np.eye(len(X))
+        C_inv = np.linalg.inv(C)
+        alpha = C_inv @ Z
+        scale = (Z * alpha).sum() / Z.size
+        return cls(mean=mean, basis=spread[:, None] * Vt[:k], residual=residual, lengths=lengths,
+                   noise=np.float64(noise), scale=np.float64(scale), alpha=alpha, C_inv=C_inv)
+
+    def cross(self, X_new, X):
+        return np.exp(-0.5 * _sq_dist(X_new, X, self.lengths))
+
+    def predict(self, K_new, noise=True):
+        """Mean and variance per tick for the rows of the cross-kernel ``K_new``."""
+        latent = self.scale * np.maximum(1.0 - (K_new @ self.C_inv * K_new).sum(axis=1), 0.0)
+        var = latent + (self.scale * self.noise if noise else 0.0)
+        mean = self.mean + (K_new @ self.alpha) @ self.basis
+        return mean, var[:, None] * (self.basis ** 2).sum(axis=0) + self.residual
+
+
+# ==================== Surrogate ====================
+class Surrogate:
+    """Emulator of recorded trajectories over the parameters of a sweep."""
+
+    def __init__(self, encoding, X, ticks, columns, models, source=None):
+        self.encoding, self.X, self.ticks = encoding, X, ticks
+        self.columns, self.models, self.source = columns, models, source
+
+    @classmethod
+    def fit(cls, points, ticks, tables, seed=None, source=None):
+        """Fit on sweep overrides ``points`` and ``tables`` mapping column -> (runs, len(ticks))."""
+        encoding = Encoding.from_runs(points)
+        if not encoding.names:
+            raise ValueError('The training runs share all their parameters; nothing to emulate')
+        X = encoding.encode(points)
+        rng = np.random.default_rng(seed)
+        models = {column: _Column.fit(X, np.asarray(Y, dtype=float), rng) for column, Y in tables.items()}
+        return cls(encoding, X, np.asarray(ticks), list(tables), models, source)
+
+    def predict(self, points, noise=True):
+        """Dicts column -> (len(points), ticks) of predicted means and standard deviations.
+
+        With ``noise`` the spread includes seed-to-seed variation, i.e. it is
+        the uncertainty about one run rather than about the mean trajectory.
+        """
+        X_new = self.encoding.encode(points)
+        means, stds = {}, {}
+        for column in self.columns:
+            model = self.models[column]
+            means[column], var = model.predict(model.cross(X_new, self.X), noise)
+            stds[column] = np.sqrt(var)
+        return means, stds
+
+    def frame(self, overrides=None, noise=True):
+        """Predicted trajectory in the layout of an ensemble summary (mean, _std, _q05, _q95 columns)."""
+        overrides = overrides or {}
+        means, stds = self.predict([overrides], noise)
+        data = {'tick': self.ticks.astype(int)}
+        for column in self.columns:
+            data[column] = means[column][0]
+        for column in self.columns:
+            data[f'{column}_std'] = stds[column][0]
+            data[f'{column}_q05'] = means[column][0] - Z_BAND * stds[column][0]
+            data[f'{column}_q95'] = means[column][0] + Z_BAND * stds[column][0]
+        data['Patches'] = np.full(len(self.ticks), make_params({**self.encoding.base, **overrides}).grid_size ** 2)
+        return pd.DataFrame(data)
+
+    def suggest(self, count=8, candidates=1000, seed=None):
+        """Overrides of ``count`` runs expected to improve the emulator most.
+
+        Candidates are drawn over the training ranges; each pick is the one with
+        the largest emulator variance summed over the columns (relative to each
+        column's scale), after conditioning on the picks before it.  The
+        variance does not depend on results, so a whole batch is chosen at once.
+        """
+        pool = self.encoding.sample(candidates, np.random.default_rng(seed))
+        X_c = self.encoding.encode(pool)
+        covs = []
+        for column in self.columns:
+            model = self.models[column]
+            K_cn = model.cross(X_c, self.X)
+            covs.append([model.cross(X_c, X_c) - K_cn @ model.C_inv @ K_cn.T, model.noise])
+        picks = []
+        for _ in range(min(count, candidates)):
+            score = sum(np.diag(cov) for cov, _ in covs)
+            score[picks] = -np.inf
+            j = int(np.argmax(score))
+            picks.append(j)
+            for entry in covs:
+                cov, noise = entry
+                entry[0] = cov - np.outer(cov[:, j], cov[j]) / (cov[j, j] + noise)
+        return [pool[j] for j in picks]
+
+    def sweep_spec(self, points, name='surrogate_next', seeds=(1,)):
+        """Sweep spec running ``points`` with the settings shared by the training runs."""
+        return dict(name=name, base=self.encoding.base, points=points, seeds=list(seeds))
+
+    # ---------- Persistence ----------
+    def save(self, path):
+        meta = dict(version=SURROGATE_VERSION, encoding=self.encoding.to_dict(), columns=self.columns,
+                    source=self.source)
+        arrays = dict(X=self.X, ticks=self.ticks)
+        for i, column in enumerate(self.columns):
+            arrays.update({f'{i}.{name}': value for name, value in vars(self.models[column]).items()})
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, meta=np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8), **arrays)
+        with open(path, 'wb') as f:
+            f.write(buffer.getvalue())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as archive:
+            meta = json.loads(archive['meta'].tobytes().decode('utf-8'))
+            if meta['version'] != SURROGATE_VERSION:
+                raise ValueError(f"Unsupported surrogate version {meta['version']}; expected {SURROGATE_VERSION}")
+            models = {}
+            for i, column in enumerate(meta['columns']):
+                prefix = f'{i}.'
+                models[column] = _Column(**{name[len(prefix):]: archive[name] for name in archive.files
+                                            if name.startswith(prefix)})
+            return cls(Encoding.from_dict(meta['encoding']), archive['X'], archive['ticks'], meta['columns'],
+                       models, meta['source'])
+
+
+# ==================== Training Data ====================
+def training_data(root, columns=EMULATED_COLUMNS):
+    """(points, ticks, tables) of the sweep runs in the store at ``root``.
+
+    Imported CSVs, stored predictions and runs recorded on other ticks than
+    the most common ones (e.g. stopped at the threshold) are left out.
+    """
+    store = Store(root)
+    runs = [r for r in store.find() if ':' not in r['key'] and {'tick', *columns} <= set(r['columns'])]
+    if not runs:
+        raise ValueError(f"No sweep runs with columns {columns} in the store at {root}")
+    data = [store.read(run, ['tick', *columns]) for run in runs]
+    ticks, _ = Counter(tuple(d['tick'].tolist()) for d in data).most_common(1)[0]
+    keep = [i for i, d in enumerate(data) if tuple(d['tick'].tolist()) == ticks]
+    points = [runs[i]['params'] for i in keep]
+    tables = {c: np.stack([data[i][c] for i in keep]).astype(float) for c in columns}
+    return points, np.array(ticks), tables
+
+
+def fit_store(root, columns=EMULATED_COLUMNS, seed=None):
+    """Surrogate of the sweep stored at ``root``."""
+    points, ticks, tables = training_data(root, columns)
+    return Surrogate.fit(points, ticks, tables, seed=seed, source=dict(root=root, runs=len(points)))
+
+
+def store_prediction(surrogate, scenario, overrides=None, root=None, noise=True):
+    """Write a prediction into a results store under ``scenario``, for load_results() and the Figure scripts."""
+    frame = surrogate.frame(overrides, noise)
+    store = Store(root or default_root())
+    with store.lock():
+        return store.append(scenario, frame, params=dict(surrogate=True, **(overrides or {})),
+                            key=f'surrogate:{scenario}', replace=True)
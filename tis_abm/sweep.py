@@ -0,0 +1,174 @@
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .params import EXPORT_DECIMALS, SCHEMA, policy_params
+from .engine import simulate
+from .monitor import publishers
+from .store import Store
+from .threshold import ThresholdDetector
+from .clusters import ClusterTracker
+
+# ==================== Sweep Specification ====================
+# A sweep is a JSON document:
+#   {"name": "fig8_beta",
+#    "base": {"ticks": 500},                      # overrides applied to every point
+#    "grid": {"beta": [1.0, 2.0], "policy": ["dynamic"]},   # full factorial ...
+#    "points": [{"scenario": "beta_high", "beta": 2.0}],   # ... and/or explicit points
+#    "seeds": [1, 2, 3],                          # or "replicates": 3
+#    "stop_at_threshold": false}                  # stop each run once SVI takeoff is confirmed
+# "policy" selects a Table 7 regime; "scenario" labels a point (defaults to its parameters).
+# Every run's detected SVI threshold is logged in index.jsonl, and its green-cluster
+# statistics (tis_abm.clusters.CLUSTER_COLUMNS) are stored next to the reporters.
+
+INDEX_FILE = 'index.jsonl'
+
+
+def load_spec(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def expand(spec):
+    """List of (scenario, overrides) points described by a sweep spec."""
+    base = dict(spec.get('base', {}))
+    points = []
+    grid = spec.get('grid')
+    if grid:
+        keys = list(grid)
+        for values in itertools.product(*(grid[k] for k in keys)):
+            points.append(dict(zip(keys, values)))
+    points.extend(dict(p) for p in spec.get('points', []))
+    if not points:
+        points = [{}]
+
+    expanded = []
+    for point in points:
+        scenario = point.pop('scenario', None)
+        overrides = {**base, **point}
+        if scenario is None:
+            scenario = ','.join(f'{k}={v}' for k, v in point.items()) or 'baseline'
+        expanded.append((scenario, overrides))
+    return expanded
+
+
+def seeds_of(spec):
+    if 'seeds' in spec:
+        return list(spec['seeds'])
+    return list(range(spec.get('replicates', 1)))
+
+
+def make_params(overrides):
+    """Params for one sweep point; 'policy' selects a Table 7 regime."""
+    overrides = dict(overrides)
+    regime = overrides.pop('policy', 'dynamic')
+    return policy_params(regime, **overrides)
+
+
+def run_key(scenario, overrides, seed):
+    """Stable identifier of one (point, seed) task, used for checkpointing."""
+    blob = json.dumps([scenario, overrides, seed], sort_keys=True)
+    return hashlib.sha1(blob.encode('utf-8')).hexdigest()[:16]
+
+
+# ==================== Store Layout ====================
+# Results go into one columnar Store at the sweep root, keyed by run_key();
+# index.jsonl is an append-only log of task outcomes and timings.
+def _append_index(root, entry):
+    with open(os.path.join(root, INDEX_FILE), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, sort_keys=True) + '\n')
+
+
+def completed(store):
+    """Keys of tasks whose results are committed to the store."""
+    return {run['key'] for run in store.find()}
+
+
+# ==================== Execution ====================
+def _run_task(scenario, overrides, seed, stop_at_threshold=False, replicate=0):
+    start = time.perf_counter()
+    detector = ThresholdDetector(stop=stop_at_threshold)
+    tracker = ClusterTracker()
+    observers = [detector, tracker] + publishers(scenario, replicate)
+    table = simulate(make_params(overrides), seed, replicates=1, observers=observers)[0]
+    data = dict(zip(SCHEMA, table.T))
+    data.update(tracker.columns(data['tick']))
+    return data, detector.result(), time.perf_counter() - start
+
+
+def run_sweep(spec, root, workers=None, log=print):
+    """Run every (point, seed) task of ``spec`` not yet completed under ``root``.
+
+    Tasks run on a process pool; each finished task is committed to the
+    columnar store as it arrives, so an interrupted sweep resumes where it
+    stopped.  Failed tasks are logged and retried on the next invocation.
+    ``"packed": false`` in the spec stores fixed-width, memory-mappable rows.
+    """
+    os.makedirs(root, exist_ok=True)
+    store = Store(root)
+    with open(os.path.join(root, 'spec.json'), 'w', encoding='utf-8') as f:
+        json.dump(spec, f, indent=2, sort_keys=True)
+
+    done = completed(store)
+    seeds = seeds_of(spec)
+    tasks = [(scenario, overrides, seed)
+             for scenario, overrides in expand(spec) for seed in seeds]
+    todo = [t for t in tasks if run_key(*t) not in done]
+    log(f"Sweep '{spec.get('name', root)}': {len(tasks)} tasks, {len(tasks) - len(todo)} already done")
+    if not todo:
+        return root
+
+    workers = workers or os.cpu_count() or 1
+    failures = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        stop = spec.get('stop_at_threshold', False)
+        packed = spec.get('packed', True)
+        futures = {pool.submit(_run_task, *task, stop, seeds.index(task[2])): task for task in todo}
+        for n, future in enumerate(as_completed(futures), 1):
+            scenario, overrides, seed = futures[future]
+            key = run_key(scenario, overrides, seed)
+            entry = dict(key=key, scenario=scenario, params=overrides, seed=seed)
+            try:
+                data, threshold, seconds = future.result()
+            except Exception as exc:
+                failures += 1
+                _append_index(root, {**entry, 'status': 'failed', 'error': repr(exc)})
+                log(f"  [{n}/{len(todo)}] {scenario} seed={seed} failed: {exc!r}")
+                continue
+            store.append(scenario, data, seed=seed, params=overrides, key=key, decimals=EXPORT_DECIMALS,
+                         packed=packed)
+            _append_index(root, {**entry, 'status': 'done', 'seconds': round(seconds, 3), 'threshold': threshold})
+            log(f"  [{n}/{len(todo)}] {scenario} seed={seed} ({seconds:.2f} s)")
+    if failures:
+        log(f"{failures} task(s) failed; rerun the sweep to retry them")
+    return root
+
+
+# ==================== Loading ====================
+def load_thresholds(root):
+    """Detected SVI threshold of every completed run: scenario, seed, crossed, svi, tick, confidence."""
+    rows = []
+    path = os.path.join(root, INDEX_FILE)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry.get('status') == 'done' and 'threshold' in entry:
+                    rows.append(dict(key=entry['key'], scenario=entry['scenario'], seed=entry['seed'],
+                                     **entry['threshold']))
+    columns = ['key', 'scenario', 'seed', 'crossed', 'svi', 'tick', 'confirmed_tick', 'confidence']
+    # A task rerun after a failure logs again; keep its latest outcome
+    return pd.DataFrame(rows, columns=columns).drop_duplicates('key', keep='last').reset_index(drop=True)
+
+
+def load_sweep(root, scenarios=None, columns=None):
+    """Long table of every completed run: scenario, seed, then the requested schema columns."""
+    store = Store(root)
+    frames = [store.select(scenario, columns=columns or SCHEMA) for scenario in
+              (scenarios or sorted({run['scenario'] for run in store.find()}))]
+    return pd.concat(frames, ignore_index=True) if frames else store.select(columns=columns or SCHEMA)
@@ -0,0 +1,140 @@
+import numpy as np
+
+# ==================== Online SVI Critical-Threshold Detector ====================
+# Per replicate and per tick, in O(1):
+#
+#   1. exponentially weighted moments of (SVI, Demand) give a local regression
+#      slope dDemand/dSVI, expressed as an elasticity (slope * SVI / Demand) so
+#      one setting works for any demand scale;
+#   2. while no takeoff is under way, the elasticity feeds a running baseline
+#      (Welford mean and variance) and Demand feeds a baseline demand level;
+#   3. an elasticity above the baseline band (mean + z * std, and at least
+#      min_elasticity) opens a candidate;
+#   4. a candidate that holds for ``confirm`` consecutive ticks is confirmed and
+#      reported as a "threshold crossed" event, with the SVI at which the local
+#      regression line leaves the baseline demand level as the threshold.
+#
+# Confidence is the fit quality of the local regression (R^2) times a
+# saturating function of how far the elasticity stood above the band
+# while the candidate was being confirmed.
+
+
+class ThresholdDetector:
+    """Streaming takeoff detector over (SVI, Demand), vectorized across replicates.
+
+    Use ``update(svi, demand, tick)`` directly, or pass the detector as a
+    ``simulate`` observer.  With ``stop=True`` the observer asks ``simulate`` to
+    stop once every replicate has confirmed its takeoff.  ``on_cross(event)`` is
+    called for each confirmation; all events are also kept in ``events``.
+    """
+
+    def __init__(self, halflife=2.0, confirm=6, z=4.0, min_elasticity=0.5, noise_floor=0.05,
+                 warmup=3, stop=False, on_cross=None):
+        self.alpha = 1.0 - 0.5 ** (1.0 / halflife)
+        self.confirm = confirm
+        self.z = z
+        self.min_elasticity = min_elasticity
+        self.noise_floor = noise_floor
+        self.warmup = warmup
+        self.stop = stop
+        self.on_cross = on_cross
+        self.events = []
+        self.n = None
+
+    def _reset(self, replicates):
+        zeros = np.zeros(replicates)
+        self.n = np.zeros(replicates, dtype=np.int64)
+        # Exponentially weighted moments of SVI and Demand
+        self.m_s, self.m_d, self.m_ss, self.m_sd, self.m_dd = (zeros.copy() for _ in range(5))
+        # Baseline (pre-takeoff) elasticity and demand level
+        self.base_n = np.zeros(replicates, dtype=np.int64)
+        self.base_mean, self.base_m2, self.base_demand = zeros.copy(), zeros.copy(), zeros.copy()
+        # Open candidate
+        self.run = np.zeros(replicates, dtype=np.int64)
+        self.excess = zeros.copy()
+        self.candidate_svi = np.full(replicates, np.nan)
+        self.candidate_tick = np.full(replicates, -1, dtype=np.int64)
+        # Confirmed result
+        self.crossed = np.zeros(replicates, dtype=bool)
+        self.threshold_svi = np.full(replicates, np.nan)
+        self.threshold_tick = np.full(replicates, -1, dtype=np.int64)
+        self.confirmed_tick = np.full(replicates, -1, dtype=np.int64)
+        self.confidence = zeros.copy()
+        self.elasticity = zeros.copy()
+
+    def update(self, svi, demand, tick=None):
+        """Feed one tick of SVI and Demand (scalars or (R,) arrays); returns replicates confirmed now."""
+        svi = np.atleast_1d(np.asarray(svi, dtype=float))
+        demand = np.atleast_1d(np.asarray(demand, dtype=float))
+        if self.n is None:
+            self._reset(len(svi))
+            self.m_s[:], self.m_d[:] = svi, demand
+            self.m_ss[:], self.m_sd[:], self.m_dd[:] = svi * svi, svi * demand, demand * demand
+            self.base_demand[:] = demand
+        tick = int(self.n[0]) if tick is None else tick
+        self.n += 1
+
+        a = self.alpha
+        self.m_s += a * (svi - self.m_s)
+        self.m_d += a * (demand - self.m_d)
+        self.m_ss += a * (svi * svi - self.m_ss)
+        self.m_sd += a * (svi * demand - self.m_sd)
+        self.m_dd += a * (demand * demand - self.m_dd)
+        var_s = self.m_ss - self.m_s ** 2
+        var_d = self.m_dd - self.m_d ** 2
+        cov = self.m_sd - self.m_s * self.m_d
+        valid = var_s > 1e-12
+        slope = np.where(valid, cov / np.where(valid, var_s, 1.0), 0.0)
+        self.elasticity = np.where(self.m_d > 0, slope * self.m_s / np.where(self.m_d > 0, self.m_d, 1.0), 0.0)
+        r2 = np.where(valid & (var_d > 1e-12), cov ** 2 / np.maximum(var_s * var_d, 1e-300), 0.0)
+
+        scale = np.maximum(np.sqrt(self.base_m2 / np.maximum(self.base_n - 1, 1)), self.noise_floor)
+        band = np.maximum(self.base_mean + self.z * scale, self.min_elasticity)
+        exceed = (self.n > self.warmup) & (self.elasticity > band) & ~self.crossed
+
+        opened = exceed & (self.run == 0)
+        self.candidate_tick[opened] = tick
+        self.candidate_svi = np.where(exceed, self.m_s - (self.m_d - self.base_demand) / np.where(exceed, slope, 1.0),
+                                      np.nan)
+        self.run = np.where(exceed, self.run + 1, 0)
+        self.excess = np.where(exceed, self.excess + (self.elasticity - band) / scale, 0.0)
+
+        # Ticks without a candidate refine the baseline
+        quiet = ~exceed & ~self.crossed & (self.n > self.warmup)
+        if quiet.any():
+            e = self.elasticity[quiet]
+            self.base_n[quiet] += 1
+            delta = e - self.base_mean[quiet]
+            self.base_mean[quiet] += delta / self.base_n[quiet]
+            self.base_m2[quiet] += delta * (e - self.base_mean[quiet])
+        self.base_demand = np.where(~exceed & ~self.crossed, self.base_demand + a * (demand - self.base_demand),
+                                    self.base_demand)
+
+        confirmed = self.run >= self.confirm
+        if confirmed.any():
+            self.crossed |= confirmed
+            self.threshold_svi[confirmed] = self.candidate_svi[confirmed]
+            self.threshold_tick[confirmed] = self.candidate_tick[confirmed]
+            self.confirmed_tick[confirmed] = tick
+            self.confidence[confirmed] = r2[confirmed] * (1.0 - np.exp(-self.excess[confirmed] / self.run[confirmed]))
+            self.run[confirmed] = 0
+            for r in np.flatnonzero(confirmed):
+                event = dict(replicate=int(r), tick=int(self.threshold_tick[r]), confirmed_tick=tick,
+                             svi=float(self.threshold_svi[r]), confidence=float(self.confidence[r]))
+                self.events.append(event)
+                if self.on_cross is not None:
+                    self.on_cross(event)
+        return confirmed
+
+    def __call__(self, state):
+        self.update(state.svi, state.demand, state.tick)
+        return self.stop and bool(self.crossed.all())
+
+    def result(self, replicate=0):
+        """Threshold of one replicate as a dict (svi and tick are None if not crossed)."""
+        crossed = self.n is not None and bool(self.crossed[replicate])
+        return dict(crossed=crossed,
+                    svi=float(self.threshold_svi[replicate]) if crossed else None,
+                    tick=int(self.threshold_tick[replicate]) if crossed else None,
+                    confirmed_tick=int(self.confirmed_tick[replicate]) if crossed else None,
+                    confidence=float(self.confidence[replicate]) if crossed else 0.0)